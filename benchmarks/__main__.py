@@ -0,0 +1,178 @@
+"""
+Benchmarks of the simulator and routing hot paths.
+
+    python -m benchmarks [--suite smoke|default|full] [--save] [--check] [--tolerance 0.25]
+
+Every benchmark reports a JSON record; `--save` stores them as the baseline
+of the suite in benchmarks/baselines/, `--check` compares them against the
+stored baseline and exits with 1 if a throughput or memory figure regressed
+beyond the tolerance.
+"""
+from argparse import ArgumentParser
+from asyncio import run
+from json import dump, dumps, load
+from pathlib import Path
+from random import Random
+from time import perf_counter
+from tracemalloc import get_traced_memory, start, stop
+from typing import Callable, Dict, Iterator, List
+
+from benchmarks.generators import DeliveryCounter, deliveryScenario, networkMap
+from transport_tycoon.common.simulator import Engine, runSynchronously
+from transport_tycoon.common.sinks import EventCounter
+
+
+BASELINES = Path(__file__).parent / 'baselines'
+
+SUITES = {
+    'smoke': {
+        'cargoes': [10, 1_000],
+        'fleets': [(2, 1), (20, 5)],
+        'maps': [50],
+    },
+    'default': {
+        'cargoes': [10, 1_000, 100_000],
+        'fleets': [(2, 1), (20, 5), (200, 50)],
+        'maps': [50, 500],
+    },
+    'full': {
+        'cargoes': [10, 1_000, 100_000, 1_000_000],
+        'fleets': [(2, 1), (20, 5), (200, 50), (1_000, 250)],
+        'maps': [50, 500, 2_000],
+    },
+}
+
+HIGHER_IS_BETTER = ('eventsPerSec', 'callsPerSec', 'coldCallsPerSec')
+LOWER_IS_BETTER = ('peakMemory',)
+
+
+def drive(coro, engine: Engine):
+    if engine is Engine.generator:
+        return runSynchronously(coro)
+
+    return run(coro)
+
+
+def simulate(engine: Engine, **params) -> Dict:
+    scenario = drive(deliveryScenario(engine=engine, **params), engine)
+    delivered = DeliveryCounter(scenario.destinations)
+    events = EventCounter()
+    scenario.simulator.subscribe(delivered)
+    scenario.simulator.subscribe(events)
+
+    def tillCargoesHaveBeenDelivered() -> bool:
+        return delivered.delivered == scenario.cargoesToDeliver
+
+    startedAt = perf_counter()
+    drive(scenario.simulator.proceed(tillCargoesHaveBeenDelivered, keepEvents=False), engine)
+    wallTime = perf_counter() - startedAt
+
+    return {
+        'events': events.total,
+        'wallTime': wallTime,
+        'eventsPerSec': events.total / wallTime if wallTime else 0.0,
+    }
+
+
+def peakMemoryOf(func: Callable[[], object]) -> int:
+    start()
+    try:
+        func()
+        _, peak = get_traced_memory()
+    finally:
+        stop()
+
+    return peak
+
+
+def benchSimulation(name: str, engine: Engine, withMemory: bool, **params) -> Dict:
+    record = {'name': name, 'params': dict(params, engine=engine.name)}
+    record.update(simulate(engine, **params))
+    if withMemory:
+        record['peakMemory'] = peakMemoryOf(lambda: simulate(engine, **params))
+
+    return record
+
+
+def benchRouting(name: str, locations: int, calls: int = 20_000, seed: int = 0) -> Dict:
+    rnd = Random(seed)
+    transportMap = networkMap(locations, seed=seed)
+    pairs = [(f'W{rnd.randrange(locations)}', f'W{rnd.randrange(locations)}') for _ in range(calls)]
+
+    def findItineraries() -> float:
+        startedAt = perf_counter()
+        for originCode, destinationCode in pairs:
+            transportMap.findItinerary(originCode, destinationCode)
+        return perf_counter() - startedAt
+
+    coldTime = findItineraries()
+    warmTime = findItineraries()
+
+    return {
+        'name': name,
+        'params': {'locations': locations, 'calls': calls},
+        'coldCallsPerSec': calls / coldTime,
+        'callsPerSec': calls / warmTime,
+    }
+
+
+def benchmarks(suite: Dict, engine: Engine, withMemory: bool) -> Iterator[Dict]:
+    for cargoes in suite['cargoes']:
+        yield benchSimulation(f'cargoes-{cargoes}', engine, withMemory, cargoes=cargoes)
+
+    for trucks, vessels in suite['fleets']:
+        yield benchSimulation(f'fleet-{trucks}x{vessels}', engine, withMemory,
+                              cargoes=10_000, trucks=trucks, vessels=vessels,
+                              landDestinations=10, seaDestinations=10)
+
+    for locations in suite['maps']:
+        yield benchSimulation(f'map-{locations}', engine, withMemory,
+                              cargoes=10_000, trucks=20, vessels=5,
+                              landDestinations=locations // 2, seaDestinations=locations // 2)
+        yield benchRouting(f'routing-{locations}', locations)
+
+
+def regressions(records: List[Dict], baseline: List[Dict], tolerance: float) -> Iterator[str]:
+    baselineByName = {record['name']: record for record in baseline}
+    for record in records:
+        expected = baselineByName.get(record['name'])
+        if expected is None:
+            continue
+
+        for metric in HIGHER_IS_BETTER:
+            if metric in record and metric in expected and record[metric] < expected[metric] * (1 - tolerance):
+                yield f'{record["name"]}: {metric} {record[metric]:.1f} < baseline {expected[metric]:.1f}'
+
+        for metric in LOWER_IS_BETTER:
+            if metric in record and metric in expected and record[metric] > expected[metric] * (1 + tolerance):
+                yield f'{record["name"]}: {metric} {record[metric]} > baseline {expected[metric]}'
+
+
+if __name__ == '__main__':
+    import sys
+
+    parser = ArgumentParser(description='Benchmarks the simulator and routing hot paths')
+    parser.add_argument('--suite', choices=SUITES, default='smoke')
+    parser.add_argument('--engine', choices=[engine.name for engine in Engine], default=Engine.generator.name)
+    parser.add_argument('--no-memory', action='store_true', help='skip the (slower) peak memory pass')
+    parser.add_argument('--save', action='store_true', help='save the results as the baseline of the suite')
+    parser.add_argument('--check', action='store_true', help='fail if the results regressed against the baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    args = parser.parse_args()
+
+    baselinePath = BASELINES / f'{args.suite}-{args.engine}.json'
+    records = []
+    for record in benchmarks(SUITES[args.suite], Engine[args.engine], not args.no_memory):
+        print(dumps(record), flush=True)
+        records.append(record)
+
+    if args.save:
+        with baselinePath.open('w') as file:
+            dump(records, file, indent=2)
+
+    if args.check:
+        with baselinePath.open() as file:
+            failures = list(regressions(records, load(file), args.tolerance))
+        for failure in failures:
+            print(f'REGRESSION {failure}', file=sys.stderr)
+        sys.exit(1 if failures else 0)
@@ -0,0 +1,91 @@
+from random import Random
+from typing import List, NamedTuple, Sequence
+
+from transport_tycoon.common.simulator import Engine, Simulator
+from transport_tycoon.common.util import Clock, TickClock
+from transport_tycoon.dom import CargoesUnloaded, Cargo, TransportMap, Truck, Vessel, Warehouse
+
+
+class SyntheticScenario(NamedTuple):
+    simulator: Simulator
+    transportMap: TransportMap
+    destinations: Sequence[Warehouse]
+    cargoesToDeliver: int
+
+
+class DeliveryCounter:
+    """
+    Counts cargoes unloaded at their destinations, so the stop predicate is
+    O(1) however many destinations the map has.
+    """
+
+    def __init__(self, destinations: Sequence[Warehouse]):
+        self.__destinations = frozenset(destinations)
+        self.delivered = 0
+
+    def __call__(self, anEvent):
+        if type(anEvent) is CargoesUnloaded and anEvent.toWarehouse in self.__destinations:
+            self.delivered += len(anEvent.cargoes)
+
+
+async def deliveryScenario(cargoes: int,
+                           trucks: int = 2,
+                           vessels: int = 1,
+                           landDestinations: int = 1,
+                           seaDestinations: int = 1,
+                           engine: Engine = Engine.generator,
+                           clock: Clock = TickClock(),
+                           seed: int = 0
+                           ) -> SyntheticScenario:
+    """
+    Builds the exercise topology scaled up: trucks carry cargoes from the
+    factory to land destinations or to the port, vessels carry them from the
+    port to sea destinations.
+    """
+    rnd = Random(seed)
+    simulator = Simulator(clock.origin(), engine=engine, clock=clock)
+
+    factory = Warehouse(simulator, 'Factory')
+    port = Warehouse(simulator, 'Port')
+    transportMap = TransportMap(clock=clock).byLand(factory, port, clock.hours(1))
+
+    destinations: List[Warehouse] = []
+    for i in range(landDestinations):
+        warehouse = Warehouse(simulator, f'L{i}')
+        transportMap.byLand(factory, warehouse, clock.hours(rnd.randint(1, 6)))
+        destinations.append(warehouse)
+
+    for i in range(seaDestinations):
+        warehouse = Warehouse(simulator, f'S{i}')
+        transportMap.bySea(port, warehouse, clock.hours(rnd.randint(2, 8)))
+        destinations.append(warehouse)
+
+    for trackNumber in range(cargoes):
+        factory.bring(Cargo(str(trackNumber), factory.locationCode, rnd.choice(destinations).locationCode))
+
+    for i in range(trucks):
+        await Truck(simulator, f'Truck {i + 1}', transportMap).startJourneyFrom(factory)
+    for i in range(vessels):
+        await Vessel(simulator, f'Vessel {i + 1}', transportMap).startJourneyFrom(port)
+
+    return SyntheticScenario(simulator, transportMap, destinations, cargoes)
+
+
+def networkMap(locations: int, extraSegments: int = 2, seed: int = 0) -> TransportMap:
+    """
+    Builds a connected random network: a random spanning tree of land
+    segments plus `extraSegments` random shortcuts per location.
+    """
+    rnd = Random(seed)
+    clock = TickClock()
+    simulator = Simulator(clock.origin(), engine=Engine.generator, clock=clock)
+    warehouses = [Warehouse(simulator, f'W{i}') for i in range(locations)]
+
+    transportMap = TransportMap(clock=clock)
+    for i in range(1, locations):
+        transportMap.byLand(warehouses[rnd.randrange(i)], warehouses[i], rnd.randint(1, 10))
+    for _ in range(extraSegments * locations):
+        loc1, loc2 = rnd.sample(warehouses, 2)
+        transportMap.bySea(loc1, loc2, rnd.randint(1, 10))
+
+    return transportMap
@@ -0,0 +1,203 @@
+"""
+Golden traces of the exercise manifests and their performance budgets.
+
+The event lines of a simulated manifest are compared with its golden file
+in tests/golden/traces as the events occur, a mismatch is reported as a
+unified diff of the first differing lines with a few lines of context. The
+peak memory of every manifest is checked against tests/golden/budgets.json,
+and so is its wall time (the best of some runs) on demand only, as it
+depends on the machine: with --budgets, or GOLDEN_WALL_TIME=1 for the tests.
+
+    python -m tests.golden [--update] [--budgets]
+
+The checked-in traces/ directory predates the LOAD and UNLOAD events with
+their cargoes, so it is kept for history and the goldens are recorded here.
+"""
+from asyncio import run
+from collections import deque
+from difflib import unified_diff
+from json import dump, load
+from pathlib import Path
+from re import sub
+from time import perf_counter
+from tracemalloc import get_traced_memory, start, stop
+from typing import Deque, Dict, Iterator, List, NamedTuple, Optional, TextIO
+
+from transport_tycoon.common.simulator import Engine, runSynchronously
+from transport_tycoon.common.util import Clock, TickClock
+from transport_tycoon.event_adapter import JsonLinesEncoder
+from transport_tycoon.usecase import useCase
+
+
+GOLDEN = Path(__file__).parent
+TRACES = GOLDEN / 'traces'
+BUDGETS = GOLDEN / 'budgets.json'
+
+MANIFESTS = ('A', 'AB', 'BB', 'ABB', 'AABABBAB', 'ABBBABAAABBB')
+
+WALL_TIME_HEADROOM = 3.0
+MEMORY_HEADROOM = 1.5
+
+
+class GoldenComparison:
+    """
+    A text file to encode the events into which compares every line with
+    the next line of the golden file, and keeps only the lines needed for
+    the diff of the first mismatch.
+    """
+
+    def __init__(self, golden: TextIO, name: str, context: int = 3):
+        self.__golden = golden
+        self.__name = name
+        self.__context = context
+        self.__partial = ''
+        self.__lineNo = 0
+        self.__before: Deque[str] = deque(maxlen=context)
+        self.__mismatchAt: Optional[int] = None
+        self.__expected: List[str] = []
+        self.__actual: List[str] = []
+
+    def write(self, text: str):
+        lines = (self.__partial + text).split('\n')
+        self.__partial = lines.pop()
+        for line in lines:
+            self.__compare(line)
+
+    def __compare(self, line: str):
+        if self.__mismatchAt is not None:
+            if len(self.__actual) <= self.__context:
+                self.__actual.append(line)
+            return
+
+        self.__lineNo += 1
+        expected = self.__golden.readline()
+        if expected and expected.rstrip('\n') == line:
+            self.__before.append(line)
+            return
+
+        self.__mismatchAt = self.__lineNo
+        self.__actual.append(line)
+        if expected:
+            self.__expected.append(expected.rstrip('\n'))
+
+    def diff(self) -> Optional[str]:
+        """
+        Call it at the end: the diff of the first mismatch, if any.
+        """
+        if self.__partial:
+            self.write('\n')
+
+        if self.__mismatchAt is None:
+            expected = self.__golden.readline()
+            if not expected:
+                return None
+
+            self.__mismatchAt = self.__lineNo + 1
+            self.__expected.append(expected.rstrip('\n'))
+
+        while len(self.__expected) <= self.__context:
+            expected = self.__golden.readline()
+            if not expected:
+                break
+            self.__expected.append(expected.rstrip('\n'))
+
+        offset = self.__mismatchAt - len(self.__before) - 1
+
+        def renumber(header: str) -> str:
+            return sub(r'([-+])(\d+)', lambda m: f'{m[1]}{int(m[2]) + offset}', header)
+
+        before = list(self.__before)
+        lines = unified_diff(before + self.__expected, before + self.__actual,
+                             f'golden/{self.__name}', 'simulated', n=self.__context, lineterm='')
+        return '\n'.join(renumber(line) if line.startswith('@@') else line for line in lines)
+
+
+class Measurement(NamedTuple):
+    wallTime: float
+    peakMemory: int
+
+
+def tracePath(manifest: str) -> Path:
+    return TRACES / f'{manifest}.jsonl'
+
+
+def simulate(manifest: str, file: TextIO, engine: Engine = Engine.generator):
+    """
+    Encodes the events of the manifest as `python -m transport_tycoon.usecase` does.
+    """
+    if engine is Engine.generator:
+        clock = TickClock()
+        with JsonLinesEncoder(file, clock=clock) as encoder:
+            runSynchronously(useCase(*manifest, engine=engine, clock=clock, sinks=[encoder], keepEvents=False))
+    else:
+        with JsonLinesEncoder(file) as encoder:
+            run(useCase(*manifest, engine=engine, clock=Clock(), sinks=[encoder], keepEvents=False))
+
+
+def compareWithGolden(manifest: str, engine: Engine = Engine.generator) -> Optional[str]:
+    with tracePath(manifest).open() as golden:
+        comparison = GoldenComparison(golden, tracePath(manifest).name)
+        simulate(manifest, comparison, engine)
+        return comparison.diff()
+
+
+class Discard:
+
+    def write(self, text: str):
+        pass
+
+
+def wallTimeOf(manifest: str, runs: int = 20) -> float:
+    wallTime = float('inf')
+    for _ in range(runs):
+        startedAt = perf_counter()
+        simulate(manifest, Discard())
+        wallTime = min(wallTime, perf_counter() - startedAt)
+    return wallTime
+
+
+def peakMemoryOf(manifest: str) -> int:
+    start()
+    try:
+        simulate(manifest, Discard())
+        _, peakMemory = get_traced_memory()
+    finally:
+        stop()
+    return peakMemory
+
+
+def measure(manifest: str) -> Measurement:
+    return Measurement(wallTimeOf(manifest), peakMemoryOf(manifest))
+
+
+def loadBudgets() -> Dict[str, Measurement]:
+    with BUDGETS.open() as file:
+        return {manifest: Measurement(**budget) for manifest, budget in load(file).items()}
+
+
+def overBudget(manifest: str, budget: Measurement, wallTime: bool = True) -> Iterator[str]:
+    if wallTime:
+        measured = wallTimeOf(manifest)
+        if measured > budget.wallTime:
+            yield f'{manifest}: wall time {measured * 1e3:.2f}ms > budget {budget.wallTime * 1e3:.2f}ms'
+    peakMemory = peakMemoryOf(manifest)
+    if peakMemory > budget.peakMemory:
+        yield f'{manifest}: peak memory {peakMemory} > budget {budget.peakMemory}'
+
+
+def update():
+    """
+    Records the goldens and the budgets of the current simulator.
+    """
+    TRACES.mkdir(exist_ok=True)
+    budgets = {}
+    for manifest in MANIFESTS:
+        with tracePath(manifest).open('w') as file:
+            simulate(manifest, file)
+        measured = measure(manifest)
+        budgets[manifest] = {'wallTime': measured.wallTime * WALL_TIME_HEADROOM,
+                             'peakMemory': int(measured.peakMemory * MEMORY_HEADROOM)}
+
+    with BUDGETS.open('w') as file:
+        dump(budgets, file, indent=2)
+        file.write('\n')
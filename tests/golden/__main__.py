@@ -0,0 +1,30 @@
+import sys
+from argparse import ArgumentParser
+
+from tests.golden import compareWithGolden, loadBudgets, MANIFESTS, overBudget, update
+from transport_tycoon.common.simulator import Engine
+
+
+parser = ArgumentParser(description='Compares the exercise manifests with their golden traces')
+parser.add_argument('--update', action='store_true', help='record the goldens and budgets of the current simulator')
+parser.add_argument('--budgets', action='store_true', help='check the wall time budgets too')
+args = parser.parse_args()
+
+if args.update:
+    update()
+    sys.exit(0)
+
+failures = []
+for manifest in MANIFESTS:
+    for engine in Engine:
+        diff = compareWithGolden(manifest, engine)
+        if diff is not None:
+            failures.append(f'{manifest} ({engine.name}):\n{diff}')
+
+budgets = loadBudgets()
+for manifest in MANIFESTS:
+    failures.extend(overBudget(manifest, budgets[manifest], wallTime=args.budgets))
+
+for failure in failures:
+    print(failure, file=sys.stderr)
+sys.exit(1 if failures else 0)
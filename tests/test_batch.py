@@ -0,0 +1,20 @@
+from unittest import TestCase
+
+from transport_tycoon.batch import simulateManifest, simulateManifests
+
+
+class BatchTest(TestCase):
+
+    def testThatManifestsAreSimulatedInWorkerProcesses(self):
+        results = list(simulateManifests(['BB', 'ABBBABAAABBB', 'AX'], workers=2, chunkSize=1))
+
+        self.assertEqual([result['manifest'] for result in results], ['BB', 'ABBBABAAABBB', 'AX'])
+        self.assertEqual(results[0]['hours'], 5.0)
+        self.assertEqual(results[1]['hours'], 39.0)
+        self.assertIn('error', results[2])
+
+    def testThatEventsAreReportedOnDemand(self):
+        result = simulateManifest('A', withEvents=True)
+
+        self.assertEqual(result['events'][-1]['event'], 'UNLOAD')
+        self.assertEqual(result['events'][-1]['time'] + result['events'][-1]['duration'], result['hours'])
@@ -0,0 +1,69 @@
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from transport_tycoon.cache import ResultCache, scenarioKey, simulateCached
+from transport_tycoon.common.simulator import Ordering
+from transport_tycoon.scenario import exerciseScenario
+
+
+class CacheTest(TestCase):
+
+    def setUp(self):
+        self.directory = TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def testThatKeysAreCanonical(self):
+        scenario = exerciseScenario(list('ABBBABAAABBB'))
+
+        self.assertEqual(scenarioKey(scenario), scenarioKey(exerciseScenario(tuple('ABBBABAAABBB'))))
+        self.assertNotEqual(scenarioKey(scenario), scenarioKey(exerciseScenario(list('BBBBABAAABBA'))))
+        self.assertNotEqual(scenarioKey(scenario), scenarioKey(scenario, Ordering.causal))
+        self.assertNotEqual(scenarioKey(scenario),
+                            scenarioKey(scenario._replace(fleet=[spec._replace(capacity=2) for spec in scenario.fleet])))
+
+    def testThatResultsAreSimulatedOnce(self):
+        cache = ResultCache()
+        scenario = exerciseScenario(list('ABBBABAAABBB'))
+
+        result = simulateCached(scenario, cache)
+        self.assertEqual(result.hours, 39.0)
+        self.assertEqual(result.kpis['delivered'], 12)
+        self.assertIsNone(result.events)
+
+        self.assertIs(simulateCached(exerciseScenario(list('ABBBABAAABBB')), cache), result)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def testThatResultsAreKeptOnDiskWithTheirEvents(self):
+        scenario = exerciseScenario(list('AABABBAB'))
+        result = simulateCached(scenario, ResultCache(self.directory.name), withEvents=True)
+
+        cache = ResultCache(self.directory.name)
+        self.assertEqual(simulateCached(scenario, cache), result._replace(events=None))
+        self.assertEqual(simulateCached(scenario, cache, withEvents=True), result)
+        self.assertEqual((cache.hits, cache.misses), (2, 0))
+        self.assertEqual(len(result.events), 67)
+
+    def testThatEventsAreSimulatedIfNotCached(self):
+        scenario = exerciseScenario(list('AB'))
+        cache = ResultCache(self.directory.name)
+        simulateCached(scenario, cache)
+
+        self.assertEqual(len(simulateCached(scenario, cache, withEvents=True).events), 18)
+        self.assertEqual((cache.hits, cache.misses), (0, 2))
+
+    def testThatTheLeastRecentlyUsedEntriesAreEvicted(self):
+        cache = ResultCache(self.directory.name, memoryEntries=1, maxBytes=1200)
+        first, second, third = (exerciseScenario(list(manifest)) for manifest in ('A', 'AB', 'ABB'))
+        simulateCached(first, cache)
+        simulateCached(second, cache)
+        simulateCached(first, cache)
+        simulateCached(third, cache)
+
+        self.assertLessEqual(cache.bytesOnDisk, 1200)
+        reopened = ResultCache(self.directory.name)
+        self.assertEqual(reopened.bytesOnDisk, cache.bytesOnDisk)
+        self.assertIsNotNone(reopened.get(scenarioKey(first)))
+        self.assertIsNone(reopened.get(scenarioKey(second)))
+        self.assertIsNotNone(reopened.get(scenarioKey(third)))
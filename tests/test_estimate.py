@@ -0,0 +1,41 @@
+from random import Random
+from unittest import TestCase
+
+from transport_tycoon.estimate import MakespanEstimator
+from transport_tycoon.scenario import exerciseScenario, TransportSpec
+
+
+class EstimateTest(TestCase):
+
+    def testThatExerciseIsEstimated(self):
+        estimator = MakespanEstimator(exerciseScenario(()))
+
+        self.assertEqual(estimator.estimate('BB').estimate, 5)
+        self.assertEqual(estimator.estimate('ABBBABAAABBB').estimate, 39)
+        self.assertEqual(estimator.estimate(''), (0, 0))
+
+    def testThatEstimatesAreValidatedAgainstTheSimulation(self):
+        rnd = Random(0)
+        manifests = [''.join(rnd.choice('AB') for _ in range(rnd.randrange(1, 20))) for _ in range(30)]
+        scenario = exerciseScenario(())
+        fleets = (scenario.fleet,
+                  (*scenario.fleet, TransportSpec('vessel', 'Vessel 2', 'Port')),
+                  (TransportSpec('truck', 'Truck 1', 'Factory', hoursToLoad=1), TransportSpec('vessel', 'Vessel 1', 'Port')))
+
+        for fleet in fleets:
+            for validation in MakespanEstimator(scenario._replace(fleet=fleet)).validate(manifests):
+                with self.subTest(fleet=len(fleet), manifest=validation.destinationCodes):
+                    self.assertLessEqual(validation.lowerBound, validation.simulated)
+                    self.assertLessEqual(validation.lowerBound, validation.estimate)
+                    self.assertEqual(validation.error, 0)
+
+    def testThatUnknownDestinationsAreRejected(self):
+        with self.assertRaises(ValueError):
+            MakespanEstimator(exerciseScenario(())).estimate('AX')
+
+    def testThatTrucksCarryingSeveralCargoesAreRejected(self):
+        scenario = exerciseScenario(())
+        fleet = [spec._replace(capacity=3) if spec.kind == 'truck' else spec for spec in scenario.fleet]
+
+        with self.assertRaises(ValueError):
+            MakespanEstimator(scenario._replace(fleet=fleet))
@@ -0,0 +1,89 @@
+from asyncio import run
+from collections import Counter
+from io import StringIO
+from json import loads
+from typing import Sequence
+from unittest import TestCase
+
+from transport_tycoon.common.simulator import Engine, Event, handledBy, runSynchronously, Simulator
+from transport_tycoon.common.util import Duration, TickClock, Time
+from transport_tycoon.dom import Cargo, TransportMap, Truck, Warehouse
+from transport_tycoon.event_adapter import (ChromeTraceWriter, JsonLinesEncoder, JsonLinesWriter, printEvents,
+                                           serializerFor, SERIALIZERS)
+from transport_tycoon.usecase import useCase
+
+
+class EventAdapterTest(TestCase):
+
+    def testThatJsonLinesWriterStreamsWhatPrintEventsPrints(self):
+        streamed, printed = StringIO(), StringIO()
+        occurredEvents = run(useCase(*'ABBBABAAABBB', sinks=[JsonLinesWriter(streamed)]))
+        printEvents(occurredEvents, file=printed)
+
+        self.assertEqual(streamed.getvalue(), printed.getvalue())
+
+    def testThatJsonLinesEncoderProducesWhatPrintEventsPrints(self):
+        clock = TickClock(resolution=Duration(minutes=20))
+        for destinationCodes in ('A', 'AB', 'AABABBAB', 'ABBBABAAABBB'):
+            with self.subTest(destinationCodes):
+                encoded, printed = StringIO(), StringIO()
+                with JsonLinesEncoder(encoded, clock=clock, batchSize=7, maxCachedCargoes=2) as encoder:
+                    occurredEvents = run(useCase(*destinationCodes, engine=Engine.generator, clock=clock, sinks=[encoder]))
+                printEvents(occurredEvents, clock, printed)
+
+                self.assertEqual(encoded.getvalue(), printed.getvalue())
+
+    def testThatChromeTracesHaveSpansOfTravelsHandlingsAndCarriedCargoes(self):
+        encoded = StringIO()
+        with ChromeTraceWriter(encoded, batchSize=7) as writer:
+            occurredEvents = run(useCase(*'ABBBABAAABBB', sinks=[writer]))
+        traceEvents = loads(encoded.getvalue())['traceEvents']
+
+        occurred = Counter(anEvent.__class__.__name__ for anEvent in occurredEvents)
+        traced = Counter((traceEvent['ph'], traceEvent.get('cat')) for traceEvent in traceEvents)
+        self.assertEqual(traced[('X', 'travel')] + traced[('B', 'travel')], occurred['TransportDeparted'])
+        self.assertEqual(traced[('X', 'travel')] + traced[('i', 'event')], occurred['TransportArrived'])
+        self.assertEqual(traced[('X', 'handling')], occurred['CargoesLoaded'] + occurred['CargoesUnloaded'])
+        self.assertEqual(traced[('X', 'cargo')], occurred['CargoesUnloaded'])
+
+        threads = {traceEvent['args']['name']: traceEvent['tid']
+                   for traceEvent in traceEvents if traceEvent['name'] == 'thread_name'}
+        self.assertEqual([(traceEvent['name'], traceEvent['ts'] / 3.6e9, traceEvent['dur'] / 3.6e9)
+                          for traceEvent in traceEvents[:-1]
+                          if traceEvent.get('tid') == threads['Vessel 1'] and traceEvent['ph'] == 'X'][:5],
+                         [('LOAD Port', 1.0, 1.0), ('Port-A', 2.0, 6.0), ('Port-A', 1.0, 8.0), ('UNLOAD A', 8.0, 1.0),
+                          ('A-Port', 9.0, 6.0)])
+        self.assertEqual(traceEvents[-1], {'name': 'A-Port', 'cat': 'travel', 'ph': 'B', 'ts': 37 * 3.6e9,
+                                           'pid': 2, 'tid': threads['Vessel 1'], 'args': {'cargo': []}})
+
+    def testThatNewEventKindsAreDispatchedAndSerializedThroughTheirDeclarations(self):
+
+        @handledBy('whenHeld')
+        class TransportHeld(Event):
+            source: object
+            atWarehouse: Warehouse
+            cargoes: Sequence[Cargo] = ()
+            occurredAt: Time = None
+
+        @serializerFor(TransportHeld)
+        def heldToDict(event: TransportHeld, inHours, relTime) -> dict:
+            return {'event': 'HOLD', 'location': event.atWarehouse.locationCode}
+
+        self.addCleanup(SERIALIZERS.pop, TransportHeld)
+
+        class InspectedTruck(Truck):
+            async def whenHeld(self, held: TransportHeld):
+                self.held = held
+
+        clock = TickClock()
+        sim = Simulator(clock.origin(), engine=Engine.generator, clock=clock)
+        truck = InspectedTruck(sim, 'Truck 1', TransportMap())
+        encoded = StringIO()
+        with JsonLinesEncoder(encoded, clock=clock) as encoder:
+            sim.subscribe(encoder)
+            runSynchronously(sim.schedule(TransportHeld(truck, atWarehouse=Warehouse(sim, 'Customs')), after=2))
+            occurredEvents = runSynchronously(sim.proceed(lambda: False))
+
+        self.assertIs(truck.held, occurredEvents[0])
+        self.assertEqual(encoded.getvalue(), '{"time": 0.0, "transport_id": "Truck 1", "kind": "INSPECTEDTRUCK", '
+                                             '"cargo": [], "event": "HOLD", "location": "Customs"}\n')
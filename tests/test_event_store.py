@@ -0,0 +1,81 @@
+from asyncio import run
+from os import path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from transport_tycoon.common.simulator import Engine
+from transport_tycoon.common.util import Clock, TickClock
+from transport_tycoon.event_adapter import BinaryEventLogWriter, eventToDict
+from transport_tycoon.event_store import ColumnarEventLog, MappedEventLog
+from transport_tycoon.usecase import useCase
+
+
+class ColumnarEventLogTest(TestCase):
+
+    def testThatEventsAreMaterializedAsTheyOccurred(self):
+        for clock in (Clock(), TickClock()):
+            with self.subTest(clock):
+                eventLog = ColumnarEventLog()
+                occurredEvents = run(useCase(*'ABBBABAAABBB', engine=Engine.generator, clock=clock, sinks=[eventLog]))
+
+                self.assertEqual(len(eventLog), len(occurredEvents))
+                self.assertEqual(list(eventLog), list(occurredEvents))
+                self.assertEqual(eventLog[-1], occurredEvents[-1])
+
+
+class MappedEventLogTest(TestCase):
+
+    def setUp(self):
+        self.directory = TemporaryDirectory()
+        self.path = path.join(self.directory.name, 'events.ttel')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def simulate(self, clock):
+        with BinaryEventLogWriter(self.path, clock=clock, batchSize=7) as writer:
+            return run(useCase(*'ABBBABAAABBB', engine=Engine.generator, clock=clock, sinks=[writer]))
+
+    def testThatEventsAreReadAsTheyWereSerialized(self):
+        for clock in (Clock(), TickClock()):
+            with self.subTest(clock):
+                occurredEvents = self.simulate(clock)
+                startAt = occurredEvents[0].occurredAt
+
+                with MappedEventLog(self.path) as eventLog:
+                    self.assertEqual(len(eventLog), 90)
+                    self.assertEqual([anEvent.asDict() for anEvent in eventLog],
+                                     [eventToDict(anEvent, startAt, clock) for anEvent in occurredEvents])
+                    self.assertEqual(eventLog[-1].time, 39.0)
+
+    def testThatEventsOfATransportAreFoundWithinHours(self):
+        self.simulate(TickClock())
+
+        with MappedEventLog(self.path) as eventLog:
+            self.assertEqual([(anEvent.time, anEvent.kind) for anEvent in eventLog.ofTransport('Vessel 1', 10, 20)],
+                             [(15.0, 'ARRIVE'), (16.0, 'LOAD'), (16.0, 'DEPART')])
+            self.assertEqual([anEvent for anEvent in eventLog if anEvent.transport == 'Truck 2'],
+                             list(eventLog.ofTransport('Truck 2')))
+            self.assertEqual(list(eventLog.ofTransport('Vessel 2')), [])
+            self.assertEqual(list(eventLog.between(10, 20)),
+                             [anEvent for anEvent in eventLog if 10 <= anEvent.time <= 20])
+
+    def testThatEventsOfACargoAreFound(self):
+        self.simulate(TickClock())
+
+        with MappedEventLog(self.path) as eventLog:
+            events = list(eventLog.ofCargo('7'))
+            self.assertEqual(events, [anEvent for anEvent in eventLog
+                                      if any(aCargo.trackNumber == '7' for aCargo in anEvent.cargoes)])
+            self.assertEqual([(anEvent.kind, anEvent.transport) for anEvent in events],
+                             [('LOAD', 'Truck 2'), ('DEPART', 'Truck 2'), ('ARRIVE', 'Truck 2'), ('UNLOAD', 'Truck 2'),
+                              ('LOAD', 'Vessel 1'), ('DEPART', 'Vessel 1'), ('ARRIVE', 'Vessel 1'),
+                              ('UNLOAD', 'Vessel 1')])
+            self.assertEqual(list(eventLog.ofCargo('12')), [])
+
+    def testThatOnlyEventLogsAreRead(self):
+        with open(self.path, 'wb') as file:
+            file.write(b'{"time": 0.0}\n' * 20)
+
+        with self.assertRaises(ValueError):
+            MappedEventLog(self.path)
@@ -0,0 +1,60 @@
+from io import StringIO
+from os import environ
+from unittest import skipUnless, TestCase
+
+from tests.golden import compareWithGolden, GoldenComparison, loadBudgets, MANIFESTS, overBudget, simulate, tracePath
+from transport_tycoon.common.simulator import Engine
+
+
+class GoldenTest(TestCase):
+
+    def testThatEventsMatchTheGoldenTraces(self):
+        for manifest in MANIFESTS:
+            for engine in Engine:
+                with self.subTest(manifest=manifest, engine=engine.name):
+                    diff = compareWithGolden(manifest, engine)
+                    self.assertIsNone(diff, diff)
+
+    def testThatManifestsRunWithinTheirMemoryBudgets(self):
+        budgets = loadBudgets()
+        for manifest in MANIFESTS:
+            with self.subTest(manifest=manifest):
+                failures = list(overBudget(manifest, budgets[manifest], wallTime=False))
+                self.assertFalse(failures, failures)
+
+    @skipUnless(environ.get('GOLDEN_WALL_TIME'), 'wall time depends on the machine, set GOLDEN_WALL_TIME=1')
+    def testThatManifestsRunWithinTheirBudgets(self):
+        budgets = loadBudgets()
+        for manifest in MANIFESTS:
+            with self.subTest(manifest=manifest):
+                failures = list(overBudget(manifest, budgets[manifest]))
+                self.assertFalse(failures, failures)
+
+
+class GoldenComparisonTest(TestCase):
+
+    def setUp(self):
+        with tracePath('AABABBAB').open() as file:
+            self.lines = file.read().splitlines()
+
+    def compare(self, goldenLines) -> str:
+        comparison = GoldenComparison(StringIO(''.join(line + '\n' for line in goldenLines)), 'AABABBAB.jsonl')
+        simulate('AABABBAB', comparison)
+        return comparison.diff()
+
+    def testThatOnlyTheFirstMismatchWithItsContextIsReported(self):
+        golden = list(self.lines)
+        golden[20] = golden[20].replace('"time": ', '"time": 1')
+        golden[40] = golden[40].replace('"time": ', '"time": 1')
+
+        diff = self.compare(golden).splitlines()
+
+        self.assertEqual(diff[:3], ['--- golden/AABABBAB.jsonl', '+++ simulated', '@@ -18,7 +18,7 @@'])
+        self.assertEqual(diff[3:6], [' ' + line for line in self.lines[17:20]])
+        self.assertEqual(diff[6:8], ['-' + golden[20], '+' + self.lines[20]])
+        self.assertEqual(diff[8:], [' ' + line for line in self.lines[21:24]])
+
+    def testThatMissingAndExtraLinesAreReported(self):
+        self.assertIn('+' + self.lines[-1], self.compare(self.lines[:-1]).splitlines())
+        self.assertIn('-{}', self.compare(self.lines + ['{}']).splitlines())
+        self.assertIsNone(self.compare(self.lines))
@@ -0,0 +1,55 @@
+from unittest import TestCase
+
+from transport_tycoon.common.simulator import Simulator
+from transport_tycoon.common.util import Clock, Duration, hours, TickClock
+from transport_tycoon.dom import ShipmentOption, TransportMap, Warehouse
+
+
+class TransportMapTest(TestCase):
+
+    def setUp(self):
+        sim = Simulator(Clock().origin())
+        self.factory, self.port, self.a, self.b = (Warehouse(sim, code) for code in ('Factory', 'Port', 'A', 'B'))
+
+    def _locations(self, itinerary):
+        return [seg.origin.locationCode for seg in itinerary.segments] + [itinerary.destination.locationCode]
+
+    def testThatTheFastestItineraryIsFound(self):
+        transportMap = TransportMap() \
+            .byLand(self.factory, self.b, hours(9)) \
+            .byLand(self.factory, self.port, hours(1)) \
+            .byLand(self.port, self.b, hours(2))
+
+        itinerary = transportMap.findItinerary('Factory', 'B')
+
+        self.assertEqual(self._locations(itinerary), ['Factory', 'Port', 'B'])
+        self.assertEqual(itinerary.totalTimeToTravel, hours(3))
+        self.assertEqual(self._locations(itinerary.forComeBack()), ['B', 'Port', 'Factory'])
+
+    def testThatItinerariesAreServedFromTheRoutingTable(self):
+        transportMap = TransportMap() \
+            .byLand(self.factory, self.port, hours(1)) \
+            .bySea(self.port, self.a, hours(6))
+
+        itinerary = transportMap.findItinerary('Factory', 'A')
+
+        self.assertIs(transportMap.findItinerary('Factory', 'A'), itinerary)
+        self.assertIs(itinerary.forShipBy(ShipmentOption.land), itinerary.forShipBy(ShipmentOption.land))
+        self.assertIs(itinerary.forComeBack().forComeBack(), itinerary)
+
+    def testThatRoutingTableIsRebuiltWhenTheGraphChanges(self):
+        transportMap = TransportMap() \
+            .byLand(self.factory, self.b, hours(5))
+        self.assertEqual(transportMap.findItinerary('Factory', 'A').segments, ())
+
+        transportMap.byLand(self.b, self.a, hours(1))
+
+        self.assertEqual(self._locations(transportMap.findItinerary('Factory', 'A')), ['Factory', 'B', 'A'])
+
+    def testThatNoSegmentsTakeNoTimeOfTheClock(self):
+        clock = TickClock()
+        transportMap = TransportMap(clock=clock).byLand(self.factory, self.b, clock.hours(5))
+
+        self.assertEqual(transportMap.findItinerary('Factory', 'A').totalTimeToTravel, 0)
+        self.assertEqual(transportMap.findItinerary('Factory', 'B').forShipBy(ShipmentOption.sea).totalTimeToTravel, 0)
+        self.assertEqual(TransportMap().findItinerary('Factory', 'A').totalTimeToTravel, Duration())
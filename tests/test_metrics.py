@@ -0,0 +1,76 @@
+from asyncio import run
+from unittest import TestCase
+
+from transport_tycoon.common.metrics import DeliveryMetrics
+from transport_tycoon.common.simulator import Engine, runSynchronously
+from transport_tycoon.common.util import TickClock
+from transport_tycoon.dom import CargoesUnloaded, TransportDeparted
+from transport_tycoon.scenario import build, exerciseScenario, simulate
+from transport_tycoon.snapshot import proceedTill
+
+
+CLOCK = TickClock()
+
+
+def deliveries(occurredEvents):
+    return {aCargo.trackNumber: CLOCK.inHours(event.occurredAt)
+            for event in occurredEvents if isinstance(event, CargoesUnloaded)
+            for aCargo in event.cargoes if aCargo.destinationCode == event.toWarehouse.locationCode}
+
+
+class DeliveryMetricsTest(TestCase):
+
+    def testThatKPIsAgreeWithTheOccurredEvents(self):
+        for engine in Engine:
+            with self.subTest(engine=engine.name):
+                metrics = DeliveryMetrics(CLOCK, perCargo=True)
+                scenario = exerciseScenario('ABBBABAAABBB')
+                if engine is Engine.generator:
+                    occurredEvents = runSynchronously(simulate(scenario, engine, CLOCK, metrics=metrics))
+                else:
+                    occurredEvents = run(simulate(scenario, engine, CLOCK, metrics=metrics))
+
+                delivered = deliveries(occurredEvents)
+                self.assertTrue(metrics.allDelivered())
+                self.assertEqual({trackNumber: metrics.leadTimeInHours(trackNumber) for trackNumber in delivered}, delivered)
+                self.assertEqual(metrics.meanLeadTimeInHours(), sum(delivered.values()) / 12)
+                self.assertEqual(CLOCK.inHours(metrics.maxLeadTime), 39.0)
+
+                loadedTravel = sum(CLOCK.inHours(event.timeToDeliver) for event in occurredEvents
+                                   if isinstance(event, TransportDeparted) and event.cargoes and event.source.name == 'Vessel 1')
+                self.assertEqual(metrics.utilization('Vessel 1'), loadedTravel / 39)
+                self.assertEqual(metrics.asDict()['transports']['Vessel 1']['cargoesLoaded'], 5)
+
+    def testThatKPIsAreQueryableMidRun(self):
+        world = runSynchronously(build(exerciseScenario('ABBBABAAABBB'), Engine.generator, CLOCK))
+        prefix = runSynchronously(proceedTill(world, CLOCK.hours(12)))
+
+        self.assertEqual(world.metrics.delivered, len(deliveries(prefix)))
+        self.assertFalse(world.allCargoesDelivered())
+        self.assertEqual(world.metrics.idleHours('Vessel 1'), 1.0)
+
+    def testThatTransportsOfTheSameNameAreKeptApart(self):
+        scenario = exerciseScenario('ABBBABAAABBB')
+        scenario = scenario._replace(fleet=[spec._replace(name='Truck') if spec.kind == 'truck' else spec
+                                            for spec in scenario.fleet])
+        world = runSynchronously(build(scenario, Engine.generator, CLOCK))
+        runSynchronously(world.simulator.proceed(world.allCargoesDelivered))
+
+        trucks = [transport for transport in world.fleet if transport.name == 'Truck']
+        kpis = world.metrics.asDict()['transports']
+        self.assertEqual(sorted(kpis), ['Truck', 'Truck #2', 'Vessel 1'])
+        self.assertEqual(kpis['Truck']['cargoesLoaded'] + kpis['Truck #2']['cargoesLoaded'], 12)
+        self.assertEqual([world.metrics.transport(truck).cargoesLoaded for truck in trucks],
+                         [kpis['Truck']['cargoesLoaded'], kpis['Truck #2']['cargoesLoaded']])
+        with self.assertRaises(KeyError):
+            world.metrics.idleHours('Truck')
+
+    def testThatUnknownTransportsAreNotReported(self):
+        world = runSynchronously(build(exerciseScenario('AB'), Engine.generator, CLOCK))
+        runSynchronously(world.simulator.proceed(world.allCargoesDelivered))
+
+        with self.assertRaises(KeyError):
+            world.metrics.idleHours('Truck 3')
+        with self.assertRaises(KeyError):
+            world.metrics.utilization(object())
+        self.assertEqual(sorted(world.metrics.asDict()['transports']), ['Truck 1', 'Truck 2', 'Vessel 1'])
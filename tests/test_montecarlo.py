@@ -0,0 +1,68 @@
+from json import dump
+from pathlib import Path
+from random import Random
+from tempfile import TemporaryDirectory
+from unittest import skipIf, TestCase
+
+from transport_tycoon import montecarlo
+from transport_tycoon.montecarlo import Fixed, loadUncertainties, LogNormal, monteCarlo, Triangular, Uncertainties, Uniform
+from transport_tycoon.scenario import exerciseScenario, TransportSpec
+
+
+UNCERTAINTIES = Uncertainties(
+    segments={('Factory', 'Port'): LogNormal(1, 0.3), ('Port', 'A'): Triangular(5, 6, 9), ('Factory', 'B'): Uniform(4, 6)},
+    handling={('vessel', 'load'): Uniform(0.5, 1.5), ('truck', 'unload'): Uniform(0, 0.2)},
+)
+
+
+class MonteCarloTest(TestCase):
+
+    def testThatFixedHoursReproduceTheExercise(self):
+        uncertainties = Uncertainties(segments={('Port', 'A'): Fixed(6)})
+        result = monteCarlo(exerciseScenario('ABBBABAAABBB'), uncertainties, samples=4, vectorized=False, workers=2)
+
+        self.assertFalse(result.vectorized)
+        self.assertEqual(result.makespans, [39.0] * 4)
+        self.assertEqual(result.summary()['cargoes']['1'], {'p50': 5.0, 'p95': 5.0})
+
+    def testThatPercentilesAreReported(self):
+        result = monteCarlo(exerciseScenario('ABBBABAAABBB'), UNCERTAINTIES, samples=50, workers=2)
+        summary = result.summary()
+
+        self.assertEqual(summary['samples'], 50)
+        self.assertLessEqual(summary['makespan']['p50'], summary['makespan']['p95'])
+        self.assertLessEqual(result.percentile(0), min(result.makespans))
+        self.assertEqual(result.percentile(100), max(result.makespans))
+
+    @skipIf(montecarlo.numpy is None, 'NumPy is not installed')
+    def testThatBatchScheduleMatchesTheSimulation(self):
+        scenario = exerciseScenario('ABBBABAAABBBAABAB')
+        for fleet in (scenario.fleet, (*scenario.fleet, TransportSpec('vessel', 'Vessel 2', 'Port'))):
+            scenario = scenario._replace(fleet=fleet)
+            rnd = Random(1)
+            draws = [montecarlo.drawSample(scenario, UNCERTAINTIES, rnd) for _ in range(100)]
+
+            self.assertEqual(montecarlo.BatchSchedule(scenario, UNCERTAINTIES)(draws).tolist(),
+                             [montecarlo.simulateDraw(scenario, draw) for draw in draws])
+
+    def testThatTrucksCarryingSeveralCargoesAreSimulated(self):
+        scenario = exerciseScenario('BBBBBB')
+        scenario = scenario._replace(fleet=(*(spec._replace(capacity=3) for spec in scenario.fleet[:2]),
+                                            scenario.fleet[2]))
+        result = monteCarlo(scenario, Uncertainties(), samples=2, workers=1)
+
+        self.assertFalse(result.vectorized)
+        self.assertEqual(result.makespans, [5.0] * 2)
+        if montecarlo.numpy is not None:
+            with self.assertRaises(ValueError):
+                monteCarlo(scenario, Uncertainties(), samples=2, vectorized=True)
+
+    def testThatUncertaintiesAreLoaded(self):
+        with TemporaryDirectory() as tmp:
+            path = Path(tmp) / 'uncertainties.json'
+            with path.open('w') as file:
+                dump({'segments': {'Port-A': ['triangular', 5, 6, 9]},
+                      'handling': {'vessel': {'load': ['uniform', 0.5, 1.5]}}}, file)
+
+            self.assertEqual(loadUncertainties(path),
+                             Uncertainties({('Port', 'A'): Triangular(5, 6, 9)}, {('vessel', 'load'): Uniform(0.5, 1.5)}))
@@ -0,0 +1,36 @@
+from math import inf
+from unittest import TestCase
+
+from transport_tycoon.dom import CargoesUnloaded
+from transport_tycoon.optimize import evaluatePlan, optimize, Plan, plannedScenario
+from transport_tycoon.scenario import exerciseScenario
+
+
+class OptimizeTest(TestCase):
+
+    def setUp(self):
+        self.scenario = exerciseScenario(list('ABBBABAAABBB'))
+
+    def testThatTheBestPlanIsFoundWithItsTrace(self):
+        optimized = optimize(self.scenario, workers=2)
+
+        self.assertEqual(optimized.initialMakespan, 39.0)
+        self.assertEqual(optimized.makespan, optimized.lowerBound)
+        self.assertEqual(optimized.occurredEvents[-1].occurredAt, optimized.makespan)
+        self.assertEqual(evaluatePlan(self.scenario, optimized.plan), optimized.makespan)
+
+        delivered = [aCargo.trackNumber for event in optimized.occurredEvents if isinstance(event, CargoesUnloaded)
+                     for aCargo in event.cargoes if aCargo.destinationCode == event.toWarehouse.locationCode]
+        self.assertCountEqual(delivered, map(str, range(12)))
+
+    def testThatCargoesKeepTheirTrackNumbersInTheReleaseOrder(self):
+        plan = Plan((2, 0, 1), (None, None, None))
+        cargoes = list(plannedScenario(exerciseScenario(list('ABB')), plan).cargoes)
+
+        self.assertEqual([(aCargo.trackNumber, aCargo.destinationCode) for aCargo in cargoes],
+                         [('2', 'B'), ('0', 'A'), ('1', 'B')])
+
+    def testThatPlansLeavingDestinationsUnservedNeverFinish(self):
+        plan = Plan(tuple(range(12)), (('A',), ('A',), None))
+
+        self.assertEqual(evaluatePlan(self.scenario, plan), inf)
@@ -0,0 +1,76 @@
+from random import Random
+from unittest import TestCase
+
+from transport_tycoon.common.simulator import Engine, Ordering, runSynchronously
+from transport_tycoon.dom import ShipmentOption
+from transport_tycoon.event_adapter import eventToDict
+from transport_tycoon.partition import CLOCK, lookaheadOf, ownersOf, simulatePartitioned, simulateSingle
+from transport_tycoon.scenario import exerciseScenario, Manifest, Scenario, SegmentSpec, simulate, TransportSpec
+
+
+def twoPortsScenario(destinationCodes) -> Scenario:
+    land, sea = ShipmentOption.land, ShipmentOption.sea
+    return Scenario(
+        ['Factory', 'B', 'Port1', 'A', 'Port2', 'C', 'D'],
+        [SegmentSpec('Factory', 'Port1', 1, land),
+         SegmentSpec('Factory', 'Port2', 2, land),
+         SegmentSpec('Factory', 'B', 5, land),
+         SegmentSpec('Port1', 'A', 6, sea),
+         SegmentSpec('Port2', 'C', 4, sea),
+         SegmentSpec('Port2', 'D', 3, sea)],
+        [TransportSpec('truck', 'Truck 1', 'Factory'),
+         TransportSpec('truck', 'Truck 2', 'Factory'),
+         TransportSpec('truck', 'Truck 3', 'Factory'),
+         TransportSpec('vessel', 'Vessel 1', 'Port1'),
+         TransportSpec('vessel', 'Vessel 2', 'Port2', capacity=2),
+         TransportSpec('vessel', 'Vessel 3', 'Port2')],
+        Manifest('Factory', destinationCodes),
+    )
+
+
+class PartitionTest(TestCase):
+
+    def testThatRegionsSimulateTheExerciseAsASingleSimulator(self):
+        scenario = exerciseScenario(list('ABBBABAAABBB'))
+
+        occurredEvents = simulatePartitioned(scenario, [['Factory', 'B'], ['Port', 'A']])
+
+        self.assertEqual(occurredEvents, simulateSingle(scenario))
+        self.assertEqual(occurredEvents[-1]['time'], 39.0)
+
+    def testThatRegionsOfManyHubsSimulateAsASingleSimulator(self):
+        rnd = Random(7)
+        regions = [['Factory', 'B'], ['Port1', 'A'], ['Port2', 'C', 'D']]
+        for _ in range(10):
+            destinationCodes = [rnd.choice('ABCD') for _ in range(rnd.randint(0, 30))]
+            scenario = twoPortsScenario(destinationCodes)
+            with self.subTest(''.join(destinationCodes)):
+                self.assertEqual(simulatePartitioned(scenario, regions), simulateSingle(scenario))
+
+    def testThatASingleRegionIsTheSingleSimulator(self):
+        scenario = twoPortsScenario(list('ABCDDCBA'))
+
+        self.assertEqual(simulatePartitioned(scenario, [scenario.warehouses]), simulateSingle(scenario))
+
+    def testThatTheCausalOrderingIsTheDefaultOrdering(self):
+        rnd = Random(11)
+        for _ in range(10):
+            scenario = twoPortsScenario([rnd.choice('ABCD') for _ in range(rnd.randint(0, 30))])
+            occurredEvents = runSynchronously(simulate(scenario, Engine.generator, CLOCK, ordering=Ordering.causal))
+
+            self.assertEqual([eventToDict(anEvent, CLOCK.origin(), CLOCK) for anEvent in occurredEvents],
+                             simulateSingle(scenario))
+
+    def testThatTheLookaheadIsTheShortestTravelTimeBetweenRegions(self):
+        scenario = twoPortsScenario([])
+        owners = ownersOf(scenario, [['Factory', 'B'], ['Port1', 'A'], ['Port2', 'C', 'D']])
+
+        self.assertEqual(lookaheadOf(scenario, owners), CLOCK.hours(1))
+
+    def testThatRegionsMustCoverEveryWarehouseOnce(self):
+        scenario = twoPortsScenario([])
+
+        with self.assertRaises(ValueError):
+            ownersOf(scenario, [['Factory', 'B', 'Port1', 'A'], ['Port2', 'C']])
+        with self.assertRaises(ValueError):
+            ownersOf(scenario, [['Factory', 'B', 'Port1', 'A'], ['Port2', 'C', 'D', 'A']])
@@ -0,0 +1,68 @@
+from asyncio import run
+from json import dump, load
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from transport_tycoon.common.simulator import Engine, runSynchronously
+from transport_tycoon.common.util import TickClock
+from transport_tycoon.event_adapter import eventToDict
+from transport_tycoon.scenario import (BinaryManifest, build, exerciseScenario, loadScenario, simulate,
+                                       writeBinaryManifest)
+from transport_tycoon.usecase import useCase
+
+
+SCENARIOS = Path(__file__).parent.parent / 'scenarios'
+
+
+class ScenarioTest(TestCase):
+
+    def _dicts(self, occurredEvents, clock):
+        return [eventToDict(event, clock.origin(), clock) for event in occurredEvents]
+
+    def testThatScenarioFileReproducesTheUseCase(self):
+        clock = TickClock()
+        occurredEvents = runSynchronously(simulate(loadScenario(SCENARIOS / 'exercise2.json'), Engine.generator, clock))
+        expectedEvents = run(useCase(*'ABBBABAAABBB', engine=Engine.generator, clock=clock))
+
+        self.assertEqual(self._dicts(occurredEvents, clock), self._dicts(expectedEvents, clock))
+
+    def testThatBinaryManifestIsStreamedIntoTheScenario(self):
+        clock = TickClock()
+        with TemporaryDirectory() as tmp:
+            writeBinaryManifest(Path(tmp) / 'manifest.bin', (('Factory', code) for code in 'ABBBABAAABBB'))
+            with (SCENARIOS / 'exercise2.json').open() as file:
+                spec = load(file)
+            spec['cargoes'] = {'file': 'manifest.bin'}
+            with (Path(tmp) / 'scenario.json').open('w') as file:
+                dump(spec, file)
+
+            scenario = loadScenario(Path(tmp) / 'scenario.json')
+            self.assertIsInstance(scenario.cargoes, BinaryManifest)
+            self.assertEqual(len(scenario.cargoes), 12)
+            occurredEvents = runSynchronously(simulate(scenario, Engine.generator, clock))
+
+        expectedEvents = run(useCase(*'ABBBABAAABBB', engine=Engine.generator, clock=clock))
+        self.assertEqual(self._dicts(occurredEvents, clock), self._dicts(expectedEvents, clock))
+
+    def testThatBinaryManifestIsPulledAsTheOriginDrains(self):
+        clock = TickClock()
+        with TemporaryDirectory() as tmp:
+            writeBinaryManifest(Path(tmp) / 'manifest.bin', (('Factory', code) for code in 'ABBBABAAABBB' * 10))
+            scenario = exerciseScenario(())._replace(cargoes=BinaryManifest(Path(tmp) / 'manifest.bin'))
+            world = runSynchronously(build(scenario, Engine.generator, clock))
+            stored = []
+            world.simulator.subscribe(lambda anEvent: stored.append(world.warehouses['Factory'].fullness()))
+            occurredEvents = runSynchronously(world.simulator.proceed(world.allCargoesDelivered))
+
+        expectedEvents = runSynchronously(simulate(exerciseScenario('ABBBABAAABBB' * 10), Engine.generator, clock))
+        self.assertEqual(self._dicts(occurredEvents, clock), self._dicts(expectedEvents, clock))
+        self.assertEqual(world.metrics.delivered, 120)
+        self.assertLessEqual(max(stored), 1)
+
+    def testThatUnknownLocationCodesAreRejected(self):
+        scenario = loadScenario(SCENARIOS / 'exercise2.json')
+        scenario = scenario._replace(fleet=[*scenario.fleet, scenario.fleet[0]._replace(startAt='Depot')])
+
+        with self.assertRaisesRegex(ValueError, 'Depot'):
+            runSynchronously(simulate(scenario, Engine.generator))
@@ -0,0 +1,69 @@
+from asyncio import ensure_future, run, sleep, wait_for
+from json import loads
+from os import path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from transport_tycoon.service import parseRequest, Request, requestService, SimulationService
+
+
+class ServiceTest(TestCase):
+
+    def testThatRequestsAreManifestsOrObjects(self):
+        self.assertEqual(parseRequest('AABABBAB\n', 3), Request(3, 'AABABBAB'))
+        self.assertEqual(parseRequest('{"id": "x", "manifest": "AB", "events": true}', 3), Request('x', 'AB', True))
+        self.assertEqual(parseRequest('{"manifest": "AB"}', 3), Request(3, 'AB'))
+        with self.assertRaises(ValueError):
+            parseRequest('{"destinations": "AB"}', 3)
+        with self.assertRaises(ValueError):
+            parseRequest('{"manifest": ', 3)
+
+    def testThatEveryLineIsAnsweredInBatches(self):
+        lines = iter(['ABBBABAAABBB\n', '\n', '{"id": "x", "manifest": "AB", "events": true}\n', 'AC\n', '{}\n', 'A\n', ''])
+        replies = []
+
+        async def readLine() -> str:
+            return next(lines)
+
+        async def serve():
+            async with SimulationService(workers=2, batchSize=2) as service:
+                await service.serveLines(readLine, replies.append)
+
+        run(serve())
+
+        replies = {reply['id']: reply for reply in map(loads, replies)}
+        self.assertEqual(replies[0]['hours'], 39.0)
+        self.assertEqual(replies['x']['hours'], 9.0)
+        self.assertEqual(len(replies['x']['events']), 18)
+        self.assertEqual(replies[2]['error'], 'Unknown location codes: C')
+        self.assertIn('error', replies[3])
+        self.assertEqual(replies[4]['hours'], 9.0)
+
+    def testThatConnectionsOfAUnixSocketAreServed(self):
+
+        async def serveAndRequest(socketPath: str):
+            async with SimulationService(workers=2) as service:
+                serving = ensure_future(service.serveUnix(socketPath))
+                while not path.exists(socketPath):
+                    await sleep(0.01)
+
+                try:
+                    return await wait_for(requestService(socketPath, ['AB', 'BB', 'AABABBAB']), 30)
+                finally:
+                    serving.cancel()
+
+        with TemporaryDirectory() as directory:
+            replies = run(serveAndRequest(path.join(directory, 'service.sock')))
+
+        self.assertEqual(sorted((reply['id'], reply['hours']) for reply in replies), [(0, 9.0), (1, 5.0), (2, 37.0)])
+
+    def testThatRequestsNotBatchedYetAreCancelledOnExit(self):
+
+        async def submitAndExit():
+            async with SimulationService(workers=1, batchSize=2, batchWindow=60) as service:
+                submitted = ensure_future(service.submit(Request(0, 'AB')))
+                await sleep(0)
+            await sleep(0)
+            return submitted
+
+        self.assertTrue(run(submitAndExit()).cancelled())
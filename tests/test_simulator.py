@@ -0,0 +1,59 @@
+from asyncio import run
+from typing import Sequence
+from unittest import TestCase
+
+from transport_tycoon.common.simulator import Engine
+from transport_tycoon.common.sinks import EventCounter
+from transport_tycoon.common.stats import SimulationStats
+from transport_tycoon.common.util import Duration, TickClock
+from transport_tycoon.event_adapter import eventToDict
+from transport_tycoon.usecase import useCase
+
+
+class SimulatorTest(TestCase):
+
+    def _run(self, *destinationCodes, engine: Engine) -> Sequence[dict]:
+        occurredEvents = run(useCase(*destinationCodes, engine=engine))
+        return [eventToDict(event, occurredEvents[0].occurredAt) for event in occurredEvents]
+
+    def testThatGeneratorEngineReproducesAsyncioEventSequence(self):
+        for destinationCodes in ('A', 'AB', 'BB', 'ABB', 'AABABBAB', 'ABBBABAAABBB'):
+            with self.subTest(destinationCodes):
+                self.assertEqual(self._run(*destinationCodes, engine=Engine.generator),
+                                 self._run(*destinationCodes, engine=Engine.asyncio))
+
+    def testThatTickClockReproducesDateTimeClockEventSequence(self):
+        clock = TickClock(resolution=Duration(minutes=15))
+        for destinationCodes in ('A', 'AB', 'AABABBAB', 'ABBBABAAABBB'):
+            with self.subTest(destinationCodes):
+                occurredEvents = run(useCase(*destinationCodes, engine=Engine.generator, clock=clock))
+                self.assertIsInstance(occurredEvents[-1].occurredAt, int)
+                self.assertEqual([eventToDict(event, clock.origin(), clock) for event in occurredEvents],
+                                 self._run(*destinationCodes, engine=Engine.asyncio))
+
+    def testThatSinksReceiveEventsAsTheyOccur(self):
+        counter, received = EventCounter(), []
+        occurredEvents = run(useCase(*'ABBBABAAABBB', engine=Engine.generator, sinks=[counter, received.append]))
+        self.assertEqual(received, list(occurredEvents))
+        self.assertEqual(counter.total, len(occurredEvents))
+        self.assertEqual(counter.counts['CargoesLoaded'], counter.counts['CargoesUnloaded'])
+
+    def testThatEventsAreNotKeptOnDemand(self):
+        counter = EventCounter()
+        self.assertEqual(run(useCase(*'ABBBABAAABBB', sinks=[counter], keepEvents=False)), [])
+        self.assertEqual(counter.total, 90)
+
+    def testThatStatsAreCollectedOnDemand(self):
+        for engine in Engine:
+            with self.subTest(engine):
+                stats = SimulationStats()
+                occurredEvents = run(useCase(*'ABBBABAAABBB', engine=engine, stats=stats))
+
+                self.assertEqual(sum(stats.eventsByClass.values()), len(occurredEvents))
+                self.assertEqual(set(stats.handlerTime), {'Transport.whenArrived', 'Transport.whenDeparted',
+                                                           'Transport.whenLoaded', 'Transport.whenUnloaded'})
+                self.assertGreater(stats.maxQueueDepth, 0)
+                self.assertGreater(stats.suspends, 0)
+                self.assertLessEqual(stats.resumes, stats.suspends)
+                self.assertEqual(stats.routingMisses, 2)
+                self.assertEqual(stats.routingHits + stats.routingMisses, stats.eventsByClass['CargoesLoaded'])
@@ -0,0 +1,45 @@
+from unittest import TestCase
+
+from transport_tycoon.common.simulator import Engine, runSynchronously
+from transport_tycoon.common.util import TickClock
+from transport_tycoon.dom import CargoesUnloaded, Vessel
+from transport_tycoon.event_adapter import eventToDict
+from transport_tycoon.scenario import build, exerciseScenario, World
+from transport_tycoon.snapshot import proceedTill, resume, resumeInProcesses, Snapshot
+
+
+CLOCK = TickClock()
+
+
+async def addVessel(world: World):
+    await Vessel(world.simulator, 'Vessel 2', world.transportMap).startJourneyFrom(world.warehouses['Port'])
+
+
+class SnapshotTest(TestCase):
+
+    def setUp(self):
+        self.world = runSynchronously(build(exerciseScenario('ABBBABAAABBB'), Engine.generator, CLOCK))
+        self.prefix = runSynchronously(proceedTill(self.world, CLOCK.hours(12)))
+        self.snapshot = Snapshot(self.world)
+
+    def _dicts(self, occurredEvents):
+        return [eventToDict(event, CLOCK.origin(), CLOCK) for event in occurredEvents]
+
+    def _lastDeliveryTo(self, locationCode, occurredEvents):
+        return max(event.occurredAt for event in occurredEvents
+                   if isinstance(event, CargoesUnloaded) and event.toWarehouse.locationCode == locationCode)
+
+    def testThatResumedBranchContinuesTheOriginalRun(self):
+        branch = runSynchronously(resume(self.snapshot))
+        suffix = runSynchronously(self.world.simulator.proceed(self.world.allCargoesDelivered))
+
+        self.assertEqual(self.prefix[-1].occurredAt, CLOCK.hours(12))
+        self.assertEqual(self._dicts(branch), self._dicts(suffix))
+        self.assertEqual(branch[-1].occurredAt, CLOCK.hours(39))
+
+    def testThatBranchesDivergeFromTheSnapshot(self):
+        withOneVessel, withTwoVessels = resumeInProcesses(self.snapshot, [None, addVessel], workers=2)
+
+        self.assertEqual(self._lastDeliveryTo('A', withOneVessel), CLOCK.hours(37))
+        self.assertEqual(self._lastDeliveryTo('A', withTwoVessels), CLOCK.hours(35))
+        self.assertIn('Vessel 2', {event.source.name for event in withTwoVessels})
@@ -0,0 +1,40 @@
+from random import Random
+from unittest import skipIf, TestCase
+
+from transport_tycoon import sweep as sweeps
+from transport_tycoon.scenario import exerciseScenario, TransportSpec
+from transport_tycoon.sweep import simulateDeliveries, sweep
+
+
+class SweepTest(TestCase):
+
+    def testThatManifestsAreSimulatedWithoutNumPy(self):
+        manifests = [list('ABBBABAAABBB'), [], list('A'), list('BB')]
+
+        self.assertEqual(sweep(exerciseScenario(()), manifests, vectorized=False, workers=2), [39.0, 0.0, 9.0, 5.0])
+
+    @skipIf(sweeps.numpy is None, 'NumPy is not installed')
+    def testThatLockstepScheduleMatchesTheSimulation(self):
+        rnd = Random(5)
+        manifests = [[rnd.choice('AB') for _ in range(rnd.randint(0, 20))] for _ in range(100)]
+        scenario = exerciseScenario(())
+        for fleet in (scenario.fleet,
+                      (*scenario.fleet, TransportSpec('vessel', 'Vessel 2', 'Port')),
+                      (*scenario.fleet, TransportSpec('truck', 'Truck 3', 'Factory'))):
+            with self.subTest(fleet=[spec.name for spec in fleet]):
+                scenario = scenario._replace(fleet=fleet)
+                deliveredAt = sweeps.LockstepSchedule(scenario)(manifests)
+
+                self.assertEqual([[hrs for hrs in row if hrs == hrs] for row in deliveredAt.tolist()],
+                                 [simulateDeliveries(scenario, manifest) for manifest in manifests])
+
+    @skipIf(sweeps.numpy is None, 'NumPy is not installed')
+    def testThatUnfittingScenariosAreSimulated(self):
+        scenario = exerciseScenario(())
+        servingVessel = (*scenario.fleet[:2], scenario.fleet[2]._replace(serves=['A']))
+        loadedTrucks = (*(spec._replace(capacity=3) for spec in scenario.fleet[:2]), scenario.fleet[2])
+        for fleet, manifest, hours in ((servingVessel, 'ABBBABAAABBB', 39.0), (loadedTrucks, 'BBBBBB', 5.0)):
+            with self.subTest(manifest=manifest):
+                with self.assertRaises(ValueError):
+                    sweep(scenario._replace(fleet=fleet), [list(manifest)], vectorized=True)
+                self.assertEqual(sweep(scenario._replace(fleet=fleet), [list(manifest)], workers=1), [hours])
@@ -0,0 +1,67 @@
+from logging import ERROR, getLogger, INFO
+from unittest import TestCase
+
+from transport_tycoon.common.simulator import Engine, runSynchronously, Simulator
+from transport_tycoon.common.tracing import RING_SIZE, Tracer
+from transport_tycoon.common.util import TickClock
+from transport_tycoon.scenario import exerciseScenario, simulate
+
+
+CLOCK = TickClock()
+LOGGER = 'transport_tycoon.common.simulator'
+
+
+class TracingTest(TestCase):
+
+    def _simulate(self, tracer=None, sinks=()):
+        return runSynchronously(simulate(exerciseScenario('ABBBABAAABBB'), Engine.generator, CLOCK, sinks, tracer=tracer))
+
+    def testThatNothingIsTracedUnlessTheLoggerEmits(self):
+        self.assertIsNone(Simulator(CLOCK.origin(), engine=Engine.generator, clock=CLOCK).tracer)
+
+    def testThatEveryEventIsTracedIfTheLoggerEmits(self):
+        with self.assertLogs(LOGGER, INFO) as logs:
+            occurredEvents = self._simulate()
+
+        self.assertEqual([record.event for record in logs.records], list(occurredEvents))
+        self.assertEqual(logs.records[0].getMessage(), f'At 0h an event {occurredEvents[0]!r} occurred')
+
+    def testThatEventsAreSampled(self):
+        with self.assertLogs(LOGGER, INFO) as logs:
+            occurredEvents = self._simulate(Tracer(getLogger(LOGGER), CLOCK, every=3, transports={'Vessel 1'}))
+
+        expectedEvents = [anEvent for seq, anEvent in enumerate(occurredEvents, 1)
+                          if seq % 3 == 0 and anEvent.source.name == 'Vessel 1']
+        self.assertTrue(expectedEvents)
+        self.assertEqual([record.event for record in logs.records], expectedEvents)
+
+    def testThatTheLastEventsAreDumpedOnError(self):
+        occurredEvents = []
+
+        def failAfterTenEvents(anEvent):
+            occurredEvents.append(anEvent)
+            if len(occurredEvents) == 10:
+                raise RuntimeError('Failed')
+
+        tracer = Tracer(getLogger(LOGGER), CLOCK, ringSize=4)
+        with self.assertLogs(LOGGER, ERROR) as logs, self.assertRaises(RuntimeError):
+            self._simulate(tracer, [failAfterTenEvents])
+
+        self.assertEqual(list(tracer.recent), occurredEvents[-4:])
+        self.assertEqual(logs.records[0].getMessage(), 'The last 4 events:')
+        self.assertEqual([record.event for record in logs.records[1:]], occurredEvents[-4:])
+
+    def testThatTheLastEventsAreDumpedOnErrorByDefault(self):
+        occurredEvents = []
+
+        def failAfterTwentyEvents(anEvent):
+            occurredEvents.append(anEvent)
+            if len(occurredEvents) == 20:
+                raise RuntimeError('Failed')
+
+        with self.assertLogs(LOGGER, INFO) as logs, self.assertRaises(RuntimeError):
+            self._simulate(sinks=[failAfterTwentyEvents])
+
+        dumped = [record for record in logs.records if record.levelno == ERROR]
+        self.assertEqual(dumped[0].getMessage(), f'The last {RING_SIZE} events:')
+        self.assertEqual([record.event for record in dumped[1:]], occurredEvents[-RING_SIZE:])
@@ -0,0 +1,65 @@
+from asyncio import run, sleep
+from unittest import TestCase
+
+from transport_tycoon.common.simulator import Simulator
+from transport_tycoon.common.util import Clock
+from transport_tycoon.dom import Cargo, CargoSupply, Warehouse
+
+
+class WarehouseTest(TestCase):
+
+    def setUp(self):
+        self.warehouse = Warehouse(Simulator(Clock().origin()), 'Factory')
+        for trackNumber, destinationCode in enumerate('ABBAC'):
+            self.warehouse.bring(Cargo(str(trackNumber), 'Factory', destinationCode))
+
+    def _trackNumbers(self, cargoes):
+        return [cargo.trackNumber for cargo in cargoes]
+
+    def testThatCargoesArePickedInTheOrderTheyHaveBeenBrought(self):
+        self.assertEqual(self._trackNumbers(iter(self.warehouse.pickCargo, None)), ['0', '1', '2', '3', '4'])
+        self.assertTrue(self.warehouse.isEmpty())
+
+    def testThatCargoesArePickedForTheGivenDestinations(self):
+        self.assertEqual(self.warehouse.pickCargo(['B', 'C']).trackNumber, '1')
+        self.assertIsNone(self.warehouse.pickCargo(['D']))
+        self.assertEqual(self._trackNumbers(self.warehouse.pickCargoes(10, ['A', 'C'])), ['0', '3', '4'])
+        self.assertEqual(self.warehouse.fullness(), 1)
+
+    def testThatCargoesArePickedInBulk(self):
+        self.assertEqual(self._trackNumbers(self.warehouse.pickCargoes(4)), ['0', '1', '2', '3'])
+        self.assertEqual(self._trackNumbers(self.warehouse.pickCargoes(4)), ['4'])
+        self.assertEqual(self.warehouse.pickCargoes(4), [])
+
+    def testThatSuppliedCargoesArePulledWhenNeeded(self):
+        sim = Simulator(Clock().origin())
+        warehouse = Warehouse(sim, 'Factory')
+        cargoes = (Cargo(str(trackNumber), 'Factory', destinationCode)
+                   for trackNumber, destinationCode in enumerate('ABBAC'))
+        warehouse.supplyFrom(CargoSupply(cargoes, {'Factory': warehouse}, sim.currentTime))
+
+        self.assertEqual(warehouse.pickCargo().trackNumber, '0')
+        self.assertEqual(warehouse.fullness(), 0)
+        self.assertEqual(self._trackNumbers(warehouse.pickCargoes(2, ['A'])), ['3'])
+        self.assertEqual(warehouse.fullness(), 3)
+        self.assertEqual(self._trackNumbers(iter(warehouse.pickCargo, None)), ['1', '2', '4'])
+
+    def testThatABroughtCargoWakesTheFirstProcessWaitingForItsDestination(self):
+        woken = []
+
+        async def waitAndBring():
+            warehouse = Warehouse(Simulator(Clock().origin()), 'Port')
+
+            async def wait(name, destinationCodes):
+                await warehouse.waitForACargo(destinationCodes=destinationCodes)
+                woken.append(name)
+
+            warehouse._sim.newProcessFor(wait('A only', ['A']))
+            warehouse._sim.newProcessFor(wait('any', None))
+            await sleep(0)
+            warehouse.bring(Cargo('0', 'Factory', 'B'))
+            await sleep(0)
+            await sleep(0)
+
+        run(waitAndBring())
+        self.assertEqual(woken, ['any'])
@@ -0,0 +1,72 @@
+from argparse import ArgumentParser, FileType
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from json import dumps
+from typing import Iterable, Iterator, Optional
+
+from transport_tycoon.common.simulator import Engine, runSynchronously
+from transport_tycoon.common.util import TickClock
+from transport_tycoon.dom import LocationCode
+from transport_tycoon.event_adapter import eventToDict
+from transport_tycoon.usecase import useCase
+
+
+CLOCK = TickClock()
+
+
+def manifestLocationCodes(manifest: str) -> Iterable[LocationCode]:
+    return filter(bool, map(str.upper, map(str.strip, manifest)))
+
+
+def simulateManifest(manifest: str, withEvents: bool = False) -> dict:
+    """
+    Simulates the delivery of a manifest, e.g. 'AABABBAB', and reports the
+    total delivery time in hours and, optionally, the occurred events.
+    """
+    rv = {'manifest': manifest}
+    try:
+        occurredEvents = runSynchronously(useCase(*manifestLocationCodes(manifest),
+                                                  engine=Engine.generator,
+                                                  clock=CLOCK))
+    except ValueError as e:
+        rv['error'] = str(e)
+        return rv
+
+    startAt = CLOCK.origin()
+    rv['hours'] = CLOCK.inHours(occurredEvents[-1].occurredAt - startAt) if occurredEvents else 0.0
+    if withEvents:
+        rv['events'] = [eventToDict(event, startAt, CLOCK) for event in occurredEvents]
+
+    return rv
+
+
+def simulateManifests(manifests: Iterable[str],
+                      withEvents: bool = False,
+                      workers: Optional[int] = None,
+                      chunkSize: int = 16
+                      ) -> Iterator[dict]:
+    """
+    Fans the manifests out across worker processes and yields the results
+    in the order of the manifests as soon as they are ready.
+    """
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(partial(simulateManifest, withEvents=withEvents), manifests, chunksize=chunkSize)
+
+
+def readManifests(lines: Iterable[str]) -> Iterator[str]:
+    return filter(bool, map(str.strip, lines))
+
+
+if __name__ == '__main__':
+    import sys
+
+    parser = ArgumentParser(description='Simulates many cargo manifests, one per line, e.g. AABABBAB')
+    parser.add_argument('manifests', nargs='?', type=FileType('r'), default=sys.stdin,
+                        help='a file of manifests, stdin by default')
+    parser.add_argument('--events', action='store_true', help='report the occurred events as well')
+    parser.add_argument('--workers', type=int, default=None, help='number of worker processes')
+    parser.add_argument('--chunk-size', type=int, default=16, help='manifests sent to a worker at once')
+    args = parser.parse_args()
+
+    for result in simulateManifests(readManifests(args.manifests), args.events, args.workers, args.chunk_size):
+        print(dumps(result), flush=True)
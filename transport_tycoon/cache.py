@@ -0,0 +1,237 @@
+"""
+A content-addressed cache of simulation results.
+
+A result is keyed by a canonical hash of the scenario (warehouses, segments,
+fleet and the cargoes in their order), the event ordering and the engine
+version, a hash of the sources of the modules the results depend on, so a
+change of the simulator invalidates the cached results by itself.
+
+Results are kept in an in-memory LRU tier and, if a directory is given, on
+disk: per key a compact JSON of the makespan and the KPIs, and optionally
+the zlib-compressed JSON lines of the events. The least recently used
+entries are evicted once the directory is over its size. A hit does not
+build a simulator.
+
+    python -m transport_tycoon.cache [--dir DIR] [--max-bytes N] [--events] MANIFEST...
+"""
+from collections import OrderedDict
+from hashlib import sha256
+from importlib import import_module
+from inspect import getsourcefile
+from json import dumps, loads
+from os import replace, utime
+from pathlib import Path
+from tempfile import NamedTemporaryFile
+from typing import Dict, List, NamedTuple, Optional, Tuple, Union
+from zlib import compress, decompress, error as ZlibError
+
+from transport_tycoon.common.simulator import Engine, Ordering, runSynchronously
+from transport_tycoon.common.util import TickClock
+from transport_tycoon.event_adapter import eventToDict
+from transport_tycoon.scenario import build, Scenario
+
+
+__all__ = ('CachedResult', 'ENGINE_VERSION', 'ResultCache', 'scenarioKey', 'simulateCached')
+
+
+CLOCK = TickClock()
+
+ENGINE_MODULES = (
+    'transport_tycoon.common.metrics',
+    'transport_tycoon.common.simulator',
+    'transport_tycoon.common.util',
+    'transport_tycoon.dom.map',
+    'transport_tycoon.dom.transport.events',
+    'transport_tycoon.dom.transport.transports',
+    'transport_tycoon.dom.warehouse',
+    'transport_tycoon.event_adapter',
+    'transport_tycoon.scenario',
+)
+
+
+def engineVersion() -> str:
+    digest = sha256()
+    for moduleName in ENGINE_MODULES:
+        digest.update(Path(getsourcefile(import_module(moduleName))).read_bytes())
+
+    return digest.hexdigest()[:16]
+
+
+ENGINE_VERSION = engineVersion()
+
+
+class CachedResult(NamedTuple):
+    hours: float
+    kpis: dict
+    events: Optional[List[dict]] = None
+
+
+def scenarioKey(scenario: Scenario, ordering: Ordering = Ordering.fifo) -> str:
+    digest = sha256()
+    digest.update(dumps({
+        'engine': ENGINE_VERSION,
+        'ordering': ordering.name,
+        'warehouses': list(scenario.warehouses),
+        'segments': [[seg.origin, seg.destination, seg.hours, seg.shipmentOption.name] for seg in scenario.segments],
+        'fleet': [[spec.kind, spec.name, spec.startAt, spec.capacity, spec.hoursToLoad, spec.hoursToUnload,
+                   None if spec.serves is None else sorted(spec.serves)] for spec in scenario.fleet],
+    }, separators=(',', ':')).encode())
+    for aCargo in scenario.cargoes:
+        digest.update(f'\n{aCargo.trackNumber}\0{aCargo.originCode}\0{aCargo.destinationCode}'.encode())
+
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    Looks a result up in memory, then on disk, promoting disk hits to the
+    memory tier. Another process sharing the directory sees the entries
+    written by this one, but evicts only by what it has seen itself.
+    """
+
+    def __init__(self,
+                 directory: Optional[Union[str, Path]] = None,
+                 memoryEntries: int = 256,
+                 maxBytes: int = 64 << 20
+                 ):
+        self.__memory: 'OrderedDict[str, CachedResult]' = OrderedDict()
+        self.__memoryEntries = memoryEntries
+        self.__directory = None if directory is None else Path(directory)
+        self.__maxBytes = maxBytes
+        self.__sizes: 'OrderedDict[str, int]' = OrderedDict()
+        self.__bytes = 0
+        self.hits = 0
+        self.misses = 0
+        if self.__directory is not None:
+            self.__directory.mkdir(parents=True, exist_ok=True)
+            self.__index()
+
+    def __paths(self, key: str) -> Tuple[Path, Path]:
+        folder = self.__directory / key[:2]
+        return folder / f'{key}.json', folder / f'{key}.events.z'
+
+    def __index(self):
+        entries: Dict[str, Tuple[float, int]] = {}
+        for path in self.__directory.glob('*/*'):
+            if path.name.endswith('.tmp'):
+                continue
+            key = path.name.split('.', 1)[0]
+            usedAt, size = entries.get(key, (0.0, 0))
+            stat = path.stat()
+            entries[key] = (max(usedAt, stat.st_mtime), size + stat.st_size)
+
+        for key, (_, size) in sorted(entries.items(), key=lambda entry: entry[1][0]):
+            self.__sizes[key] = size
+            self.__bytes += size
+
+    def get(self, key: str, withEvents: bool = False) -> Optional[CachedResult]:
+        result = self.__memory.get(key)
+        if result is not None and (result.events is not None or not withEvents):
+            self.__memory.move_to_end(key)
+            self.hits += 1
+            return result
+
+        result = self.__load(key, withEvents)
+        if result is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.__remember(key, result)
+        return result
+
+    def put(self, key: str, result: CachedResult):
+        self.__remember(key, result)
+        if self.__directory is not None:
+            self.__store(key, result)
+
+    def __remember(self, key: str, result: CachedResult):
+        self.__memory[key] = result
+        self.__memory.move_to_end(key)
+        while len(self.__memory) > self.__memoryEntries:
+            self.__memory.popitem(last=False)
+
+    def __load(self, key: str, withEvents: bool) -> Optional[CachedResult]:
+        if self.__directory is None:
+            return None
+
+        resultPath, eventsPath = self.__paths(key)
+        try:
+            result = CachedResult(**loads(resultPath.read_bytes()))
+            if withEvents:
+                result = result._replace(events=[loads(line) for line in decompress(eventsPath.read_bytes()).splitlines()])
+            utime(resultPath)
+        except (FileNotFoundError, ValueError, ZlibError):
+            return None
+
+        if key not in self.__sizes:
+            size = sum(path.stat().st_size for path in (resultPath, eventsPath) if path.exists())
+            self.__sizes[key] = size
+            self.__bytes += size
+        self.__sizes.move_to_end(key)
+        return result
+
+    def __store(self, key: str, result: CachedResult):
+        resultPath, eventsPath = self.__paths(key)
+        resultPath.parent.mkdir(exist_ok=True)
+        size = self.__write(resultPath, dumps({'hours': result.hours, 'kpis': result.kpis}, separators=(',', ':')).encode())
+        if result.events is not None:
+            lines = '\n'.join(dumps(anEvent, separators=(',', ':')) for anEvent in result.events)
+            size += self.__write(eventsPath, compress(lines.encode(), 6))
+        elif eventsPath.exists():
+            size += eventsPath.stat().st_size
+
+        self.__bytes += size - self.__sizes.pop(key, 0)
+        self.__sizes[key] = size
+        while self.__bytes > self.__maxBytes and len(self.__sizes) > 1:
+            self.__evict(next(iter(self.__sizes)))
+
+    @staticmethod
+    def __write(path: Path, data: bytes) -> int:
+        with NamedTemporaryFile(dir=path.parent, prefix=f'.{path.name}', suffix='.tmp', delete=False) as file:
+            file.write(data)
+        replace(file.name, path)
+        return len(data)
+
+    def __evict(self, key: str):
+        self.__bytes -= self.__sizes.pop(key)
+        for path in self.__paths(key):
+            path.unlink(missing_ok=True)
+
+    @property
+    def bytesOnDisk(self) -> int:
+        return self.__bytes
+
+
+def simulateCached(scenario: Scenario, cache: ResultCache, withEvents: bool = False) -> CachedResult:
+    """
+    The cached result of the scenario, simulated on a miss.
+    """
+    key = scenarioKey(scenario)
+    result = cache.get(key, withEvents)
+    if result is not None:
+        return result
+
+    world = runSynchronously(build(scenario, Engine.generator, CLOCK))
+    occurredEvents = runSynchronously(world.simulator.proceed(world.allCargoesDelivered, keepEvents=withEvents))
+    result = CachedResult(CLOCK.inHours(world.simulator.currentTime - CLOCK.origin()) if len(scenario.cargoes) else 0.0,
+                          world.metrics.asDict(),
+                          [eventToDict(anEvent, CLOCK.origin(), CLOCK) for anEvent in occurredEvents] if withEvents else None)
+    cache.put(key, result)
+    return result
+
+
+if __name__ == '__main__':
+    from argparse import ArgumentParser
+    from transport_tycoon.scenario import exerciseScenario
+
+    parser = ArgumentParser(description='Simulates the manifests of the exercise through a result cache')
+    parser.add_argument('manifests', nargs='+', help='destinations of the cargoes, e.g. ABBBABAAABBB')
+    parser.add_argument('--dir', default=str(Path.home() / '.cache' / 'transport-tycoon'))
+    parser.add_argument('--max-bytes', type=int, default=64 << 20)
+    parser.add_argument('--events', action='store_true', help='report (and cache) the occurred events too')
+    args = parser.parse_args()
+
+    cache = ResultCache(args.dir, maxBytes=args.max_bytes)
+    for manifest in args.manifests:
+        print(dumps(dict(simulateCached(exerciseScenario(list(manifest)), cache, args.events)._asdict(), manifest=manifest)))
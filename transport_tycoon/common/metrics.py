@@ -0,0 +1,221 @@
+from typing import Dict, NamedTuple as Cargo, Optional, Union
+
+from transport_tycoon.common.util import Clock, Duration, Time
+
+
+__all__ = ('DeliveryMetrics', 'TransportMetrics')
+
+
+class TransportMetrics:
+    """
+    Accumulated times of a transport in clock units, updated as the
+    transport waits, handles cargoes and travels.
+    """
+
+    def __init__(self, name: str, zero: Duration):
+        self.name = name
+        self.idle = zero
+        self.handling = zero
+        self.travelling = zero
+        self.travellingLoaded = zero
+        self.trips = 0
+        self.cargoesLoaded = 0
+        self.waitingSince: Optional[Time] = None
+        self.departedAt: Optional[Time] = None
+        self.departedLoaded = False
+
+
+class DeliveryMetrics:
+    """
+    Delivery KPIs kept up to date by the warehouses and the transports while
+    the simulation runs, so they are available mid-run or at the end in O(1)
+    without a pass over the occurred events: the number of delivered cargoes,
+    lead times from being brought to the origin till being delivered, and
+    the idle time and utilization of every transport.
+
+    The lead time of every cargo is kept only if `perCargo` is on, otherwise
+    only the total and the maximum.
+    """
+
+    def __init__(self, clock: Clock = Clock(), perCargo: bool = False):
+        self.__clock = clock
+        self.__zero = clock.duration(Duration())
+        self.__perCargo = perCargo
+        self.__startedAt: Optional[Time] = None
+        self.__now: Optional[Time] = None
+        self.__broughtAt: Dict[str, Time] = {}
+        self.brought = 0
+        self.delivered = 0
+        self.totalLeadTime = self.__zero
+        self.maxLeadTime = self.__zero
+        self.leadTimes: Dict[str, Duration] = {}
+        self.transports: Dict[object, TransportMetrics] = {}
+
+    def __transport(self, source) -> TransportMetrics:
+        transport = self.transports.get(source)
+        if transport is None:
+            transport = self.transports[source] = TransportMetrics(source.name, self.__zero)
+
+        return transport
+
+    def transport(self, source: Union[object, str]) -> TransportMetrics:
+        """
+        The metrics of a transport, or of the only transport with the name.
+        Transports are told apart by identity, as names may repeat. Raises
+        `KeyError` for a transport without metrics.
+        """
+        if not isinstance(source, str):
+            return self.transports[source]
+
+        found = [transport for transport in self.transports.values() if transport.name == source]
+        if len(found) != 1:
+            raise KeyError(f'{len(found)} transports named {source!r}')
+
+        return found[0]
+
+    def __tick(self, now: Time):
+        if self.__startedAt is None:
+            self.__startedAt = now
+        if self.__now is None or now > self.__now:
+            self.__now = now
+
+    #
+    # Updates:
+    #
+    def cargoBrought(self, aCargo: Cargo, locationCode: str, now: Time):
+        self.__tick(now)
+        if aCargo.destinationCode == locationCode:
+            leadTime = now - self.__broughtAt.pop(aCargo.trackNumber, self.__startedAt)
+            self.delivered += 1
+            self.totalLeadTime += leadTime
+            if leadTime > self.maxLeadTime:
+                self.maxLeadTime = leadTime
+            if self.__perCargo:
+                self.leadTimes[aCargo.trackNumber] = leadTime
+        elif aCargo.originCode == locationCode:
+            self.brought += 1
+            if now != self.__startedAt:
+                self.__broughtAt[aCargo.trackNumber] = now
+
+    def waitingStarted(self, source, now: Time):
+        self.__tick(now)
+        transport = self.__transport(source)
+        if transport.waitingSince is None:
+            transport.waitingSince = now
+
+    def waitingStopped(self, source, now: Time):
+        self.__tick(now)
+        transport = self.__transport(source)
+        if transport.waitingSince is not None:
+            transport.idle += now - transport.waitingSince
+            transport.waitingSince = None
+
+    def cargoesLoaded(self, source, count: int, duration: Duration):
+        transport = self.__transport(source)
+        transport.cargoesLoaded += count
+        transport.handling += duration
+
+    def cargoesUnloaded(self, source, duration: Duration):
+        self.__transport(source).handling += duration
+
+    def departed(self, source, loaded: bool, now: Time):
+        self.__tick(now)
+        transport = self.__transport(source)
+        transport.departedAt = now
+        transport.departedLoaded = loaded
+
+    def arrived(self, source, now: Time):
+        self.__tick(now)
+        transport = self.__transport(source)
+        if transport.departedAt is None:
+            return
+
+        travelled = now - transport.departedAt
+        transport.travelling += travelled
+        if transport.departedLoaded:
+            transport.travellingLoaded += travelled
+        transport.trips += 1
+        transport.departedAt = None
+
+    #
+    # Queries:
+    #
+    def allDelivered(self, cargoesToDeliver: Optional[int] = None) -> bool:
+        return self.delivered == (self.brought if cargoesToDeliver is None else cargoesToDeliver)
+
+    @property
+    def elapsed(self) -> Duration:
+        if self.__startedAt is None:
+            return self.__zero
+
+        return self.__now - self.__startedAt
+
+    def meanLeadTimeInHours(self) -> float:
+        if not self.delivered:
+            return 0.0
+
+        return self.__clock.inHours(self.totalLeadTime) / self.delivered
+
+    def leadTimeInHours(self, trackNumber: str) -> Optional[float]:
+        leadTime = self.leadTimes.get(trackNumber)
+        return None if leadTime is None else self.__clock.inHours(leadTime)
+
+    def idleHours(self, source: Union[object, str]) -> float:
+        return self.__idleHours(self.transport(source))
+
+    def __idleHours(self, transport: TransportMetrics) -> float:
+        idle = transport.idle
+        if transport.waitingSince is not None:
+            idle += self.__now - transport.waitingSince
+
+        return self.__clock.inHours(idle)
+
+    def utilization(self, source: Union[object, str]) -> float:
+        """
+        The share of the elapsed time the transport has travelled loaded.
+        """
+        return self.__utilization(self.transport(source))
+
+    def __utilization(self, transport: TransportMetrics) -> float:
+        elapsed = self.__clock.inHours(self.elapsed)
+        if not elapsed:
+            return 0.0
+
+        travellingLoaded = transport.travellingLoaded
+        if transport.departedAt is not None and transport.departedLoaded:
+            travellingLoaded += self.__now - transport.departedAt
+
+        return self.__clock.inHours(travellingLoaded) / elapsed
+
+    def __uniqueNames(self) -> Dict[str, TransportMetrics]:
+        """
+        The transports by name, the second and later of a name as 'name #2'...
+        """
+        rv = {}
+        counts: Dict[str, int] = {}
+        for transport in self.transports.values():
+            count = counts[transport.name] = counts.get(transport.name, 0) + 1
+            rv[transport.name if count == 1 else f'{transport.name} #{count}'] = transport
+
+        return rv
+
+    def asDict(self) -> dict:
+        clock = self.__clock
+        return {
+            'elapsedHours': clock.inHours(self.elapsed),
+            'brought': self.brought,
+            'delivered': self.delivered,
+            'meanLeadTimeHours': self.meanLeadTimeInHours(),
+            'maxLeadTimeHours': clock.inHours(self.maxLeadTime),
+            'transports': {
+                name: {
+                    'trips': transport.trips,
+                    'cargoesLoaded': transport.cargoesLoaded,
+                    'idleHours': self.__idleHours(transport),
+                    'handlingHours': clock.inHours(transport.handling),
+                    'travellingHours': clock.inHours(transport.travelling),
+                    'utilization': self.__utilization(transport),
+                }
+                for name, transport in self.__uniqueNames().items()
+            },
+        }
@@ -1,34 +1,223 @@
-from asyncio import sleep
-from asyncio.queues import PriorityQueue
+from asyncio import ensure_future, sleep
+from asyncio.locks import Event as AsyncioWaiter
+from collections import deque
+from enum import auto, Enum
+from heapq import heapify, heappop, heappush
 from logging import getLogger
-from typing import Callable, Coroutine, NamedTuple as Event, Sequence
+from typing import Callable, Coroutine, Deque, Dict, List, NamedTuple as Event, Optional, Sequence, Tuple
 
-from transport_tycoon.common.util import Duration, Time
+from transport_tycoon.common.metrics import DeliveryMetrics
+from transport_tycoon.common.sinks import Sink
+from transport_tycoon.common.stats import SimulationStats
+from transport_tycoon.common.tracing import Tracer
+from transport_tycoon.common.util import Clock, Duration, Time
 
 
 LOG = getLogger(__name__)
 
 
+class Engine(Enum):
+    asyncio = auto()
+    generator = auto()
+
+
+class Ordering(Enum):
+    """
+    How events occurring at the same time are ordered: `fifo` as they have
+    been scheduled, `causal` by the rank of the event being processed when
+    they have been scheduled (its cause), then by the number of events the
+    cause has scheduled. Both give the same order, but the causal tie break
+    only depends on the cause, so the events can be processed by several
+    simulators which agree on the ranks, see `transport_tycoon.partition`.
+    """
+    fifo = auto()
+    causal = auto()
+
+
+Handler = Callable[[object, Event], Coroutine]
+
+
+def handledBy(handlerName: str):
+    """
+    Declares the method of the event source which handles the event class,
+    so the simulator dispatches events through a table instead of `when`.
+    """
+
+    def declare(eventClass: type) -> type:
+        eventClass.handlerName = handlerName
+        return eventClass
+
+    return declare
+
+
+def handlerFor(sourceClass: type, eventClass: type) -> Handler:
+    handlerName = getattr(eventClass, 'handlerName', None)
+    if handlerName is None:
+        return sourceClass.when
+
+    return getattr(sourceClass, handlerName)
+
+
+class Waiter:
+    """
+    A one-shot wake-up flag for the generator engine. A process awaiting it
+    is parked until the flag is set, then it is put back to the ready queue.
+    """
+
+    def __init__(self, readyProcesses: Deque[Coroutine]):
+        self.__readyProcesses = readyProcesses
+        self.__process = None
+        self.__isSet = False
+
+    def __await__(self):
+        if not self.__isSet:
+            yield self
+
+    def wait(self) -> 'Waiter':
+        return self
+
+    def park(self, process: Coroutine):
+        self.__process = process
+
+    def set(self):
+        self.__isSet = True
+        if self.__process is not None:
+            self.__readyProcesses.append(self.__process)
+            self.__process = None
+
+
 class Simulator:
     currentTime: Time
 
     Pred = Callable[[], bool]
     SpawnProcess = Callable[[Coroutine], None]
 
-    def __init__(self, startAt: Time, spawn: SpawnProcess):
+    def __init__(self,
+                 startAt: Time,
+                 spawn: SpawnProcess = ensure_future,
+                 engine: Engine = Engine.asyncio,
+                 clock: Clock = Clock(),
+                 stats: Optional[SimulationStats] = None,
+                 tracer: Optional[Tracer] = None,
+                 metrics: Optional[DeliveryMetrics] = None,
+                 ordering: Ordering = Ordering.fifo
+                 ):
         self.__processesReadyToGo = 0
         self.__spawn = spawn
-        self.__eventsQueue = PriorityQueue()
+        self.__engine = engine
+        self.__clock = clock
+        self.__eventsQueue = []
+        self.__readyProcesses: Deque[Coroutine] = deque()
+        self.__sinks: List[Sink] = []
+        self.__handlers: Dict[Tuple[type, type], Handler] = {}
+        self.__stats = stats
+        self.__metrics = metrics
+        self.__tracer = Tracer.ifEnabled(LOG, clock) if tracer is None else tracer
         self.currentTime = startAt
+        self.currentTieBreak = None
         self.__eventSeq = 0
+        self.__ordering = ordering
+        self.__cause = -1
+        self.__caused = 0
+        self.__rank = 0
+        self.__divert: Optional[Callable[[Tuple], bool]] = None
+
+        if self.__tracer is not None:
+            self.subscribe(self.__tracer)
+        if stats is not None:
+            self.subscribe(stats.countEvent)
+
+    @property
+    def engine(self) -> Engine:
+        return self.__engine
+
+    @property
+    def clock(self) -> Clock:
+        return self.__clock
+
+    @property
+    def stats(self) -> Optional[SimulationStats]:
+        return self.__stats
+
+    @property
+    def metrics(self) -> Optional[DeliveryMetrics]:
+        return self.__metrics
+
+    @property
+    def tracer(self) -> Optional[Tracer]:
+        return self.__tracer
+
+    def subscribe(self, sink: Sink):
+        self.__sinks.append(sink)
+
+    def unsubscribe(self, sink: Sink):
+        self.__sinks.remove(sink)
+
+    def nextEventTime(self) -> Optional[Time]:
+        if not self.__eventsQueue:
+            return None
+
+        return self.__eventsQueue[0][0]
 
     def nextEventSeq(self) -> int:
         self.__eventSeq += 1
         return self.__eventSeq
 
-    async def schedule(self, anEvent: Event, after: Duration = Duration()):
-        willOccurAt = self.currentTime + after
-        await self.__eventsQueue.put((willOccurAt, self.nextEventSeq(), anEvent._replace(occurredAt=willOccurAt)))
+    def rankFrom(self, rank: int):
+        """
+        Ranks the next processed events from the given rank on, with the
+        causal ordering.
+        """
+        self.__rank = rank
+
+    def retie(self, rerank: Callable[[int], int]):
+        """
+        Changes the ranks of the causes in the tie breaks of the queued
+        events, preserving their order, with the causal ordering.
+        """
+        self.__cause = rerank(self.__cause)
+        self.__eventsQueue[:] = [(occursAt, (rerank(cause), caused), anEvent)
+                                 for occursAt, (cause, caused), anEvent in self.__eventsQueue]
+        heapify(self.__eventsQueue)
+
+    def __processing(self):
+        self.__cause = self.__rank
+        self.__caused = 0
+        self.__rank += 1
+
+    async def schedule(self, anEvent: Event, after: Optional[Duration] = None):
+        willOccurAt = self.currentTime if after is None else self.currentTime + after
+        if self.__ordering is Ordering.fifo:
+            tieBreak = self.nextEventSeq()
+        else:
+            self.__caused += 1
+            tieBreak = (self.__cause, self.__caused)
+
+        entry = (willOccurAt, tieBreak, anEvent._replace(occurredAt=willOccurAt))
+        if self.__divert is not None and self.__divert(entry):
+            return
+
+        heappush(self.__eventsQueue, entry)
+
+    def divert(self, hook: Optional[Callable[[Tuple], bool]]):
+        """
+        Lets the hook take scheduled entries (time, tie break, event) away
+        from the queue, e.g. to hand them over to another simulator.
+        """
+        self.__divert = hook
+
+    def inject(self, entry: Tuple):
+        """
+        Queues an entry handed over by another simulator as it is.
+        """
+        heappush(self.__eventsQueue, entry)
+
+    def retain(self, pred: Callable[[Event], bool]):
+        """
+        Drops the queued events the predicate does not hold for.
+        """
+        self.__eventsQueue = [entry for entry in self.__eventsQueue if pred(entry[2])]
+        heapify(self.__eventsQueue)
 
     def suspendProcess(self):
         self.__processesReadyToGo -= 1
@@ -39,16 +228,82 @@ class Simulator:
     def readyToContinue(self) -> bool:
         return self.__processesReadyToGo == 0
 
+    def newWaiter(self):
+        if self.__engine is Engine.generator:
+            return Waiter(self.__readyProcesses)
+
+        return AsyncioWaiter()
+
     def newProcessFor(self, coro: Coroutine):
+        if self.__engine is Engine.generator:
+            return self.__step(coro)
 
         async def fork():
-            await coro
+            try:
+                await coro
+            except Exception:
+                if self.__tracer is not None:
+                    self.__tracer.dump()
+                raise
             self.suspendProcess()
 
         self.resumeProcess()
         return self.__spawn(fork())
 
-    async def proceed(self, till: Pred) -> Sequence[Event]:
+    def __getstate__(self) -> dict:
+        if self.__readyProcesses or self.__engine is not Engine.generator:
+            raise TypeError('Only a settled simulation on the generator engine can be pickled')
+
+        state = self.__dict__.copy()
+        state['_Simulator__sinks'] = []
+        state['_Simulator__handlers'] = {}
+        return state
+
+    def __setstate__(self, state: dict):
+        self.__dict__.update(state)
+        if self.__tracer is not None:
+            self.subscribe(self.__tracer)
+        if self.__stats is not None:
+            self.subscribe(self.__stats.countEvent)
+
+    def processFor(self, anEvent: Event) -> Coroutine:
+        key = (type(anEvent.source), type(anEvent))
+        handler = self.__handlers.get(key)
+        if handler is None:
+            handler = self.__handlers[key] = handlerFor(*key)
+
+        process = handler(anEvent.source, anEvent)
+        if self.__stats is not None:
+            process = self.__stats.timed(handler.__qualname__, process)
+
+        return process
+
+    def __step(self, process: Coroutine):
+        try:
+            waiter = process.send(None)
+        except StopIteration:
+            return
+
+        waiter.park(process)
+
+    async def proceed(self, till: Pred, keepEvents: bool = True) -> Sequence[Event]:
+        """
+        Runs the simulation till the predicate holds or no events left. Every
+        occurred event is passed to the subscribed sinks as it occurs; the
+        events are also collected and returned unless `keepEvents` is off.
+        If a handler fails, the tracer dumps the events which led to it.
+        """
+        try:
+            if self.__engine is Engine.generator:
+                return self.__proceedGenerators(till, keepEvents)
+
+            return await self.__proceedAsyncio(till, keepEvents)
+        except Exception:
+            if self.__tracer is not None:
+                self.__tracer.dump()
+            raise
+
+    async def __proceedAsyncio(self, till: Pred, keepEvents: bool) -> Sequence[Event]:
 
         async def switch():
             await sleep(0)
@@ -60,15 +315,59 @@ class Simulator:
             while not self.readyToContinue():
                 await switch()
 
-            if self.__eventsQueue.empty() or till():
+            if self.__stats is not None:
+                self.__stats.trackQueueDepth(len(self.__eventsQueue))
+
+            if not self.__eventsQueue or till():
                 break
 
-            currentTime, _, anEvent = await self.__eventsQueue.get()
+            currentTime, self.currentTieBreak, anEvent = heappop(self.__eventsQueue)
+            self.currentTime = currentTime
+            if self.__ordering is Ordering.causal:
+                self.__processing()
+
+            for sink in self.__sinks:
+                sink(anEvent)
+
+            self.newProcessFor(self.processFor(anEvent))
+            if keepEvents:
+                occurredEvents.append(anEvent)
+
+        return occurredEvents
+
+    def __proceedGenerators(self, till: Pred, keepEvents: bool) -> Sequence[Event]:
+        eventsQueue = self.__eventsQueue
+        readyProcesses = self.__readyProcesses
+        sinks = self.__sinks
+        stats = self.__stats
+        handlers = self.__handlers
+        step = self.__step
+        causal = self.__ordering is Ordering.causal
+
+        occurredEvents = []
+
+        while eventsQueue and not till():
+            if stats is not None:
+                stats.trackQueueDepth(len(eventsQueue))
+
+            currentTime, self.currentTieBreak, anEvent = heappop(eventsQueue)
             self.currentTime = currentTime
-            LOG.info('At %s an event %r occurred', anEvent.occurredAt.time(), anEvent)
+            if causal:
+                self.__processing()
+
+            for sink in sinks:
+                sink(anEvent)
 
-            self.newProcessFor(anEvent.source.when(anEvent))
-            occurredEvents.append(anEvent)
+            handler = handlers.get((type(anEvent.source), type(anEvent)))
+            if handler is None or stats is not None:
+                step(self.processFor(anEvent))
+            else:
+                step(handler(anEvent.source, anEvent))
+            while readyProcesses:
+                step(readyProcesses.popleft())
+
+            if keepEvents:
+                occurredEvents.append(anEvent)
 
         return occurredEvents
 
@@ -78,3 +377,17 @@ class SimulationObject:
 
     def __init__(self, sim: Simulator):
         self._sim = sim
+
+
+def runSynchronously(coro: Coroutine):
+    """
+    Runs a coroutine which never suspends, e.g. a simulation on the generator
+    engine, without an event loop.
+    """
+    try:
+        coro.send(None)
+    except StopIteration as stop:
+        return stop.value
+
+    coro.close()
+    raise RuntimeError('The coroutine has been suspended, run it in an event loop')
@@ -0,0 +1,24 @@
+from collections import Counter
+from typing import Callable, NamedTuple as Event
+
+
+__all__ = ('EventCounter', 'Sink')
+
+
+Sink = Callable[[Event], None]
+
+
+class EventCounter:
+    """
+    Counts occurred events per event class.
+    """
+
+    def __init__(self):
+        self.counts = Counter()
+
+    @property
+    def total(self) -> int:
+        return sum(self.counts.values())
+
+    def __call__(self, anEvent: Event):
+        self.counts[type(anEvent).__name__] += 1
@@ -0,0 +1,63 @@
+from collections import Counter, defaultdict
+from time import perf_counter
+from types import coroutine
+from typing import Coroutine, Dict, NamedTuple as Event
+
+
+__all__ = ('SimulationStats',)
+
+
+class SimulationStats:
+    """
+    Opt-in counters and timings of a simulation run. Nothing is counted
+    unless an instance is passed to the simulator (and the transport map).
+    """
+
+    def __init__(self):
+        self.eventsByClass: Dict[str, int] = Counter()
+        self.handlerTime: Dict[str, float] = defaultdict(float)
+        self.handlerSteps: Dict[str, int] = Counter()
+        self.maxQueueDepth = 0
+        self.suspends = 0
+        self.resumes = 0
+        self.routingHits = 0
+        self.routingMisses = 0
+
+    def countEvent(self, anEvent: Event):
+        self.eventsByClass[type(anEvent).__name__] += 1
+
+    def trackQueueDepth(self, depth: int):
+        if depth > self.maxQueueDepth:
+            self.maxQueueDepth = depth
+
+    @coroutine
+    def timed(self, handlerName: str, process: Coroutine):
+        """
+        Wraps a handler process to add the wall time of each of its steps,
+        i.e. not counting the time it has been suspended, to the handler.
+        """
+        value = None
+        while True:
+            startedAt = perf_counter()
+            try:
+                yielded = process.send(value)
+            except StopIteration as stop:
+                self.handlerTime[handlerName] += perf_counter() - startedAt
+                self.handlerSteps[handlerName] += 1
+                return stop.value
+
+            self.handlerTime[handlerName] += perf_counter() - startedAt
+            self.handlerSteps[handlerName] += 1
+            value = yield yielded
+
+    def asDict(self) -> dict:
+        return {
+            'eventsByClass': dict(self.eventsByClass),
+            'handlerTime': dict(self.handlerTime),
+            'handlerSteps': dict(self.handlerSteps),
+            'maxQueueDepth': self.maxQueueDepth,
+            'suspends': self.suspends,
+            'resumes': self.resumes,
+            'routingHits': self.routingHits,
+            'routingMisses': self.routingMisses,
+        }
@@ -0,0 +1,120 @@
+from collections import deque
+from logging import DEBUG, ERROR, INFO, Logger, NullHandler
+from typing import Collection, Deque, NamedTuple as Event, Optional
+
+from transport_tycoon.common.util import Clock, Time
+
+
+__all__ = ('Tracer',)
+
+
+RING_SIZE = 16
+
+
+def emitsAt(logger: Logger, level: int) -> bool:
+    """
+    Whether a record of the level would reach a handler which does something
+    with it, i.e. not only the `NullHandler`s.
+    """
+    if not logger.isEnabledFor(level):
+        return False
+
+    while logger is not None:
+        if any(not isinstance(handler, NullHandler) and level >= handler.level for handler in logger.handlers):
+            return True
+        if not logger.propagate:
+            break
+        logger = logger.parent
+
+    return False
+
+
+class FormattedTime:
+    """
+    Formats the time with the clock only if the record is formatted.
+    """
+    __slots__ = ('clock', 'time')
+
+    def __init__(self, clock: Clock, time: Time):
+        self.clock = clock
+        self.time = time
+
+    def __str__(self):
+        return self.clock.format(self.time)
+
+
+class Tracer:
+    """
+    Structured tracing of occurred events, subscribed to the simulator as a
+    sink. The levels are checked once, when the tracer is created; records
+    carry the event as `record.event` and are formatted only if a handler
+    emits them. Only every Nth event, and only the events of the given
+    transports (by name), are traced. The last `ringSize` events are kept
+    regardless and dumped at the error level with `dump()`, which the
+    simulator does when a handler fails.
+    """
+
+    def __init__(self,
+                 logger: Logger,
+                 clock: Clock = Clock(),
+                 level: int = INFO,
+                 every: int = 1,
+                 transports: Optional[Collection[str]] = None,
+                 ringSize: int = RING_SIZE
+                 ):
+        self.__logger = logger
+        self.__clock = clock
+        self.__level = level
+        self.__every = every
+        self.__transports = None if transports is None else frozenset(transports)
+        self.__recent: Deque[Event] = deque(maxlen=ringSize)
+        self.__seq = 0
+        self.tracesEvents = emitsAt(logger, level)
+        self.tracesDetails = emitsAt(logger, DEBUG)
+
+    @classmethod
+    def ifEnabled(cls, logger: Logger, clock: Clock = Clock(), ringSize: int = RING_SIZE) -> Optional['Tracer']:
+        """
+        A tracer of every event, keeping the last `ringSize` ones, if the
+        logger emits them, otherwise none.
+        """
+        if not emitsAt(logger, INFO):
+            return None
+
+        return cls(logger, clock, ringSize=ringSize)
+
+    def traces(self, source) -> bool:
+        return self.__transports is None or getattr(source, 'name', None) in self.__transports
+
+    def __call__(self, anEvent: Event):
+        self.__recent.append(anEvent)
+        if not self.tracesEvents:
+            return
+
+        self.__seq += 1
+        if self.__seq % self.__every or not self.traces(anEvent.source):
+            return
+
+        self.__logger.log(self.__level, 'At %s an event %r occurred',
+                          FormattedTime(self.__clock, anEvent.occurredAt), anEvent, extra={'event': anEvent})
+
+    def detail(self, source, msg: str, *args):
+        """
+        Traces a detail of the source, e.g. an assigned itinerary, at the
+        debug level. Callers check `tracesDetails` first.
+        """
+        if self.traces(source):
+            self.__logger.debug(msg, *args)
+
+    @property
+    def recent(self) -> Collection[Event]:
+        return tuple(self.__recent)
+
+    def dump(self):
+        if not self.__recent:
+            return
+
+        self.__logger.log(ERROR, 'The last %d events:', len(self.__recent))
+        for anEvent in self.__recent:
+            self.__logger.log(ERROR, 'At %s an event %r occurred',
+                              FormattedTime(self.__clock, anEvent.occurredAt), anEvent, extra={'event': anEvent})
@@ -1,9 +1,69 @@
 from datetime import datetime, timedelta
+from typing import Union
 
 
 Duration = timedelta
 Time = datetime
 
+Ticks = int
+
 
 def hours(hrs: int) -> Duration:
     return Duration(hours=hrs)
+
+
+class Clock:
+    """
+    Represents the simulation time as `datetime` and durations as `timedelta`.
+    """
+
+    def origin(self) -> Time:
+        return Time.today().replace(hour=0, minute=0, second=0, microsecond=0)
+
+    def duration(self, dur: Duration) -> Duration:
+        return dur
+
+    def hours(self, hrs: int) -> Duration:
+        return self.duration(hours(hrs))
+
+    def inHours(self, dur: Duration) -> float:
+        return dur.total_seconds() / 3600.0
+
+    def format(self, time: Time) -> str:
+        return str(time.time())
+
+
+class TickClock(Clock):
+    """
+    Represents the simulation time and durations as plain integer ticks
+    of the given resolution, which makes arithmetic and comparisons cheap.
+    """
+
+    def __init__(self, resolution: Duration = hours(1)):
+        self.__resolution = resolution
+        self.__secondsPerTick = int(resolution.total_seconds())
+        if self.__secondsPerTick <= 0 or resolution != Duration(seconds=self.__secondsPerTick):
+            raise ValueError(f'Resolution must be a whole positive number of seconds: {resolution}')
+
+    @property
+    def resolution(self) -> Duration:
+        return self.__resolution
+
+    def origin(self) -> Ticks:
+        return 0
+
+    def duration(self, dur: Union[Duration, Ticks]) -> Ticks:
+        if isinstance(dur, int):
+            return dur
+
+        ticks, remainder = divmod(dur, self.__resolution)
+        if remainder:
+            raise ValueError(f'Duration {dur} is not a multiple of the resolution {self.__resolution}')
+
+        return ticks
+
+    def inHours(self, ticks: Ticks) -> float:
+        return ticks * self.__secondsPerTick / 3600.0
+
+    def format(self, ticks: Ticks) -> str:
+        return f'{self.inHours(ticks):g}h'
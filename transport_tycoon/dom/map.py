@@ -1,9 +1,13 @@
 from enum import auto, Enum
-from itertools import takewhile
+from functools import reduce
+from heapq import heappop, heappush
+from itertools import count, takewhile
+from operator import add
 from typing import Dict, NamedTuple, Optional, Sequence
 
 from transport_tycoon.dom.warehouse import LocationCode, Warehouse
-from transport_tycoon.common.util import Duration
+from transport_tycoon.common.stats import SimulationStats
+from transport_tycoon.common.util import Clock, Duration
 
 
 __all__ = ('Itinerary', 'Segment', 'ShipmentOption', 'TransportMap')
@@ -22,22 +26,41 @@ class Segment(NamedTuple):
 
 
 class Itinerary:
-    def __init__(self, *segments: Segment):
+    """
+    An immutable sequence of segments. Derived itineraries and the total time
+    to travel are computed once and then served from the instance. The total
+    time to travel of no segments is `noTime`, the zero duration of a clock.
+    """
+
+    def __init__(self, *segments: Segment, noTime: Duration = Duration()):
         self.__segments = segments
+        self.__noTime = noTime
+        self.__forShipBy: Dict[ShipmentOption, Itinerary] = {}
+        self.__forComeBack: Optional[Itinerary] = None
+        self.__totalTimeToTravel: Optional[Duration] = None
 
     def forShipBy(self, shipmentType: ShipmentOption) -> 'Itinerary':
 
         def hasTheShipmemtOption(seg: Segment) -> bool:
             return seg.shipmentOption == shipmentType
 
-        return Itinerary(*takewhile(hasTheShipmemtOption, self.segments))
+        itinerary = self.__forShipBy.get(shipmentType)
+        if itinerary is None:
+            itinerary = self.__forShipBy[shipmentType] = Itinerary(*takewhile(hasTheShipmemtOption, self.segments),
+                                                                         noTime=self.__noTime)
+
+        return itinerary
 
     def forComeBack(self) -> 'Itinerary':
 
         def wayBack(seg: Segment) -> Segment:
             return seg._replace(origin=seg.destination, destination=seg.origin)
 
-        return Itinerary(*map(wayBack, self.segments))
+        if self.__forComeBack is None:
+            self.__forComeBack = Itinerary(*map(wayBack, reversed(self.segments)), noTime=self.__noTime)
+            self.__forComeBack.__forComeBack = self
+
+        return self.__forComeBack
 
     @property
     def segments(self) -> Sequence[Segment]:
@@ -63,20 +86,32 @@ class Itinerary:
         def timeToTravel(leg: Segment) -> Duration:
             return leg.timeToTravel
 
-        return sum(map(timeToTravel, self.segments), Duration())
+        if self.__totalTimeToTravel is None:
+            self.__totalTimeToTravel = reduce(add, map(timeToTravel, self.segments), self.__noTime)
+
+        return self.__totalTimeToTravel
 
     def __repr__(self):
         return f'{self.__class__.__name__}({",".join(map(repr, self.segments))})'
 
 
 class TransportMap:
-
-    def __init__(self):
+    """
+    Keeps the segments between warehouses and a routing table of the fastest
+    itineraries. A row of the table is computed on the first request from an
+    origin and the whole table is dropped whenever the graph changes.
+    """
+
+    def __init__(self, stats: Optional[SimulationStats] = None, clock: Clock = Clock()):
+        self.__noTime = clock.duration(Duration())
         self.__graph: Dict[LocationCode, Dict[LocationCode, Segment]] = {}
+        self.__routes: Dict[LocationCode, Dict[LocationCode, Itinerary]] = {}
+        self.__stats = stats
 
     def segment(self, loc1: Warehouse, loc2: Warehouse, timeToTravel: Duration, transportType: ShipmentOption) -> 'TransportMap':
         self.__graph.setdefault(loc1.locationCode, {})[loc2.locationCode] = Segment(loc1, loc2, timeToTravel, transportType)
         self.__graph.setdefault(loc2.locationCode, {})[loc1.locationCode] = Segment(loc2, loc1, timeToTravel, transportType)
+        self.__routes = {}
         return self
 
     def byLand(self, from_: Warehouse, to: Warehouse, timeToTravel: Duration) -> 'TransportMap':
@@ -85,21 +120,50 @@ class TransportMap:
     def bySea(self, from_: Warehouse, to: Warehouse, timeToTravel: Duration):
         return self.segment(from_, to, timeToTravel, ShipmentOption.sea)
 
-    def findItinerary(self, originCode: LocationCode, destinationCode: LocationCode) -> Itinerary:
+    def itinerary(self, *segments: Segment) -> Itinerary:
+        return Itinerary(*segments, noTime=self.__noTime)
+
+    def segmentBetween(self, originCode: LocationCode, destinationCode: LocationCode) -> Segment:
+        return self.__graph[originCode][destinationCode]
 
-        def find(orig: LocationCode, path: tuple = ()):
-            if destinationCode in self.__graph[orig]:
-                return path + (self.__graph[orig][destinationCode],)
+    def findItinerary(self, originCode: LocationCode, destinationCode: LocationCode) -> Itinerary:
+        routes = self.__routes.get(originCode)
+        if routes is None:
+            routes = self.__routes[originCode] = self.__findFastestItinerariesFrom(originCode)
+            if self.__stats is not None:
+                self.__stats.routingMisses += 1
+        elif self.__stats is not None:
+            self.__stats.routingHits += 1
 
-            itinerary = ()
-            for locationCode in self.__graph[orig]:
-                itinerary = find(locationCode, path + (self.__graph[orig][locationCode],))
-                if itinerary:
-                    break
+        itinerary = routes.get(destinationCode)
+        if itinerary is None:
+            return self.itinerary()
 
-            return itinerary
+        return itinerary
 
+    def __findFastestItinerariesFrom(self, originCode: LocationCode) -> Dict[LocationCode, Itinerary]:
         if originCode not in self.__graph:
-            return Itinerary()
-
-        return Itinerary(*find(originCode))
+            return {}
+
+        routes: Dict[LocationCode, Itinerary] = {}
+        visited = {originCode}
+        seq = count()
+        candidates = []
+
+        def reachNeighboursOf(locationCode: LocationCode, timeToTravel: Optional[Duration], path: tuple):
+            for neighbourCode, seg in self.__graph[locationCode].items():
+                if neighbourCode not in visited:
+                    totalTime = seg.timeToTravel if timeToTravel is None else timeToTravel + seg.timeToTravel
+                    heappush(candidates, (totalTime, next(seq), neighbourCode, path + (seg,)))
+
+        reachNeighboursOf(originCode, None, ())
+        while candidates:
+            timeToTravel, _, locationCode, path = heappop(candidates)
+            if locationCode in visited:
+                continue
+
+            visited.add(locationCode)
+            routes[locationCode] = self.itinerary(*path)
+            reachNeighboursOf(locationCode, timeToTravel, path)
+
+        return routes
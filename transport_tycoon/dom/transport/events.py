@@ -1,6 +1,6 @@
 from typing import Sequence
 
-from transport_tycoon.common.simulator import Event
+from transport_tycoon.common.simulator import Event, handledBy
 from transport_tycoon.common.util import Duration, Time
 from transport_tycoon.dom.warehouse import Cargo, Warehouse
 
@@ -8,6 +8,7 @@ from transport_tycoon.dom.warehouse import Cargo, Warehouse
 __all__ = ('TransportArrived', 'TransportDeparted', 'CargoesLoaded', 'CargoesUnloaded')
 
 
+@handledBy('whenArrived')
 class TransportArrived(Event):
     source: object
     atWarehouse: Warehouse
@@ -15,6 +16,7 @@ class TransportArrived(Event):
     occurredAt: Time = None
 
 
+@handledBy('whenDeparted')
 class TransportDeparted(Event):
     source: object
     fromWarehouse: Warehouse
@@ -24,6 +26,7 @@ class TransportDeparted(Event):
     occurredAt: Time = None
 
 
+@handledBy('whenLoaded')
 class CargoesLoaded(Event):
     source: object
     fromWarehouse: Warehouse
@@ -32,6 +35,7 @@ class CargoesLoaded(Event):
     occurredAt: Time = None
 
 
+@handledBy('whenUnloaded')
 class CargoesUnloaded(Event):
     source: object
     toWarehouse: Warehouse
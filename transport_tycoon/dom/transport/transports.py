@@ -1,17 +1,23 @@
-from logging import getLogger
-from typing import List, Optional, overload
+from functools import partial
+from typing import Callable, Collection, Coroutine, Dict, List, NamedTuple, Optional, overload, Tuple
 
-from transport_tycoon.common.simulator import Simulator, SimulationObject
+from transport_tycoon.common.simulator import handlerFor, Simulator, SimulationObject
 from transport_tycoon.common.util import Duration, hours
 from transport_tycoon.dom.map import Itinerary, ShipmentOption, TransportMap
 from transport_tycoon.dom.warehouse import Cargo, LocationCode, Warehouse
 from .events import *
 
 
-__all__ = ('Transport', 'Truck', 'Vessel')
+__all__ = ('Transport', 'TransportState', 'Truck', 'Vessel')
 
 
-LOG = getLogger(__name__)
+class TransportState(NamedTuple):
+    """
+    What a transport carries and the legs of its itinerary by location codes,
+    so another simulator of the same scenario can take the transport over.
+    """
+    cargoes: Tuple[Cargo, ...]
+    legs: Tuple[Tuple[LocationCode, LocationCode], ...]
 
 
 class Transport(SimulationObject):
@@ -19,23 +25,45 @@ class Transport(SimulationObject):
     timeToLoad: Duration = hours(0)
     timeToUnload: Duration = hours(0)
 
+    _handlers: Dict[type, Callable[['Transport', object], Coroutine]] = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._handlers = {}
+
     def __init__(self,
                  sim: Simulator,
                  name: str,
                  transportMap: TransportMap,
-                 shipmentOption: ShipmentOption
+                 shipmentOption: ShipmentOption,
+                 capacity: Optional[int] = None,
+                 timeToLoad: Optional[Duration] = None,
+                 timeToUnload: Optional[Duration] = None,
+                 serves: Optional[Collection[LocationCode]] = None
                  ):
         super().__init__(sim)
+        if capacity is not None:
+            self.capacity = capacity
+        self.timeToLoad = sim.clock.duration(self.timeToLoad if timeToLoad is None else timeToLoad)
+        self.timeToUnload = sim.clock.duration(self.timeToUnload if timeToUnload is None else timeToUnload)
         self.__name = name
         self.__cargoes: List[Cargo] = []
         self.__assignedItinerary: Optional[Itinerary] = None
         self.__transportMap = transportMap
         self.__shipmentOption = shipmentOption
+        self.__serves = None if serves is None else frozenset(serves)
 
     @property
     def name(self) -> str:
         return self.__name
 
+    @property
+    def serves(self) -> Optional[Collection[LocationCode]]:
+        """
+        Destinations of the cargoes the transport takes, any if none.
+        """
+        return self.__serves
+
     def load(self, aCargo: Cargo):
         self.__cargoes.append(aCargo)
 
@@ -45,11 +73,27 @@ class Transport(SimulationObject):
     def assignItinerary(self, from_: LocationCode, to: LocationCode):
         itinerary = self.__transportMap.findItinerary(from_, to)
         self.__assignedItinerary = itinerary.forShipBy(self.__shipmentOption)
-        LOG.debug('[%r] assigned itinerary %r', self, self.__assignedItinerary)
+        tracer = self._sim.tracer
+        if tracer is not None and tracer.tracesDetails:
+            tracer.detail(self, '[%r] assigned itinerary %r', self, self.__assignedItinerary)
 
     def reAssignItineraryToComeBack(self):
         self.__assignedItinerary = self.__assignedItinerary.forComeBack()
-        LOG.debug('[%r] (re)assigned itinerary %r', self, self.__assignedItinerary)
+        tracer = self._sim.tracer
+        if tracer is not None and tracer.tracesDetails:
+            tracer.detail(self, '[%r] (re)assigned itinerary %r', self, self.__assignedItinerary)
+
+    def state(self) -> TransportState:
+        itinerary = self.__assignedItinerary
+        legs = () if itinerary is None else tuple((seg.origin.locationCode, seg.destination.locationCode)
+                                                  for seg in itinerary.segments)
+        return TransportState(tuple(self.__cargoes), legs)
+
+    def restore(self, state: TransportState):
+        self.__cargoes = list(state.cargoes)
+        transportMap = self.__transportMap
+        self.__assignedItinerary = transportMap.itinerary(*(transportMap.segmentBetween(*leg) for leg in state.legs)) \
+            if state.legs else None
 
     def isEmpty(self) -> bool:
         return not self.__cargoes
@@ -73,15 +117,20 @@ class Transport(SimulationObject):
         await self.depart()
 
     async def loadCargoesFrom(self, warehouse: Warehouse):
-        while not self.isFull():
-            aCargo = warehouse.pickCargo()
-            if aCargo is not None:
-                self.load(aCargo)
-            elif self.isEmpty():
-                await warehouse.waitForACargo()
-            else:
+        metrics = self._sim.metrics
+        while True:
+            self.__cargoes.extend(warehouse.pickCargoes(self.capacity - len(self.__cargoes), self.__serves))
+            if not self.isEmpty():
                 break
 
+            if metrics is not None:
+                metrics.waitingStarted(self, self._sim.currentTime)
+            await warehouse.waitForACargo(partial(self.loadCargoesFrom, warehouse), self.__serves)
+
+        if metrics is not None:
+            metrics.waitingStopped(self, self._sim.currentTime)
+            metrics.cargoesLoaded(self, len(self.__cargoes), self.timeToLoad)
+
         cargoesLoaded = CargoesLoaded(self,
                                       fromWarehouse=warehouse,
                                       duration=self.timeToLoad,
@@ -102,40 +151,47 @@ class Transport(SimulationObject):
     # Event handlers:
     #
     @overload
-    async def when(self, arrived: TransportArrived):
+    def when(self, arrived: TransportArrived) -> Coroutine:
         ...
 
     @overload
-    async def when(self, departed: TransportDeparted):
+    def when(self, departed: TransportDeparted) -> Coroutine:
         ...
 
     @overload
-    async def when(self, loaded: CargoesLoaded):
+    def when(self, loaded: CargoesLoaded) -> Coroutine:
         ...
 
     @overload
-    async def when(self, unloaded: CargoesUnloaded):
+    def when(self, unloaded: CargoesUnloaded) -> Coroutine:
         ...
 
-    async def when(self, event):
-        if isinstance(event, TransportArrived):
-            await self.whenArrived(event)
-        elif isinstance(event, TransportDeparted):
-            await self.whenDeparted(event)
-        elif isinstance(event, CargoesLoaded):
-            await self.whenLoaded(event)
-        elif isinstance(event, CargoesUnloaded):
-            await self.whenUnloaded(event)
-        else:
-            raise NotImplementedError
+    def when(self, event) -> Coroutine:
+        eventClass = type(event)
+        handler = self._handlers.get(eventClass)
+        if handler is None:
+            if not hasattr(eventClass, 'handlerName'):
+                raise NotImplementedError
+
+            handler = self._handlers[eventClass] = handlerFor(type(self), eventClass)
+
+        return handler(self, event)
 
     async def whenArrived(self, arrived: TransportArrived):
+        metrics = self._sim.metrics
+        if metrics is not None:
+            metrics.arrived(self, arrived.occurredAt)
+
         if self.isEmpty():
             await self.loadCargoesFrom(arrived.atWarehouse)
         else:
             await self.unloadCargoesTo(arrived.atWarehouse)
 
     async def whenDeparted(self, departed: TransportDeparted):
+        metrics = self._sim.metrics
+        if metrics is not None:
+            metrics.departed(self, bool(departed.cargoes), departed.occurredAt)
+
         transportArrived = TransportArrived(self,
                                             atWarehouse=departed.toWarehouse,
                                             cargoes=tuple(self.__cargoes))
@@ -147,6 +203,10 @@ class Transport(SimulationObject):
         await self.depart()
 
     async def whenUnloaded(self, unloaded: CargoesUnloaded):
+        metrics = self._sim.metrics
+        if metrics is not None:
+            metrics.cargoesUnloaded(self, unloaded.duration)
+
         while not self.isEmpty():
             aCargo = self.unload()
             unloaded.toWarehouse.bring(aCargo)
@@ -155,8 +215,8 @@ class Transport(SimulationObject):
 
 
 class Truck(Transport):
-    def __init__(self, sim: Simulator, name: str, transportMap: TransportMap):
-        super().__init__(sim, name, transportMap, ShipmentOption.land)
+    def __init__(self, sim: Simulator, name: str, transportMap: TransportMap, **options):
+        super().__init__(sim, name, transportMap, ShipmentOption.land, **options)
 
 
 class Vessel(Transport):
@@ -164,5 +224,5 @@ class Vessel(Transport):
     timeToLoad: Duration = hours(1)
     timeToUnload: Duration = hours(1)
 
-    def __init__(self, sim: Simulator, name: str, transportMap: TransportMap):
-        super().__init__(sim, name, transportMap, ShipmentOption.sea)
+    def __init__(self, sim: Simulator, name: str, transportMap: TransportMap, **options):
+        super().__init__(sim, name, transportMap, ShipmentOption.sea, **options)
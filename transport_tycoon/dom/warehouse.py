@@ -1,10 +1,12 @@
-from asyncio.locks import Event as Waiter
-from typing import List, NamedTuple as Object, Optional
+from collections import deque
+from typing import (Callable, Collection, Coroutine, Deque, Dict, Iterable, List, NamedTuple as Object, Optional,
+                    Tuple)
 
-from transport_tycoon.common.simulator import Simulator, SimulationObject
+from transport_tycoon.common.simulator import Simulator, SimulationObject, Waiter
+from transport_tycoon.common.util import Time
 
 
-__all__ = ('Cargo', 'LocationCode', 'Warehouse')
+__all__ = ('Cargo', 'CargoSupply', 'LocationCode', 'Warehouse')
 
 
 LocationCode = str
@@ -16,42 +18,188 @@ class Cargo(Object):
     destinationCode: LocationCode
 
 
+Restart = Callable[[], Coroutine]
+
+
+def headSeq(queue: Deque[Tuple[int, Cargo]]) -> int:
+    return queue[0][0]
+
+
 class Warehouse(SimulationObject):
+    """
+    Stores cargoes in a queue per destination. Every cargo is stamped with
+    the order it has been brought in, so picking the next cargo overall (or
+    for some destinations) only compares the heads of the queues.
+    """
     locationCode: LocationCode
 
     def __init__(self, sim: Simulator, locationCode: LocationCode):
         super().__init__(sim)
         self.locationCode = locationCode
-        self.__queue: List[Cargo] = []
-        self.__waiters: List[Waiter] = []
-
-    async def waitForACargo(self):
-        if self.isEmpty():
+        self.__queues: Dict[LocationCode, Deque[Tuple[int, Cargo]]] = {}
+        self.__fullness = 0
+        self.__broughtSeq = 0
+        self.__waiters: Deque[Tuple[Waiter, Optional[Restart], Optional[Collection[LocationCode]]]] = deque()
+        self.__restarts: List[Restart] = []
+        self.__supply: Optional[CargoSupply] = None
+
+    def supplyFrom(self, supply: 'CargoSupply'):
+        """
+        Brings the cargoes of the supply only when they are needed: picking
+        and waiting pull them till there are enough cargoes for the given
+        destinations, or till the supply is exhausted.
+        """
+        self.__supply = supply
+
+    def __pull(self, n: int, destinationCodes: Optional[Collection[LocationCode]]):
+        while self.__supply is not None:
+            if destinationCodes is None:
+                stored = self.__fullness
+            else:
+                stored = sum(map(len, self.__queuesFor(destinationCodes)))
+            if stored >= n:
+                return
+            if not self.__supply.pull():
+                self.__supply = None
+
+    async def waitForACargo(self,
+                            restart: Optional[Restart] = None,
+                            destinationCodes: Optional[Collection[LocationCode]] = None):
+        """
+        Suspends the process till a cargo (for one of the destinations, if
+        given) is brought. `restart` starts the waiting process over, it is
+        needed to restore a pickled warehouse.
+        """
+        self.__pull(1, destinationCodes)
+        if self.isEmpty() or (destinationCodes is not None and not self.__queuesFor(destinationCodes)):
             self._sim.suspendProcess()
+            if self._sim.stats is not None:
+                self._sim.stats.suspends += 1
 
-            waiter = Waiter()
-            self.__waiters.append(waiter)
+            waiter = self._sim.newWaiter()
+            self.__waiters.append((waiter, restart, destinationCodes))
             await waiter.wait()
 
-    def pickCargo(self) -> Optional[Cargo]:
+    def __popWaiterFor(self, aCargo: Cargo) -> Optional[Waiter]:
+        for index, (waiter, _, destinationCodes) in enumerate(self.__waiters):
+            if destinationCodes is None or aCargo.destinationCode in destinationCodes:
+                del self.__waiters[index]
+                return waiter
+
+        return None
+
+    def __queuesFor(self, destinationCodes: Optional[Collection[LocationCode]]) -> List[Deque[Tuple[int, Cargo]]]:
+        if destinationCodes is None:
+            return [queue for queue in self.__queues.values() if queue]
+
+        return [queue for queue in map(self.__queues.get, destinationCodes) if queue]
+
+    def pickCargo(self, destinationCodes: Optional[Collection[LocationCode]] = None) -> Optional[Cargo]:
+        self.__pull(1, destinationCodes)
         if self.isEmpty():
             return None
 
-        return self.__queue.pop(0)
+        queues = self.__queuesFor(destinationCodes)
+        if not queues:
+            return None
+
+        self.__fullness -= 1
+        _, aCargo = min(queues, key=headSeq).popleft()
+        return aCargo
 
-    def bring(self, aCargo: Cargo):
-        self.__queue.append(aCargo)
+    def pickCargoes(self, n: int, destinationCodes: Optional[Collection[LocationCode]] = None) -> List[Cargo]:
+        cargoes = []
+        self.__pull(n, destinationCodes)
+        if self.isEmpty():
+            return cargoes
+
+        queues = self.__queuesFor(destinationCodes)
+        while len(cargoes) < n and queues:
+            queues.sort(key=headSeq)
+            queue = queues[0]
+            takeBefore = headSeq(queues[1]) if len(queues) > 1 else None
+            while len(cargoes) < n and queue and (takeBefore is None or queue[0][0] < takeBefore):
+                cargoes.append(queue.popleft()[1])
+
+            if not queue:
+                queues.pop(0)
+
+        self.__fullness -= len(cargoes)
+        return cargoes
+
+    def bring(self, aCargo: Cargo, broughtAt: Optional[Time] = None):
+        """
+        Stores the cargo, which has been here since `broughtAt` (now by
+        default), and wakes the first process waiting for it.
+        """
+        queue = self.__queues.get(aCargo.destinationCode)
+        if queue is None:
+            queue = self.__queues[aCargo.destinationCode] = deque()
+
+        self.__broughtSeq += 1
+        queue.append((self.__broughtSeq, aCargo))
+        self.__fullness += 1
+
+        metrics = self._sim.metrics
+        if metrics is not None:
+            metrics.cargoBrought(aCargo, self.locationCode, self._sim.currentTime if broughtAt is None else broughtAt)
 
         if self.__waiters:
-            waiter = self.__waiters.pop(0)
+            waiter = self.__popWaiterFor(aCargo)
+            if waiter is None:
+                return
+
             waiter.set()
             self._sim.resumeProcess()
+            if self._sim.stats is not None:
+                self._sim.stats.resumes += 1
 
     def isEmpty(self) -> bool:
-        return not self.__queue
+        return not self.__fullness
+
+    def __getstate__(self) -> dict:
+        restarts = [restart for _, restart, _ in self.__waiters]
+        if None in restarts:
+            raise TypeError(f'{self!r} has waiting processes which cannot be restarted')
+        if self.__supply is not None:
+            raise TypeError(f'{self!r} has cargoes still to be supplied')
+
+        state = self.__dict__.copy()
+        state['_Warehouse__waiters'] = deque()
+        state['_Warehouse__restarts'] = restarts
+        return state
+
+    def restartWaitingProcesses(self):
+        restarts, self.__restarts = self.__restarts, []
+        for restart in restarts:
+            self._sim.newProcessFor(restart())
 
     def fullness(self) -> int:
-        return len(self.__queue)
+        return self.__fullness
 
     def __repr__(self):
         return f'{type(self).__name__}({self.locationCode})'
+
+
+class CargoSupply:
+    """
+    The cargoes of a manifest, brought to their origin warehouses one at a
+    time as the warehouses pull them, all of them as of the time the supply
+    has been created. Only the cargoes not picked yet are kept in memory.
+    """
+
+    def __init__(self, cargoes: Iterable[Cargo], warehouses: Dict[LocationCode, Warehouse], suppliedAt: Time):
+        self.__cargoes = iter(cargoes)
+        self.__warehouses = warehouses
+        self.__suppliedAt = suppliedAt
+
+    def pull(self) -> bool:
+        """
+        Brings the next cargo to its origin, unless the supply is exhausted.
+        """
+        aCargo = next(self.__cargoes, None)
+        if aCargo is None:
+            return False
+
+        self.__warehouses[aCargo.originCode].bring(aCargo, self.__suppliedAt)
+        return True
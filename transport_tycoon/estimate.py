@@ -0,0 +1,237 @@
+"""
+Analytical makespan estimate of a manifest, without the event simulation.
+
+The estimator covers the topology of the exercise: trucks start at the
+origin and carry a cargo either to its destination by land, or by land to a
+port where the vessels starting at that port carry it on by sea. Trucks are
+list-scheduled in the manifest order, and a vessel takes the cargoes brought
+to its port by the time it is ready to load (only the first one if it has
+been waiting for it). The lower bound holds for any schedule:
+
+ - a cargo cannot be delivered faster than its route allows,
+ - the busiest truck has at least the average work of the trucks,
+ - the busiest vessel of a port makes at least its share of the trips.
+
+    python -m transport_tycoon.estimate [--validate] DESTINATIONS...
+"""
+from heapq import heapreplace
+from math import ceil
+from typing import Collection, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from transport_tycoon.common.simulator import Engine, runSynchronously
+from transport_tycoon.common.util import TickClock
+from transport_tycoon.dom import LocationCode, ShipmentOption, TransportMap, Truck, Vessel, Warehouse
+from transport_tycoon.scenario import exerciseScenario, Manifest, Scenario, simulate, TransportSpec, TRANSPORT_KINDS
+
+
+__all__ = ('MakespanEstimate', 'MakespanEstimator', 'Validation')
+
+
+CLOCK = TickClock()
+
+
+class MakespanEstimate(NamedTuple):
+    lowerBound: float
+    estimate: float
+
+
+class Validation(NamedTuple):
+    destinationCodes: str
+    lowerBound: float
+    estimate: float
+    simulated: float
+
+    @property
+    def error(self) -> float:
+        return self.estimate - self.simulated
+
+
+class Route(NamedTuple):
+    byLand: float
+    port: Optional[LocationCode]
+    bySea: float
+
+
+class Handling(NamedTuple):
+    capacity: int
+    hoursToLoad: float
+    hoursToUnload: float
+
+
+def handlingOf(spec: TransportSpec) -> Handling:
+    transportClass = TRANSPORT_KINDS[spec.kind]
+
+    def hoursOr(hrs: Optional[int], default) -> float:
+        return CLOCK.inHours(CLOCK.duration(default)) if hrs is None else hrs
+
+    return Handling(transportClass.capacity if spec.capacity is None else spec.capacity,
+                    hoursOr(spec.hoursToLoad, transportClass.timeToLoad),
+                    hoursOr(spec.hoursToUnload, transportClass.timeToUnload))
+
+
+class MakespanEstimator:
+    """
+    Works out the routes and the fleet of a scenario once, estimating a
+    manifest is then a single pass over its destinations.
+    """
+
+    def __init__(self, scenario: Scenario):
+        self.__scenario = scenario
+        self.__routes: Dict[LocationCode, Route] = {}
+
+        warehouses = {locationCode: Warehouse(None, locationCode) for locationCode in scenario.warehouses}
+        self.__transportMap = TransportMap(clock=CLOCK)
+        for seg in scenario.segments:
+            self.__transportMap.segment(warehouses[seg.origin], warehouses[seg.destination], seg.hours, seg.shipmentOption)
+
+        trucks = [spec for spec in scenario.fleet if TRANSPORT_KINDS[spec.kind] is Truck]
+        vessels = [spec for spec in scenario.fleet if TRANSPORT_KINDS[spec.kind] is Vessel]
+        if any(spec.serves is not None for spec in scenario.fleet):
+            raise ValueError('Transports are expected to serve any destination')
+        if not trucks or len({spec.startAt for spec in trucks}) > 1:
+            raise ValueError('Trucks are expected to start at the same origin')
+
+        self.__originCode = trucks[0].startAt
+        self.__truck = handlingOf(trucks[0])
+        if self.__truck.capacity != 1:
+            raise ValueError('Trucks are expected to carry a cargo at a time')
+        self.__trucksCount = len(trucks)
+        self.__vessels: Dict[LocationCode, Handling] = {}
+        self.__vesselsCount: Dict[LocationCode, int] = {}
+        for spec in vessels:
+            self.__vessels[spec.startAt] = handlingOf(spec)
+            self.__vesselsCount[spec.startAt] = self.__vesselsCount.get(spec.startAt, 0) + 1
+
+        if any(handlingOf(spec) != self.__truck for spec in trucks) or \
+                any(handlingOf(spec) != self.__vessels[spec.startAt] for spec in vessels):
+            raise ValueError('Transports of a kind are expected to be alike')
+
+    def route(self, destinationCode: LocationCode) -> Route:
+        route = self.__routes.get(destinationCode)
+        if route is not None:
+            return route
+
+        itinerary = self.__transportMap.findItinerary(self.__originCode, destinationCode)
+        if not itinerary.segments:
+            raise ValueError(f'Unknown location codes: {destinationCode}')
+
+        byLand = itinerary.forShipBy(ShipmentOption.land)
+        if byLand.destination is itinerary.destination:
+            route = Route(byLand.totalTimeToTravel, None, 0)
+        else:
+            port = byLand.destination.locationCode if byLand.segments else self.__originCode
+            bySea = self.__transportMap.findItinerary(port, destinationCode)
+            if port not in self.__vessels or bySea.forShipBy(ShipmentOption.sea).destination is not bySea.destination:
+                raise ValueError(f'No route by truck and vessel to {destinationCode}')
+            route = Route(byLand.totalTimeToTravel, port, bySea.totalTimeToTravel)
+
+        self.__routes[destinationCode] = route
+        return route
+
+    def estimate(self, destinationCodes: Sequence[LocationCode]) -> MakespanEstimate:
+        """
+        The lower bound and the estimate of the makespan in hours.
+        """
+        if not destinationCodes:
+            return MakespanEstimate(0.0, 0.0)
+
+        truck = self.__truck
+        readyAt = [0.0] * self.__trucksCount
+        makespan = 0.0
+        work = 0.0
+        broughtToPorts: Dict[LocationCode, List[Tuple[float, float]]] = {}
+        for destinationCode in destinationCodes:
+            route = self.route(destinationCode)
+            broughtAt = readyAt[0] + truck.hoursToLoad + route.byLand + truck.hoursToUnload
+            heapreplace(readyAt, broughtAt + route.byLand)
+            work += truck.hoursToLoad + 2 * route.byLand + truck.hoursToUnload
+            if route.port is None:
+                makespan = max(makespan, broughtAt)
+            else:
+                broughtToPorts.setdefault(route.port, []).append((broughtAt, route.bySea))
+
+        routes = [self.route(destinationCode) for destinationCode in set(destinationCodes)]
+        lowerBound = self.__trucksLowerBound(routes, work)
+        for port, brought in broughtToPorts.items():
+            makespan = max(makespan, self.__shipFrom(port, brought))
+            lowerBound = max(lowerBound, self.__vesselsLowerBound(port, routes, brought))
+
+        return MakespanEstimate(lowerBound, makespan)
+
+    def __tail(self, route: Route) -> float:
+        if route.port is None:
+            return 0.0
+
+        vessel = self.__vessels[route.port]
+        return vessel.hoursToLoad + route.bySea + vessel.hoursToUnload
+
+    def __trucksLowerBound(self, routes: Collection[Route], work: float) -> float:
+        truck = self.__truck
+        slowestCargo = max(truck.hoursToLoad + route.byLand + truck.hoursToUnload + self.__tail(route) for route in routes)
+        busiestTruck = work / self.__trucksCount - max(route.byLand for route in routes) + min(map(self.__tail, routes))
+
+        return max(slowestCargo, busiestTruck)
+
+    def __vesselsLowerBound(self, port: LocationCode, routes: Collection[Route], brought: Sequence[Tuple[float, float]]) -> float:
+        truck = self.__truck
+        vessel = self.__vessels[port]
+        earliestBroughtAt = truck.hoursToLoad + min(route.byLand for route in routes if route.port == port) + truck.hoursToUnload
+        bySea = min(route.bySea for route in routes if route.port == port)
+        trips = ceil(ceil(len(brought) / vessel.capacity) / self.__vesselsCount[port])
+        roundTrip = vessel.hoursToLoad + 2 * bySea + vessel.hoursToUnload
+
+        return earliestBroughtAt + (trips - 1) * roundTrip + vessel.hoursToLoad + bySea + vessel.hoursToUnload
+
+    def __shipFrom(self, port: LocationCode, brought: List[Tuple[float, float]]) -> float:
+        vessel = self.__vessels[port]
+        readyAt = [0.0] * self.__vesselsCount[port]
+        brought.sort()
+
+        delivered = 0.0
+        i = 0
+        while i < len(brought):
+            if readyAt[0] <= brought[i][0]:
+                loadingAt, j = brought[i][0], i + 1
+            else:
+                loadingAt, j = readyAt[0], i
+                while j < len(brought) and j - i < vessel.capacity and brought[j][0] < loadingAt:
+                    j += 1
+
+            bySea = brought[i][1]
+            deliveredAt = loadingAt + vessel.hoursToLoad + bySea + vessel.hoursToUnload
+            delivered = max(delivered, deliveredAt)
+            heapreplace(readyAt, deliveredAt + bySea)
+            i = j
+
+        return delivered
+
+    def validate(self, manifests: Iterable[Sequence[LocationCode]]) -> Iterator[Validation]:
+        """
+        Compares the estimates with the makespans of the simulated manifests.
+        """
+        for destinationCodes in manifests:
+            scenario = self.__scenario._replace(cargoes=Manifest(self.__originCode, list(destinationCodes)))
+            occurredEvents = runSynchronously(simulate(scenario, Engine.generator, CLOCK))
+            simulated = CLOCK.inHours(occurredEvents[-1].occurredAt) if occurredEvents else 0.0
+            yield Validation(''.join(destinationCodes), *self.estimate(destinationCodes), simulated)
+
+
+if __name__ == '__main__':
+    import sys
+    from argparse import ArgumentParser
+
+    parser = ArgumentParser(description='Estimates the makespan of the exercise for the manifests')
+    parser.add_argument('--validate', action='store_true', help='simulate the manifests too and compare')
+    parser.add_argument('manifests', nargs='*', help='destinations of the cargoes, e.g. ABBBABAAABBB')
+    args = parser.parse_args()
+
+    manifests = args.manifests or [line.strip() for line in sys.stdin if line.strip()]
+    estimator = MakespanEstimator(exerciseScenario(()))
+    if args.validate:
+        for validation in estimator.validate(manifests):
+            print(validation.destinationCodes,
+                  *map('{:g}'.format, (validation.lowerBound, validation.estimate, validation.simulated)),
+                  f'{validation.error:+g}')
+    else:
+        for manifest in manifests:
+            print(manifest, *map('{:g}'.format, estimator.estimate(manifest)))
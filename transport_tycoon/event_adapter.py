@@ -1,22 +1,58 @@
+from array import array
 from json import dumps
-from sys import stdout
-from typing import Sequence
+from json.encoder import encode_basestring_ascii
+from pathlib import Path
+from struct import Struct
+from sys import byteorder, stdout
+from typing import BinaryIO, Callable, Dict, List, NamedTuple, Optional, Sequence, TextIO, Union
 
 from transport_tycoon.common.simulator import Event
-from transport_tycoon.common.util import Duration, Time
+from transport_tycoon.common.util import Clock, Duration, TickClock, Time
 from transport_tycoon.dom.transport import *
+from transport_tycoon.dom.warehouse import Cargo
+from transport_tycoon.event_store import HEADER, Interned, LAYOUTS, MAGIC, MICROSECOND, NO_DESTINATION, RECORD, VERSION
 
 
-def eventToDict(event: Event, startAt: Time):
+Serializer = Callable[[Event, Callable[[Duration], float], Duration], dict]
+
+SERIALIZERS: Dict[type, Serializer] = {}
+
+
+def serializerFor(eventClass: type):
+    """
+    Registers the function which gives the event specific part of the dict
+    of an event class.
+    """
+
+    def register(serializer: Serializer) -> Serializer:
+        SERIALIZERS[eventClass] = serializer
+        return serializer
+
+    return register
+
+
+def findSerializer(eventClass: type) -> Serializer:
+    serializer = SERIALIZERS.get(eventClass)
+    if serializer is None:
+        for baseClass in eventClass.__mro__[1:]:
+            if baseClass in SERIALIZERS:
+                serializer = SERIALIZERS[eventClass] = SERIALIZERS[baseClass]
+                break
+        else:
+            raise NotImplementedError
+
+    return serializer
+
+
+def eventToDict(event: Event, startAt: Time, clock: Clock = Clock()):
 
     def inHours(dur: Duration) -> float:
-        return dur.total_seconds() / 3600.0
+        return clock.inHours(dur)
 
-    def relTime() -> Duration:
-        return event.occurredAt - startAt
+    relTime = event.occurredAt - startAt
 
     rv = {
-        'time': inHours(relTime()),
+        'time': inHours(relTime),
         'transport_id': event.source.name,
         'kind': event.source.__class__.__name__.upper(),
         'cargo': [{
@@ -25,39 +61,479 @@ def eventToDict(event: Event, startAt: Time):
             'destination': cargo.destinationCode,
         } for cargo in event.cargoes]
     }
-    if isinstance(event, TransportArrived):
-        rv.update({
-            'event': 'ARRIVE',
-            'location': event.atWarehouse.locationCode,
-        })
-    elif isinstance(event, TransportDeparted):
-        rv.update({
-            'event': 'DEPART',
-            'location': event.fromWarehouse.locationCode,
-            'destination': event.toWarehouse.locationCode,
-        })
-    elif isinstance(event, CargoesLoaded):
-        rv.update({
-            'time': inHours(relTime() - event.duration),
-            'event': 'LOAD',
-            'duration': inHours(event.duration),
-        })
-    elif isinstance(event, CargoesUnloaded):
-        rv.update({
-            'time': inHours(relTime() - event.duration),
-            'event': 'UNLOAD',
-            'duration': inHours(event.duration),
-        })
-    else:
-        raise NotImplementedError
+    rv.update(findSerializer(type(event))(event, inHours, relTime))
 
     return rv
 
 
-def printEvents(events: Sequence[Event]):
+@serializerFor(TransportArrived)
+def arrivedToDict(event: TransportArrived, inHours, relTime: Duration) -> dict:
+    return {
+        'event': 'ARRIVE',
+        'location': event.atWarehouse.locationCode,
+    }
+
+
+@serializerFor(TransportDeparted)
+def departedToDict(event: TransportDeparted, inHours, relTime: Duration) -> dict:
+    return {
+        'event': 'DEPART',
+        'location': event.fromWarehouse.locationCode,
+        'destination': event.toWarehouse.locationCode,
+    }
+
+
+@serializerFor(CargoesLoaded)
+def loadedToDict(event: CargoesLoaded, inHours, relTime: Duration) -> dict:
+    return {
+        'time': inHours(relTime - event.duration),
+        'event': 'LOAD',
+        'duration': inHours(event.duration),
+    }
+
+
+@serializerFor(CargoesUnloaded)
+def unloadedToDict(event: CargoesUnloaded, inHours, relTime: Duration) -> dict:
+    return {
+        'time': inHours(relTime - event.duration),
+        'event': 'UNLOAD',
+        'duration': inHours(event.duration),
+    }
+
+
+def printEvents(events: Sequence[Event], clock: Clock = Clock(), file: TextIO = stdout):
     if not events:
         return
 
     startAt = events[0].occurredAt
     for event in events:
-        print(dumps(eventToDict(event, startAt)), file=stdout)
\ No newline at end of file
+        print(dumps(eventToDict(event, startAt, clock)), file=file)
+
+
+class JsonLinesWriter:
+    """
+    A simulator sink which writes every occurred event as a JSON line. The
+    time is counted from the first event unless `startAt` is given.
+    """
+
+    def __init__(self, file: TextIO = stdout, startAt: Optional[Time] = None, clock: Clock = Clock()):
+        self.__file = file
+        self.__startAt = startAt
+        self.__clock = clock
+
+    def __call__(self, event: Event):
+        if self.__startAt is None:
+            self.__startAt = event.occurredAt
+
+        self.__file.write(dumps(eventToDict(event, self.__startAt, self.__clock)))
+        self.__file.write('\n')
+
+
+class JsonLinesEncoder:
+    """
+    A simulator sink which produces the same lines as `printEvents` but fast:
+    every event class has a precompiled line template, the JSON fragments of
+    transports, locations and cargoes are cached, and the lines are written
+    in batches. Call `flush()` (or use it as a context manager) at the end.
+    Events without a template are encoded through their serializer.
+    """
+
+    def __init__(self,
+                 file: TextIO = stdout,
+                 startAt: Optional[Time] = None,
+                 clock: Clock = Clock(),
+                 batchSize: int = 4096,
+                 maxCachedCargoes: int = 1 << 16
+                 ):
+        self.__file = file
+        self.__startAt = startAt
+        self.__clock = clock
+        self.__batchSize = batchSize
+        self.__maxCachedCargoes = maxCachedCargoes
+        self.__lines: List[str] = []
+        self.__sources: Dict[object, str] = {}
+        self.__locations: Dict[object, str] = {}
+        self.__cargoes: Dict[Cargo, str] = {}
+        self.__encoders: Dict[type, Callable[[Event, str, str], str]] = {
+            TransportArrived: self.__encodeArrived,
+            TransportDeparted: self.__encodeDeparted,
+            CargoesLoaded: self.__encodeLoaded,
+            CargoesUnloaded: self.__encodeUnloaded,
+        }
+
+    def __source(self, source) -> str:
+        fragment = self.__sources.get(source)
+        if fragment is None:
+            fragment = self.__sources[source] = \
+                f'"transport_id": {encodeValue(source.name)}, ' \
+                f'"kind": {encodeValue(source.__class__.__name__.upper())}, "cargo": ['
+
+        return fragment
+
+    def __location(self, warehouse) -> str:
+        fragment = self.__locations.get(warehouse)
+        if fragment is None:
+            fragment = self.__locations[warehouse] = encodeValue(warehouse.locationCode)
+
+        return fragment
+
+    def __cargo(self, cargo: Cargo) -> str:
+        fragment = self.__cargoes.get(cargo)
+        if fragment is None:
+            if len(self.__cargoes) >= self.__maxCachedCargoes:
+                self.__cargoes.clear()
+
+            fragment = self.__cargoes[cargo] = \
+                f'{{"cargo_id": {encodeValue(cargo.trackNumber)}, ' \
+                f'"origin": {encodeValue(cargo.originCode)}, ' \
+                f'"destination": {encodeValue(cargo.destinationCode)}}}'
+
+        return fragment
+
+    def __inHours(self, dur: Duration) -> str:
+        return repr(self.__clock.inHours(dur))
+
+    def __encodeArrived(self, event: TransportArrived, head: str, cargoes: str) -> str:
+        return f'{{"time": {self.__inHours(event.occurredAt - self.__startAt)}, {head}{cargoes}], ' \
+               f'"event": "ARRIVE", "location": {self.__location(event.atWarehouse)}}}\n'
+
+    def __encodeDeparted(self, event: TransportDeparted, head: str, cargoes: str) -> str:
+        return f'{{"time": {self.__inHours(event.occurredAt - self.__startAt)}, {head}{cargoes}], ' \
+               f'"event": "DEPART", "location": {self.__location(event.fromWarehouse)}, ' \
+               f'"destination": {self.__location(event.toWarehouse)}}}\n'
+
+    def __encodeLoaded(self, event: CargoesLoaded, head: str, cargoes: str) -> str:
+        return f'{{"time": {self.__inHours(event.occurredAt - self.__startAt - event.duration)}, {head}{cargoes}], ' \
+               f'"event": "LOAD", "duration": {self.__inHours(event.duration)}}}\n'
+
+    def __encodeUnloaded(self, event: CargoesUnloaded, head: str, cargoes: str) -> str:
+        return f'{{"time": {self.__inHours(event.occurredAt - self.__startAt - event.duration)}, {head}{cargoes}], ' \
+               f'"event": "UNLOAD", "duration": {self.__inHours(event.duration)}}}\n'
+
+    def __call__(self, event: Event):
+        if self.__startAt is None:
+            self.__startAt = event.occurredAt
+
+        encode = self.__encoders.get(type(event))
+        if encode is None:
+            self.__lines.append(dumps(eventToDict(event, self.__startAt, self.__clock)) + '\n')
+        else:
+            cargoes = ', '.join(map(self.__cargo, event.cargoes))
+            self.__lines.append(encode(event, self.__source(event.source), cargoes))
+
+        if len(self.__lines) >= self.__batchSize:
+            self.flush()
+
+    def flush(self):
+        if self.__lines:
+            self.__file.write(''.join(self.__lines))
+            self.__lines.clear()
+
+    def __enter__(self) -> 'JsonLinesEncoder':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.flush()
+
+
+def encodeValue(value) -> str:
+    if isinstance(value, str):
+        return encode_basestring_ascii(value)
+
+    return dumps(value)
+
+
+class Span(NamedTuple):
+    ts: int
+    name: str
+    args: str
+
+
+class ChromeTraceWriter:
+    """
+    A simulator sink which writes the occurred events as a Chrome trace
+    (the JSON of `chrome://tracing` and Perfetto): a process per kind of
+    transport, a thread per transport, with complete events for
+    travelling from a DEPART to its ARRIVE, for every LOAD and UNLOAD, and
+    for carrying the cargoes from the start of their LOAD to the end of
+    their UNLOAD. Arrivals without a departure and other events are
+    instant events.
+
+    The trace events are written in batches as their spans end, so only
+    the open spans of every transport are kept in memory. Call `close()`
+    (or use it as a context manager) at the end, spans still open are
+    written as begin events.
+    """
+
+    def __init__(self,
+                 file: TextIO = stdout,
+                 startAt: Optional[Time] = None,
+                 clock: Clock = Clock(),
+                 batchSize: int = 4096
+                 ):
+        self.__file = file
+        self.__startAt = startAt
+        self.__clock = clock
+        self.__batchSize = batchSize
+        self.__lines: List[str] = []
+        self.__kinds = Interned()
+        self.__transports = Interned()
+        self.__threads: Dict[object, str] = {}
+        self.__travels: Dict[object, Span] = {}
+        self.__carries: Dict[object, Span] = {}
+        self.__file.write('{"traceEvents": [\n')
+        self.__separator = ''
+
+    def __ts(self, time) -> int:
+        return round(self.__clock.inHours(time - self.__startAt) * 3.6e9)
+
+    def __dur(self, dur) -> int:
+        return round(self.__clock.inHours(dur) * 3.6e9)
+
+    def __thread(self, transport) -> str:
+        fragment = self.__threads.get(transport)
+        if fragment is None:
+            kind = transport.__class__.__name__.upper()
+            kindsCount = len(self.__kinds.objects)
+            pid = self.__kinds(kind) + 1
+            tid = self.__transports(transport) + 1
+            if pid > kindsCount:
+                self.__emit(f'{{"name": "process_name", "ph": "M", "pid": {pid}, '
+                            f'"args": {{"name": {encodeValue(kind)}}}}}')
+            self.__emit(f'{{"name": "thread_name", "ph": "M", "pid": {pid}, "tid": {tid}, '
+                        f'"args": {{"name": {encodeValue(transport.name)}}}}}')
+            fragment = self.__threads[transport] = f'"pid": {pid}, "tid": {tid}'
+
+        return fragment
+
+    def __emit(self, line: str):
+        self.__lines.append(self.__separator + line)
+        self.__separator = ',\n'
+        if len(self.__lines) >= self.__batchSize:
+            self.flush()
+
+    def __complete(self, transport, category: str, span: Span, endsAt: int):
+        self.__emit(f'{{"name": {encodeValue(span.name)}, "cat": "{category}", "ph": "X", "ts": {span.ts}, '
+                    f'"dur": {endsAt - span.ts}, {self.__thread(transport)}, "args": {span.args}}}')
+
+    def __instant(self, transport, name: str, ts: int, args: str):
+        self.__emit(f'{{"name": {encodeValue(name)}, "cat": "event", "ph": "i", "s": "t", "ts": {ts}, '
+                    f'{self.__thread(transport)}, "args": {args}}}')
+
+    @staticmethod
+    def __args(event: Event, **args: str) -> str:
+        cargoes = ', '.join(encodeValue(aCargo.trackNumber) for aCargo in event.cargoes)
+        return '{' + ''.join(f'"{name}": {encodeValue(value)}, ' for name, value in args.items()) + \
+               f'"cargo": [{cargoes}]}}'
+
+    def __call__(self, event: Event):
+        if self.__startAt is None:
+            self.__startAt = event.occurredAt
+
+        transport = event.source
+        ts = self.__ts(event.occurredAt)
+        if isinstance(event, TransportDeparted):
+            origin, destination = event.fromWarehouse.locationCode, event.toWarehouse.locationCode
+            self.__travels[transport] = Span(ts, f'{origin}-{destination}', self.__args(event))
+        elif isinstance(event, TransportArrived):
+            travel = self.__travels.pop(transport, None)
+            if travel is None:
+                self.__instant(transport, f'ARRIVE {event.atWarehouse.locationCode}', ts, self.__args(event))
+            else:
+                self.__complete(transport, 'travel', travel, ts)
+        elif isinstance(event, (CargoesLoaded, CargoesUnloaded)):
+            startsAt = ts - self.__dur(event.duration)
+            if isinstance(event, CargoesLoaded):
+                location = event.fromWarehouse.locationCode
+                kind = 'LOAD'
+                self.__carries[transport] = Span(startsAt, f'{location}-', self.__args(event))
+            else:
+                location = event.toWarehouse.locationCode
+                kind = 'UNLOAD'
+                carry = self.__carries.pop(transport, None)
+                if carry is not None:
+                    self.__complete(transport, 'cargo', carry._replace(name=carry.name + location), ts)
+            self.__complete(transport, 'handling', Span(startsAt, f'{kind} {location}', self.__args(event)), ts)
+        else:
+            name = findSerializer(type(event))(event, self.__clock.inHours, event.occurredAt - self.__startAt)['event']
+            self.__instant(transport, name, ts, self.__args(event))
+
+    def flush(self):
+        if self.__lines:
+            self.__file.write(''.join(self.__lines))
+            self.__lines.clear()
+
+    def close(self):
+        """
+        Writes the spans still open and ends the trace.
+        """
+        for category, spans in (('travel', self.__travels), ('cargo', self.__carries)):
+            for transport, span in spans.items():
+                self.__emit(f'{{"name": {encodeValue(span.name)}, "cat": "{category}", "ph": "B", "ts": {span.ts}, '
+                            f'{self.__thread(transport)}, "args": {span.args}}}')
+            spans.clear()
+
+        self.flush()
+        self.__file.write('\n], "displayTimeUnit": "ms"}\n')
+
+    def __enter__(self) -> 'ChromeTraceWriter':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+CARGO = Struct('<III')
+TRANSPORT = Struct('<II')
+
+
+class BinaryEventLogWriter:
+    """
+    A simulator sink which writes the occurred events as the fixed-size
+    records of a binary event log (see `transport_tycoon.event_store`), to
+    be read back through `MappedEventLog`. Records are written in batches as
+    events occur, the string, cargo and transport tables and the indexes by
+    transport and by cargo are written on `close()` (or at the end of the
+    context), so only the cargo refs and the event numbers per transport are
+    kept in memory meanwhile.
+    """
+
+    def __init__(self,
+                 path: Union[str, Path],
+                 startAt: Optional[Time] = None,
+                 clock: Clock = Clock(),
+                 batchSize: int = 4096
+                 ):
+        self.__file: BinaryIO = open(path, 'wb')
+        self.__file.write(bytes(HEADER.size))
+        self.__startAt = startAt
+        self.__batchSize = batchSize
+        if isinstance(clock, TickClock):
+            self.__secondsPerUnit, self.__unitsPerSecond = int(clock.resolution.total_seconds()), 1
+        else:
+            self.__secondsPerUnit, self.__unitsPerSecond = 1, Duration(seconds=1) // MICROSECOND
+        self.__kinds = {kind: index for index, kind in enumerate(LAYOUTS)}
+        self.__strings = Interned()
+        self.__transports = Interned()
+        self.__cargoes = Interned()
+        self.__records: List[bytes] = []
+        self.__eventsCount = 0
+        self.__cargoRefs = array('I')
+        self.__cargoesCounts = array('H')
+        self.__transportEvents: List[array] = []
+
+    def __inUnits(self, dur) -> int:
+        if isinstance(dur, int):
+            return dur
+
+        return dur // MICROSECOND
+
+    def __call__(self, event: Event):
+        if self.__startAt is None:
+            self.__startAt = event.occurredAt
+
+        kind = type(event)
+        layout = LAYOUTS[kind]
+        transport = self.__transports(event.source)
+        if transport == len(self.__transportEvents):
+            self.__transportEvents.append(array('I'))
+        self.__transportEvents[transport].append(self.__eventsCount)
+
+        cargoRefsAt = len(self.__cargoRefs)
+        self.__cargoRefs.extend(map(self.__cargoes, event.cargoes))
+        self.__cargoesCounts.append(len(event.cargoes))
+        self.__records.append(RECORD.pack(
+            self.__inUnits(event.occurredAt - self.__startAt),
+            0 if layout.duration is None else self.__inUnits(getattr(event, layout.duration)),
+            cargoRefsAt,
+            transport,
+            self.__strings(getattr(event, layout.location).locationCode),
+            NO_DESTINATION if layout.destination is None else
+            self.__strings(getattr(event, layout.destination).locationCode),
+            len(event.cargoes),
+            self.__kinds[kind]))
+        self.__eventsCount += 1
+
+        if len(self.__records) >= self.__batchSize:
+            self.flush()
+
+    def flush(self):
+        if self.__records:
+            self.__file.write(b''.join(self.__records))
+            self.__records.clear()
+
+    def __write(self, data: Union[bytes, array]) -> int:
+        """
+        Writes a section 8 bytes aligned, returning its offset.
+        """
+        offset = self.__file.tell()
+        if isinstance(data, array) and byteorder != 'little':
+            data = array(data.typecode, data)
+            data.byteswap()
+        self.__file.write(data)
+        self.__file.write(bytes(-self.__file.tell() % 8))
+        return offset
+
+    def __index(self, eventNumbers: Sequence[array]) -> List[int]:
+        offsets = array('Q', [0])
+        events = array('I')
+        for numbers in eventNumbers:
+            events.extend(numbers)
+            offsets.append(len(events))
+
+        return [self.__write(offsets), len(offsets), self.__write(events), len(events)]
+
+    def __cargoEvents(self) -> List[array]:
+        eventNumbers = [array('I') for _ in self.__cargoes.objects]
+        cargoRefs = iter(self.__cargoRefs)
+        for eventNumber, count in enumerate(self.__cargoesCounts):
+            for _ in range(count):
+                eventNumbers[next(cargoRefs)].append(eventNumber)
+
+        return eventNumbers
+
+    def close(self):
+        if self.__file.closed:
+            return
+
+        self.flush()
+        self.__file.write(bytes(-self.__file.tell() % 8))
+        sections = [HEADER.size, self.__eventsCount, self.__write(self.__cargoRefs), len(self.__cargoRefs)]
+
+        cargoes = [CARGO.pack(*map(self.__strings, aCargo)) for aCargo in self.__cargoes.objects]
+        transports = [TRANSPORT.pack(self.__strings(transport.name),
+                                     self.__strings(transport.__class__.__name__.upper()))
+                      for transport in self.__transports.objects]
+        sections += [self.__write(b''.join(cargoes)), len(cargoes), self.__write(b''.join(transports)), len(transports)]
+
+        strings = [string.encode() for string in self.__strings.objects]
+        stringOffsets = array('Q', [0])
+        for string in strings:
+            stringOffsets.append(stringOffsets[-1] + len(string))
+        sections += [self.__write(stringOffsets), len(stringOffsets), self.__write(b''.join(strings)), stringOffsets[-1]]
+
+        sections += self.__index(self.__transportEvents)
+        sections += self.__index(self.__cargoEvents())
+
+        self.__file.seek(0)
+        self.__file.write(HEADER.pack(MAGIC, VERSION, 0, self.__secondsPerUnit, self.__unitsPerSecond, *sections))
+        self.__file.close()
+
+    def __enter__(self) -> 'BinaryEventLogWriter':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+if __name__ == '__main__':
+    import sys
+    from transport_tycoon.common.simulator import Engine, runSynchronously
+    from transport_tycoon.scenario import loadScenario, simulate
+
+    if len(sys.argv) != 2:
+        sys.exit(f'Usage: python -m {__spec__.name} SCENARIO.json > SCENARIO.trace')
+
+    clock = TickClock()
+    with ChromeTraceWriter(sys.stdout, clock.origin(), clock) as writer:
+        runSynchronously(simulate(loadScenario(sys.argv[1]), Engine.generator, clock, [writer], keepEvents=False))
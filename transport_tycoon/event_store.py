@@ -0,0 +1,490 @@
+"""
+Event logs: `ColumnarEventLog` keeps the events of a run in memory, and
+`MappedEventLog` reads a binary event log written by
+`transport_tycoon.event_adapter.BinaryEventLogWriter`. A binary log is
+
+    header:   '<4sHHII' magic b'TTEL', version, 0, seconds per time unit and
+              time units per second, then per section '<QQ' its offset and
+              number of items
+    records:  per event '<qqQIIIHBx' time and duration in units since the
+              start, offset and number of its cargo refs, string indexes of
+              the transport, location and destination, number of cargoes
+              and the kind (ARRIVE, DEPART, LOAD, UNLOAD)
+    cargo refs:        '<I' cargo indexes of the events
+    cargoes:           '<III' string indexes of a track number, origin and destination
+    transports:        '<II' string indexes of a name and kind
+    string offsets:    '<Q' start of a string, and the end of the last one
+    strings:           UTF-8 bytes
+    transport events:  '<Q' offsets per transport, then '<I' event numbers
+    cargo events:      '<Q' offsets per cargo, then '<I' event numbers
+
+The event numbers of a transport or cargo are in the order of the events,
+so the events of a transport within a time range are found by bisection.
+Indexes are written with the log, a reader only maps the file.
+"""
+from array import array
+from bisect import bisect_left, bisect_right
+from fractions import Fraction
+from math import ceil, floor
+from mmap import ACCESS_READ, mmap
+from pathlib import Path
+from struct import calcsize, Struct, unpack_from
+from typing import Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+from transport_tycoon.common.simulator import Event
+from transport_tycoon.common.util import Duration, Time
+from transport_tycoon.dom.transport import *
+from transport_tycoon.dom.warehouse import Cargo, Warehouse
+
+
+__all__ = ('ColumnarEventLog', 'LoggedEvent', 'MappedEventLog')
+
+
+class Layout(NamedTuple):
+    location: str
+    destination: Optional[str]
+    duration: Optional[str]
+
+
+LAYOUTS: Dict[type, Layout] = {
+    TransportArrived: Layout('atWarehouse', None, None),
+    TransportDeparted: Layout('fromWarehouse', 'toWarehouse', 'timeToDeliver'),
+    CargoesLoaded: Layout('fromWarehouse', None, 'duration'),
+    CargoesUnloaded: Layout('toWarehouse', None, 'duration'),
+}
+
+EVENT_NAMES = ('ARRIVE', 'DEPART', 'LOAD', 'UNLOAD')
+
+MICROSECOND = Duration(microseconds=1)
+
+MAGIC = b'TTEL'
+VERSION = 1
+SECTIONS = ('records', 'cargoRefs', 'cargoes', 'transports', 'stringOffsets', 'strings',
+            'transportEventOffsets', 'transportEvents', 'cargoEventOffsets', 'cargoEvents')
+HEADER = Struct('<4sHHII' + 'QQ' * len(SECTIONS))
+RECORD = Struct('<qqQIIIHBx')
+NO_DESTINATION = 0xFFFFFFFF
+ITEM_SIZES = {
+    'records': RECORD.size,
+    'cargoRefs': 4,
+    'cargoes': 12,
+    'transports': 8,
+    'stringOffsets': 8,
+    'strings': 1,
+    'transportEventOffsets': 8,
+    'transportEvents': 4,
+    'cargoEventOffsets': 8,
+    'cargoEvents': 4,
+}
+
+
+class Interned:
+
+    def __init__(self):
+        self.objects: List = []
+        self.__indexes: Dict[object, int] = {}
+
+    def __call__(self, obj) -> int:
+        index = self.__indexes.get(obj)
+        if index is None:
+            index = self.__indexes[obj] = len(self.objects)
+            self.objects.append(obj)
+
+        return index
+
+
+class ColumnarEventLog:
+    """
+    A simulator sink keeping occurred events in array-backed columns: time,
+    event kind, transport, locations and duration. Transports, warehouses
+    and cargoes are interned, and the cargoes of an event are a range of a
+    shared array of cargo indexes. Events are materialized back into their
+    named tuples only on access.
+
+    Times and durations are kept as they are for the tick clock, and as
+    microseconds (since the first event) for the datetime clock.
+    """
+
+    def __init__(self):
+        self.times = array('q')
+        self.kinds = array('B')
+        self.transports = array('I')
+        self.locations = array('I')
+        self.destinations = array('I')
+        self.durations = array('q')
+        self.cargoOffsets = array('Q', [0])
+        self.cargoIndexes = array('I')
+
+        self.__kinds = list(LAYOUTS)
+        self.__kindIndexes = {kind: index for index, kind in enumerate(self.__kinds)}
+        self.__transports = Interned()
+        self.__warehouses = Interned()
+        self.__cargoes = Interned()
+        self.__origin: Optional[Time] = None
+        self.__inTicks = True
+
+    def __encodeTime(self, time) -> int:
+        if self.__origin is None:
+            self.__inTicks = isinstance(time, int)
+            self.__origin = 0 if self.__inTicks else time
+
+        if self.__inTicks:
+            return time
+
+        return (time - self.__origin) // MICROSECOND
+
+    def __encodeDuration(self, dur) -> int:
+        if self.__inTicks:
+            return dur
+
+        return dur // MICROSECOND
+
+    def __decodeTime(self, time: int):
+        if self.__inTicks:
+            return time
+
+        return self.__origin + time * MICROSECOND
+
+    def __decodeDuration(self, dur: int):
+        if self.__inTicks:
+            return dur
+
+        return dur * MICROSECOND
+
+    def __call__(self, anEvent: Event):
+        kind = type(anEvent)
+        layout = LAYOUTS[kind]
+
+        self.times.append(self.__encodeTime(anEvent.occurredAt))
+        self.kinds.append(self.__kindIndexes[kind])
+        self.transports.append(self.__transports(anEvent.source))
+        self.locations.append(self.__warehouses(getattr(anEvent, layout.location)))
+        self.destinations.append(0 if layout.destination is None else
+                                 self.__warehouses(getattr(anEvent, layout.destination)))
+        self.durations.append(0 if layout.duration is None else
+                              self.__encodeDuration(getattr(anEvent, layout.duration)))
+        self.cargoIndexes.extend(map(self.__cargoes, anEvent.cargoes))
+        self.cargoOffsets.append(len(self.cargoIndexes))
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    def cargoesOf(self, index: int) -> Tuple[Cargo, ...]:
+        cargoes = self.__cargoes.objects
+        return tuple(cargoes[i] for i in self.cargoIndexes[self.cargoOffsets[index]:self.cargoOffsets[index + 1]])
+
+    def warehouse(self, index: int) -> Warehouse:
+        return self.__warehouses.objects[index]
+
+    def __getitem__(self, index: int) -> Event:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+
+        kind = self.__kinds[self.kinds[index]]
+        layout = LAYOUTS[kind]
+        fields = {
+            layout.location: self.warehouse(self.locations[index]),
+            'cargoes': self.cargoesOf(index),
+            'occurredAt': self.__decodeTime(self.times[index]),
+        }
+        if layout.destination is not None:
+            fields[layout.destination] = self.warehouse(self.destinations[index])
+        if layout.duration is not None:
+            fields[layout.duration] = self.__decodeDuration(self.durations[index])
+
+        return kind(self.__transports.objects[self.transports[index]], **fields)
+
+    def __iter__(self) -> Iterator[Event]:
+        return map(self.__getitem__, range(len(self)))
+
+
+class LoggedEvent(NamedTuple):
+    time: float
+    kind: str
+    transport: str
+    transportKind: str
+    location: str
+    destination: Optional[str]
+    duration: float
+    cargoes: Tuple[Cargo, ...]
+
+    def asDict(self) -> dict:
+        """
+        The same dict as `transport_tycoon.event_adapter.eventToDict` gives.
+        """
+        rv = {
+            'time': self.time,
+            'transport_id': self.transport,
+            'kind': self.transportKind,
+            'cargo': [{
+                'cargo_id': cargo.trackNumber,
+                'origin': cargo.originCode,
+                'destination': cargo.destinationCode,
+            } for cargo in self.cargoes],
+            'event': self.kind,
+        }
+        if self.kind in ('LOAD', 'UNLOAD'):
+            rv['time'] = self.time - self.duration
+            rv['duration'] = self.duration
+        else:
+            rv['location'] = self.location
+        if self.kind == 'DEPART':
+            rv['destination'] = self.destination
+
+        return rv
+
+
+class Column(Sequence):
+    """
+    A memory-mapped array of little endian integers.
+    """
+
+    def __init__(self, mapped: mmap, offset: int, count: int, format_: str):
+        self.__mapped = mapped
+        self.__offset = offset
+        self.__count = count
+        self.__format = '<' + format_
+        self.__size = calcsize(self.__format)
+
+    def __len__(self) -> int:
+        return self.__count
+
+    def __getitem__(self, index: int) -> int:
+        if not 0 <= index < self.__count:
+            raise IndexError(index)
+
+        return unpack_from(self.__format, self.__mapped, self.__offset + index * self.__size)[0]
+
+
+class Times(Sequence):
+    """
+    The times of the events of a slice of event numbers, for bisection.
+    """
+
+    def __init__(self, log: 'MappedEventLog', eventNumbers: Sequence[int]):
+        self.__log = log
+        self.__eventNumbers = eventNumbers
+
+    def __len__(self) -> int:
+        return len(self.__eventNumbers)
+
+    def __getitem__(self, index: int) -> int:
+        return self.__log.timeOf(self.__eventNumbers[index])
+
+
+class Slice(Sequence):
+
+    def __init__(self, column: Column, start: int, stop: int):
+        self.__column = column
+        self.__start = start
+        self.__stop = stop
+
+    def __len__(self) -> int:
+        return self.__stop - self.__start
+
+    def __getitem__(self, index: int) -> int:
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+
+        return self.__column[self.__start + index]
+
+
+class MappedEventLog:
+    """
+    Reads a binary event log through a memory map: an event is decoded only
+    when accessed, the events of a transport or a cargo are looked up in
+    the indexes of the log. The names of the transports and the track
+    numbers of the cargoes are resolved on the first lookup by them.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        with open(self.path, 'rb') as file:
+            self.__mapped = mmap(file.fileno(), 0, access=ACCESS_READ)
+
+        try:
+            self.__sections = self.__readHeader()
+        except ValueError:
+            self.__mapped.close()
+            raise
+
+        self.__recordsAt = self.__sections['records'][0]
+        self.__cargoRefs = self.__column('cargoRefs', 'I')
+        self.__stringOffsets = self.__column('stringOffsets', 'Q')
+        self.__transportEventOffsets = self.__column('transportEventOffsets', 'Q')
+        self.__transportEvents = self.__column('transportEvents', 'I')
+        self.__cargoEventOffsets = self.__column('cargoEventOffsets', 'Q')
+        self.__cargoEvents = self.__column('cargoEvents', 'I')
+        self.__strings: Dict[int, str] = {}
+        self.__cargoes: Dict[int, Cargo] = {}
+        self.__transportsByName: Optional[Dict[str, int]] = None
+        self.__cargoesByTrackNumber: Optional[Dict[str, List[int]]] = None
+
+    def __readHeader(self) -> Dict[str, Tuple[int, int]]:
+        if len(self.__mapped) < HEADER.size:
+            raise ValueError(f'Not an event log: {self.path}')
+
+        magic, version, _, self.secondsPerUnit, self.unitsPerSecond, *sections = HEADER.unpack_from(self.__mapped)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f'Not an event log (version {VERSION}): {self.path}')
+
+        rv = {}
+        for name, offset, count in zip(SECTIONS, sections[::2], sections[1::2]):
+            if offset + count * ITEM_SIZES[name] > len(self.__mapped):
+                raise ValueError(f'Truncated event log: {self.path}')
+            rv[name] = (offset, count)
+
+        return rv
+
+    def __column(self, name: str, format_: str) -> Column:
+        offset, count = self.__sections[name]
+        return Column(self.__mapped, offset, count, format_)
+
+    def close(self):
+        self.__mapped.close()
+
+    def __enter__(self) -> 'MappedEventLog':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self) -> int:
+        return self.__sections['records'][1]
+
+    def string(self, index: int) -> str:
+        string = self.__strings.get(index)
+        if string is None:
+            start, end = self.__stringOffsets[index], self.__stringOffsets[index + 1]
+            stringsAt = self.__sections['strings'][0]
+            string = self.__strings[index] = self.__mapped[stringsAt + start:stringsAt + end].decode()
+
+        return string
+
+    def cargo(self, index: int) -> Cargo:
+        aCargo = self.__cargoes.get(index)
+        if aCargo is None:
+            offset = self.__sections['cargoes'][0] + index * ITEM_SIZES['cargoes']
+            aCargo = self.__cargoes[index] = Cargo(*map(self.string, unpack_from('<III', self.__mapped, offset)))
+
+        return aCargo
+
+    def timeOf(self, eventNumber: int) -> int:
+        return unpack_from('<q', self.__mapped, self.__recordsAt + eventNumber * RECORD.size)[0]
+
+    def inHours(self, units: int) -> float:
+        return units * self.secondsPerUnit / self.unitsPerSecond / 3600.0
+
+    def inUnits(self, hrs: float) -> Fraction:
+        return Fraction(hrs) * 3600 * self.unitsPerSecond / self.secondsPerUnit
+
+    def __getitem__(self, eventNumber: int) -> LoggedEvent:
+        if eventNumber < 0:
+            eventNumber += len(self)
+        if not 0 <= eventNumber < len(self):
+            raise IndexError(eventNumber)
+
+        time, duration, cargoRefsAt, transport, location, destination, cargoesCount, kind = \
+            RECORD.unpack_from(self.__mapped, self.__recordsAt + eventNumber * RECORD.size)
+        transportsAt = self.__sections['transports'][0]
+        name, transportKind = unpack_from('<II', self.__mapped, transportsAt + transport * ITEM_SIZES['transports'])
+        cargoRefs = self.__cargoRefs
+        return LoggedEvent(self.inHours(time),
+                           EVENT_NAMES[kind],
+                           self.string(name),
+                           self.string(transportKind),
+                           self.string(location),
+                           None if destination == NO_DESTINATION else self.string(destination),
+                           self.inHours(duration),
+                           tuple(self.cargo(cargoRefs[i]) for i in range(cargoRefsAt, cargoRefsAt + cargoesCount)))
+
+    def __iter__(self) -> Iterator[LoggedEvent]:
+        return map(self.__getitem__, range(len(self)))
+
+    def __unitsRange(self, times: Sequence[int], fromHours: Optional[float], toHours: Optional[float]) -> range:
+        start = 0 if fromHours is None else bisect_left(times, ceil(self.inUnits(fromHours)))
+        stop = len(times) if toHours is None else bisect_right(times, floor(self.inUnits(toHours)))
+        return range(start, max(start, stop))
+
+    def between(self, fromHours: Optional[float] = None, toHours: Optional[float] = None) -> Iterator[LoggedEvent]:
+        """
+        The events occurred from `fromHours` till `toHours`, inclusive.
+        """
+        return map(self.__getitem__, self.__unitsRange(Times(self, range(len(self))), fromHours, toHours))
+
+    def ofTransport(self,
+                    name: str,
+                    fromHours: Optional[float] = None,
+                    toHours: Optional[float] = None
+                    ) -> Iterator[LoggedEvent]:
+        """
+        The events of the transport occurred from `fromHours` till `toHours`.
+        """
+        if self.__transportsByName is None:
+            transportsAt, count = self.__sections['transports']
+            self.__transportsByName = {
+                self.string(unpack_from('<I', self.__mapped, transportsAt + i * ITEM_SIZES['transports'])[0]): i
+                for i in range(count)
+            }
+
+        transport = self.__transportsByName.get(name)
+        if transport is None:
+            return iter(())
+
+        eventNumbers = Slice(self.__transportEvents,
+                             self.__transportEventOffsets[transport], self.__transportEventOffsets[transport + 1])
+        return (self[eventNumbers[i]] for i in self.__unitsRange(Times(self, eventNumbers), fromHours, toHours))
+
+    def ofCargo(self, trackNumber: str) -> Iterator[LoggedEvent]:
+        if self.__cargoesByTrackNumber is None:
+            cargoesAt, count = self.__sections['cargoes']
+            self.__cargoesByTrackNumber = {}
+            for i in range(count):
+                trackNumberIndex = unpack_from('<I', self.__mapped, cargoesAt + i * ITEM_SIZES['cargoes'])[0]
+                self.__cargoesByTrackNumber.setdefault(self.string(trackNumberIndex), []).append(i)
+
+        eventNumbers = set()
+        for cargo in self.__cargoesByTrackNumber.get(str(trackNumber), ()):
+            eventNumbers.update(Slice(self.__cargoEvents, self.__cargoEventOffsets[cargo], self.__cargoEventOffsets[cargo + 1]))
+
+        return map(self.__getitem__, sorted(eventNumbers))
+
+
+if __name__ == '__main__':
+    from argparse import ArgumentParser
+    from json import dumps
+
+    parser = ArgumentParser(description='Prints the events of a binary event log as JSON lines')
+    parser.add_argument('log', help='a log written by BinaryEventLogWriter')
+    parser.add_argument('--scenario', help='simulate a scenario JSON file into the log first')
+    parser.add_argument('--transport', help='only the events of a transport, e.g. "Vessel 1"')
+    parser.add_argument('--cargo', help='only the events of a cargo with the track number')
+    parser.add_argument('--from', dest='fromHours', type=float, help='occurred at or after the hour')
+    parser.add_argument('--to', dest='toHours', type=float, help='occurred at or before the hour')
+    args = parser.parse_args()
+
+    if args.scenario is not None:
+        from transport_tycoon.common.simulator import Engine, runSynchronously
+        from transport_tycoon.common.util import TickClock
+        from transport_tycoon.event_adapter import BinaryEventLogWriter
+        from transport_tycoon.scenario import loadScenario, simulate
+
+        clock = TickClock()
+        with BinaryEventLogWriter(args.log, clock.origin(), clock) as writer:
+            runSynchronously(simulate(loadScenario(args.scenario), Engine.generator, clock, [writer], keepEvents=False))
+
+    with MappedEventLog(args.log) as eventLog:
+        if args.cargo is not None:
+            events = (anEvent for anEvent in eventLog.ofCargo(args.cargo)
+                      if (args.transport is None or anEvent.transport == args.transport)
+                      and (args.fromHours is None or anEvent.time >= args.fromHours)
+                      and (args.toHours is None or anEvent.time <= args.toHours))
+        elif args.transport is not None:
+            events = eventLog.ofTransport(args.transport, args.fromHours, args.toHours)
+        else:
+            events = eventLog.between(args.fromHours, args.toHours)
+
+        for anEvent in events:
+            print(dumps(anEvent.asDict()))
@@ -0,0 +1,416 @@
+"""
+Monte Carlo makespans and delivery times under stochastic travel and
+handling times.
+
+Every sample draws the hours of the segments and the hours to load and
+unload of the transport kinds from their distributions (the hours of the
+scenario stay as they are where no distribution is given), rounded to
+minutes. The samples are scheduled in NumPy batches when NumPy is installed
+and the scenario fits the analytical schedule of `transport_tycoon.estimate`
+with routes which do not depend on the drawn hours; otherwise every sample
+is a full simulation, run in worker processes.
+
+Uncertainties of a scenario file are JSON:
+
+    {
+        "segments": {"Port-A": ["triangular", 5, 6, 9]},
+        "handling": {"vessel": {"load": ["uniform", 0.5, 1.5]}}
+    }
+
+    python -m transport_tycoon.montecarlo SCENARIO.json UNCERTAINTIES.json [--samples 1000]
+"""
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from json import load
+from math import floor, log
+from pathlib import Path
+from random import Random
+from types import MappingProxyType
+from typing import Dict, Iterable, List, Mapping, NamedTuple, Optional, Sequence, Tuple, Union
+
+from transport_tycoon.common.simulator import Engine, Event, runSynchronously
+from transport_tycoon.common.util import Duration, TickClock
+from transport_tycoon.dom import CargoesUnloaded, LocationCode, ShipmentOption, TransportMap, Truck, Warehouse
+from transport_tycoon.estimate import handlingOf, MakespanEstimator
+from transport_tycoon.scenario import Scenario, simulate, TransportSpec, TRANSPORT_KINDS
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+__all__ = ('Fixed', 'LogNormal', 'MonteCarloResult', 'Triangular', 'Uncertainties', 'Uniform',
+           'loadUncertainties', 'monteCarlo')
+
+
+CLOCK = TickClock(Duration(minutes=1))
+MINUTES_PER_HOUR = 60
+
+
+class Fixed(NamedTuple):
+    hours: float
+
+    def sample(self, rnd: Random) -> float:
+        return self.hours
+
+
+class Uniform(NamedTuple):
+    low: float
+    high: float
+
+    def sample(self, rnd: Random) -> float:
+        return rnd.uniform(self.low, self.high)
+
+
+class Triangular(NamedTuple):
+    low: float
+    mode: float
+    high: float
+
+    def sample(self, rnd: Random) -> float:
+        return rnd.triangular(self.low, self.high, self.mode)
+
+
+class LogNormal(NamedTuple):
+    median: float
+    sigma: float
+
+    def sample(self, rnd: Random) -> float:
+        return rnd.lognormvariate(log(self.median), self.sigma)
+
+
+Distribution = Union[Fixed, Uniform, Triangular, LogNormal]
+
+DISTRIBUTIONS = {
+    'fixed': Fixed,
+    'uniform': Uniform,
+    'triangular': Triangular,
+    'lognormal': LogNormal,
+}
+
+HANDLINGS = ('load', 'unload')
+
+
+class Uncertainties(NamedTuple):
+    segments: Mapping[Tuple[LocationCode, LocationCode], Distribution] = MappingProxyType({})
+    handling: Mapping[Tuple[str, str], Distribution] = MappingProxyType({})
+
+
+def loadUncertainties(path: Union[str, Path]) -> Uncertainties:
+    with Path(path).open() as file:
+        spec = load(file)
+
+    def distribution(args: Sequence) -> Distribution:
+        name, *params = args
+        return DISTRIBUTIONS[name](*params)
+
+    segments = {tuple(key.split('-', 1)): distribution(args) for key, args in spec.get('segments', {}).items()}
+    handling = {(kind, handling): distribution(args)
+                for kind, handlings in spec.get('handling', {}).items()
+                for handling, args in handlings.items()}
+    unknownHandlings = sorted({handling for _, handling in handling} - set(HANDLINGS))
+    if unknownHandlings:
+        raise ValueError(f'Unknown handlings: {",".join(unknownHandlings)}')
+
+    return Uncertainties(segments, handling)
+
+
+class Draw(NamedTuple):
+    segmentHours: Tuple[float, ...]
+    handlingHours: Dict[Tuple[str, str], float]
+
+
+def inMinutes(hrs: float) -> float:
+    return max(0, round(hrs * MINUTES_PER_HOUR)) / MINUTES_PER_HOUR
+
+
+def drawSample(scenario: Scenario, uncertainties: Uncertainties, rnd: Random) -> Draw:
+
+    def segmentDistribution(origin: LocationCode, destination: LocationCode) -> Optional[Distribution]:
+        return uncertainties.segments.get((origin, destination), uncertainties.segments.get((destination, origin)))
+
+    segmentHours = []
+    for seg in scenario.segments:
+        distribution = segmentDistribution(seg.origin, seg.destination)
+        segmentHours.append(seg.hours if distribution is None else inMinutes(distribution.sample(rnd)))
+
+    handlingHours = {key: inMinutes(distribution.sample(rnd)) for key, distribution in uncertainties.handling.items()}
+    return Draw(tuple(segmentHours), handlingHours)
+
+
+def drawnScenario(scenario: Scenario, draw: Draw) -> Scenario:
+    segments = [seg._replace(hours=hrs) for seg, hrs in zip(scenario.segments, draw.segmentHours)]
+    fleet = [spec._replace(hoursToLoad=draw.handlingHours.get((spec.kind, 'load'), spec.hoursToLoad),
+                           hoursToUnload=draw.handlingHours.get((spec.kind, 'unload'), spec.hoursToUnload))
+             for spec in scenario.fleet]
+    return scenario._replace(segments=segments, fleet=fleet)
+
+
+class Deliveries:
+    """
+    Remembers when every cargo has been unloaded at its destination.
+    """
+
+    def __init__(self, cargoesCount: int):
+        self.deliveredAt: List[float] = [0.0] * cargoesCount
+
+    def __call__(self, anEvent: Event):
+        if type(anEvent) is CargoesUnloaded:
+            for aCargo in anEvent.cargoes:
+                if aCargo.destinationCode == anEvent.toWarehouse.locationCode:
+                    self.deliveredAt[int(aCargo.trackNumber)] = CLOCK.inHours(anEvent.occurredAt)
+
+
+def simulateDraw(scenario: Scenario, draw: Draw) -> List[float]:
+    deliveries = Deliveries(len(scenario.cargoes))
+    runSynchronously(simulate(drawnScenario(scenario, draw), Engine.generator, CLOCK, [deliveries], keepEvents=False))
+    return deliveries.deliveredAt
+
+
+class BatchSchedule:
+    """
+    The schedule of `MakespanEstimator` over a batch of draws at once, a
+    step per cargo for the trucks and a step per trip for the vessels of a
+    port. Times are whole minutes, as in the simulation on the minute tick
+    clock, so that ties are broken the same way.
+    """
+
+    def __init__(self, scenario: Scenario, uncertainties: Uncertainties):
+        estimator = MakespanEstimator(scenario)
+        for destinationCode in scenario.cargoes.destinationCodesSet():
+            estimator.route(destinationCode)
+        if uncertainties.segments and not hasFixedRoutes(scenario):
+            raise ValueError('Routes of the scenario depend on the drawn hours')
+
+        self.__scenario = scenario
+        self.__legs = legsOf(scenario)
+        self.__fleet: Dict[Optional[LocationCode], List[TransportSpec]] = {}
+        for spec in scenario.fleet:
+            self.__fleet.setdefault(None if TRANSPORT_KINDS[spec.kind] is Truck else spec.startAt, []).append(spec)
+
+    def __call__(self, draws: Sequence[Draw]) -> 'numpy.ndarray':
+        np = numpy
+        samples = len(draws)
+        rows = np.arange(samples)
+
+        def minutes(hrs) -> 'numpy.ndarray':
+            return np.rint(np.asarray(hrs, dtype=float) * MINUTES_PER_HOUR).astype(np.int64)
+
+        segmentMinutes = minutes([draw.segmentHours for draw in draws]).reshape(samples, -1)
+
+        def handlingMinutes(spec: TransportSpec, handling: str) -> 'numpy.ndarray':
+            fixed = handlingOf(spec)
+            default = fixed.hoursToLoad if handling == 'load' else fixed.hoursToUnload
+            return minutes([draw.handlingHours.get((spec.kind, handling), default) for draw in draws])
+
+        def minutesOf(segmentIndexes: Sequence[int]) -> 'numpy.ndarray':
+            return segmentMinutes[:, segmentIndexes].sum(axis=1)
+
+        trucks = self.__fleet[None]
+        truckLoad, truckUnload = handlingMinutes(trucks[0], 'load'), handlingMinutes(trucks[0], 'unload')
+        destinationCodes = [aCargo.destinationCode for aCargo in self.__scenario.cargoes]
+        routes = {code: (minutesOf(legs.byLand), legs.port, minutesOf(legs.bySea))
+                  for code, legs in self.__legs.items() if code in set(destinationCodes)}
+
+        deliveredAt = np.zeros((samples, len(destinationCodes)), dtype=np.int64)
+        broughtToPorts: Dict[LocationCode, List[int]] = {}
+        readyAt = np.zeros((samples, len(trucks)), dtype=np.int64)
+        for index, destinationCode in enumerate(destinationCodes):
+            byLand, port, _ = routes[destinationCode]
+            truck = readyAt.argmin(axis=1)
+            broughtAt = readyAt[rows, truck] + truckLoad + byLand + truckUnload
+            readyAt[rows, truck] = broughtAt + byLand
+            deliveredAt[:, index] = broughtAt
+            if port is not None:
+                broughtToPorts.setdefault(port, []).append(index)
+
+        for port, indexes in broughtToPorts.items():
+            vessels = self.__fleet[port]
+            capacity = handlingOf(vessels[0]).capacity
+            vesselLoad, vesselUnload = handlingMinutes(vessels[0], 'load'), handlingMinutes(vessels[0], 'unload')
+            bySea = np.stack([routes[destinationCodes[index]][2] for index in indexes], axis=1)
+
+            order = deliveredAt[:, indexes].argsort(axis=1, kind='stable')
+            brought = np.take_along_axis(deliveredAt[:, indexes], order, axis=1)
+            bySea = np.take_along_axis(bySea, order, axis=1)
+            delivered = np.zeros_like(brought)
+
+            readyAt = np.zeros((samples, len(vessels)), dtype=np.int64)
+            nextCargo = np.zeros(samples, dtype=int)
+            while True:
+                active = nextCargo < len(indexes)
+                if not active.any():
+                    break
+
+                head = np.minimum(nextCargo, len(indexes) - 1)
+                vessel = readyAt.argmin(axis=1)
+                vesselReadyAt = readyAt[rows, vessel]
+                headBroughtAt = brought[rows, head]
+                waited = vesselReadyAt <= headBroughtAt
+                loadingAt = np.where(waited, headBroughtAt, vesselReadyAt)
+                broughtBefore = (brought < loadingAt[:, None]).sum(axis=1)
+                upTo = np.where(waited, head + 1, np.minimum(head + capacity, broughtBefore))
+
+                tripSea = bySea[rows, head]
+                deliveredTo = loadingAt + vesselLoad + tripSea + vesselUnload
+                for offset in range(capacity):
+                    cargo = head + offset
+                    inTrip = active & (cargo < upTo)
+                    delivered[rows[inTrip], cargo[inTrip]] = deliveredTo[inTrip]
+
+                readyAt[rows, vessel] = np.where(active, deliveredTo + tripSea, vesselReadyAt)
+                nextCargo = np.where(active, upTo, nextCargo)
+
+            unsorted = np.empty_like(delivered)
+            np.put_along_axis(unsorted, order, delivered, axis=1)
+            deliveredAt[:, indexes] = unsorted
+
+        return deliveredAt / MINUTES_PER_HOUR
+
+
+class Legs(NamedTuple):
+    byLand: Tuple[int, ...]
+    port: Optional[LocationCode]
+    bySea: Tuple[int, ...]
+
+
+def legsOf(scenario: Scenario) -> Dict[LocationCode, Legs]:
+    """
+    Indexes of the segments a cargo travels by land and by sea to each
+    destination, along the fastest itineraries of the scenario.
+    """
+    warehouses = {locationCode: Warehouse(None, locationCode) for locationCode in scenario.warehouses}
+    transportMap = TransportMap()
+    segmentIndexes = {}
+    for index, seg in enumerate(scenario.segments):
+        transportMap.segment(warehouses[seg.origin], warehouses[seg.destination], seg.hours, seg.shipmentOption)
+        segmentIndexes[frozenset((seg.origin, seg.destination))] = index
+
+    def indexesOf(segments) -> Tuple[int, ...]:
+        return tuple(segmentIndexes[frozenset((seg.origin.locationCode, seg.destination.locationCode))] for seg in segments)
+
+    originCode = next(spec.startAt for spec in scenario.fleet if TRANSPORT_KINDS[spec.kind] is Truck)
+    legs = {}
+    for destinationCode in scenario.cargoes.destinationCodesSet():
+        itinerary = transportMap.findItinerary(originCode, destinationCode)
+        byLand = itinerary.forShipBy(ShipmentOption.land)
+        port = None if byLand.destination is itinerary.destination else \
+            byLand.destination.locationCode if byLand.segments else originCode
+        legs[destinationCode] = Legs(indexesOf(byLand.segments), port, indexesOf(itinerary.segments[len(byLand.segments):]))
+
+    return legs
+
+
+def hasFixedRoutes(scenario: Scenario) -> bool:
+    """
+    Whether the map is a tree, so there is a single itinerary between any
+    two warehouses whatever the hours of the segments.
+    """
+    locationCodes = {code for seg in scenario.segments for code in (seg.origin, seg.destination)}
+    return len({frozenset((seg.origin, seg.destination)) for seg in scenario.segments}) == len(locationCodes) - 1
+
+
+def percentile(values: Sequence[float], p: float) -> float:
+    """
+    The p-th percentile with linear interpolation between closest ranks.
+    """
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * p / 100
+    lower = floor(rank)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+class MonteCarloResult:
+    """
+    Delivery times of every cargo in every sample, in hours.
+    """
+
+    def __init__(self, trackNumbers: Sequence[str], deliveredAt: Sequence[Sequence[float]], vectorized: bool):
+        self.trackNumbers = trackNumbers
+        self.deliveredAt = deliveredAt
+        self.vectorized = vectorized
+        self.__columns = {trackNumber: column for column, trackNumber in enumerate(trackNumbers)}
+
+    @property
+    def samples(self) -> int:
+        return len(self.deliveredAt)
+
+    @property
+    def makespans(self) -> Sequence[float]:
+        return [max(delivered, default=0.0) for delivered in self.deliveredAt]
+
+    def percentile(self, p: float) -> float:
+        return percentile(self.makespans, p)
+
+    def cargoPercentile(self, trackNumber: str, p: float) -> float:
+        column = self.__columns[trackNumber]
+        return percentile([delivered[column] for delivered in self.deliveredAt], p)
+
+    def summary(self, percentiles: Sequence[float] = (50, 95)) -> dict:
+        makespans = self.makespans
+        return {
+            'samples': self.samples,
+            'vectorized': self.vectorized,
+            'makespan': {f'p{p:g}': percentile(makespans, p) for p in percentiles},
+            'cargoes': {trackNumber: {f'p{p:g}': self.cargoPercentile(trackNumber, p) for p in percentiles}
+                        for trackNumber in self.trackNumbers},
+        }
+
+
+def monteCarlo(scenario: Scenario,
+               uncertainties: Uncertainties,
+               samples: int = 1000,
+               seed: int = 0,
+               vectorized: Optional[bool] = None,
+               batchSize: int = 4096,
+               workers: Optional[int] = None
+               ) -> MonteCarloResult:
+    """
+    Draws the samples and schedules them in NumPy batches if `vectorized`
+    (by default whenever it is possible), or simulates each of them in
+    worker processes otherwise.
+    """
+    rnd = Random(seed)
+    draws = [drawSample(scenario, uncertainties, rnd) for _ in range(samples)]
+    trackNumbers = [aCargo.trackNumber for aCargo in scenario.cargoes]
+
+    schedule = None
+    if vectorized is not False and numpy is not None:
+        try:
+            schedule = BatchSchedule(scenario, uncertainties)
+        except ValueError:
+            if vectorized:
+                raise
+    elif vectorized:
+        raise ValueError('Vectorized Monte Carlo needs NumPy')
+
+    if schedule is not None:
+        batches = [schedule(draws[at:at + batchSize]) for at in range(0, samples, batchSize)]
+        deliveredAt = numpy.concatenate(batches).tolist() if batches else []
+        return MonteCarloResult(trackNumbers, deliveredAt, vectorized=True)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        deliveredAt = list(executor.map(partial(simulateDraw, scenario), draws, chunksize=max(1, samples // 64)))
+
+    return MonteCarloResult(trackNumbers, deliveredAt, vectorized=False)
+
+
+if __name__ == '__main__':
+    from argparse import ArgumentParser
+    from json import dumps
+    from transport_tycoon.scenario import loadScenario
+
+    parser = ArgumentParser(description='Monte Carlo makespans of a scenario under stochastic hours')
+    parser.add_argument('scenario')
+    parser.add_argument('uncertainties')
+    parser.add_argument('--samples', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--simulate', action='store_true', help='simulate every sample, even if NumPy is installed')
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    result = monteCarlo(loadScenario(args.scenario), loadUncertainties(args.uncertainties), args.samples, args.seed,
+                        vectorized=False if args.simulate else None, workers=args.workers)
+    print(dumps(result.summary(), indent=2))
@@ -0,0 +1,200 @@
+"""
+Searches the release order of the cargoes of a manifest and the destinations
+each transport serves for the minimal makespan.
+
+A plan is evaluated by simulating it. The search is a local search: every
+iteration evaluates a batch of random neighbours of the current plan in
+worker processes (swapping or moving cargoes in the release order, or
+dedicating a transport to a destination) and moves to the best of them. It
+stops early when the makespan reaches the analytical lower bound.
+
+    python -m transport_tycoon.optimize ABBBABAAABBB [--iterations 30] [--workers 4]
+"""
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from math import inf
+from random import Random
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from transport_tycoon.common.simulator import Engine, Event, runSynchronously
+from transport_tycoon.common.util import TickClock
+from transport_tycoon.dom import LocationCode
+from transport_tycoon.estimate import MakespanEstimator
+from transport_tycoon.scenario import build, Manifest, Scenario, simulate
+
+
+__all__ = ('Optimized', 'Plan', 'evaluatePlan', 'optimize', 'plannedScenario')
+
+
+CLOCK = TickClock()
+
+Serves = Optional[Tuple[LocationCode, ...]]
+
+
+class Plan(NamedTuple):
+    releaseOrder: Tuple[int, ...]
+    serves: Tuple[Serves, ...]
+
+
+class Optimized(NamedTuple):
+    plan: Plan
+    makespan: float
+    initialMakespan: float
+    lowerBound: Optional[float]
+    evaluated: int
+    occurredEvents: Sequence[Event]
+
+
+def plannedScenario(scenario: Scenario, plan: Plan) -> Scenario:
+    """
+    The scenario with its cargoes brought in the release order and its
+    transports serving the planned destinations.
+    """
+    manifest = scenario.cargoes
+    cargoes = list(manifest)
+    released = [cargoes[index] for index in plan.releaseOrder]
+    return scenario._replace(
+        cargoes=Manifest(manifest.originCode,
+                         [aCargo.destinationCode for aCargo in released],
+                         [aCargo.trackNumber for aCargo in released]),
+        fleet=[spec._replace(serves=serves) for spec, serves in zip(scenario.fleet, plan.serves)],
+    )
+
+
+def evaluatePlan(scenario: Scenario, plan: Plan) -> float:
+    """
+    The makespan of the plan in hours, infinite if some cargoes can never
+    be delivered, e.g. no transport serves their destination.
+    """
+    world = runSynchronously(build(plannedScenario(scenario, plan), Engine.generator, CLOCK))
+    runSynchronously(world.simulator.proceed(world.allCargoesDelivered, keepEvents=False))
+    if not world.allCargoesDelivered():
+        return inf
+
+    return CLOCK.inHours(world.simulator.currentTime)
+
+
+def lowerBoundOf(scenario: Scenario) -> Optional[float]:
+    try:
+        estimator = MakespanEstimator(scenario._replace(fleet=[spec._replace(serves=None) for spec in scenario.fleet]))
+        return estimator.estimate(scenario.cargoes.destinationCodes).lowerBound
+    except ValueError:
+        return None
+
+
+class Neighbourhood:
+
+    def __init__(self, scenario: Scenario, searchServes: bool, rnd: Random):
+        self.__destinationCodes = scenario.cargoes.destinationCodes
+        self.__rnd = rnd
+        destinations = sorted(set(self.__destinationCodes))
+        self.__servesChoices: List[List[Serves]] = [
+            [spec.serves, None, *((code,) for code in destinations)] if searchServes else [spec.serves]
+            for spec in scenario.fleet
+        ]
+
+    def neighbour(self, plan: Plan) -> Plan:
+        rnd = self.__rnd
+        order = list(plan.releaseOrder)
+        move = rnd.randrange(3) if len(order) > 1 else 2
+        if move == 0:
+            i, j = rnd.sample(range(len(order)), 2)
+            order[i], order[j] = order[j], order[i]
+        elif move == 1:
+            order.insert(rnd.randrange(len(order)), order.pop(rnd.randrange(len(order))))
+        else:
+            transport = rnd.randrange(len(plan.serves))
+            serves = list(plan.serves)
+            serves[transport] = rnd.choice(self.__servesChoices[transport])
+            return plan._replace(serves=tuple(serves))
+
+        return plan._replace(releaseOrder=tuple(order))
+
+    def canonical(self, plan: Plan) -> Tuple:
+        """
+        Plans releasing the same destinations in the same order are alike.
+        """
+        return tuple(self.__destinationCodes[index] for index in plan.releaseOrder), plan.serves
+
+
+def optimize(scenario: Scenario,
+             iterations: int = 30,
+             neighbours: int = 16,
+             seed: int = 0,
+             searchServes: bool = True,
+             workers: Optional[int] = None
+             ) -> Optimized:
+    """
+    Searches for the plan of the (inline) manifest of the scenario with the
+    minimal makespan and simulates it once more for its occurred events.
+    """
+    if not isinstance(scenario.cargoes, Manifest):
+        raise ValueError('Only an inline manifest can be optimized')
+
+    rnd = Random(seed)
+    neighbourhood = Neighbourhood(scenario, searchServes, rnd)
+    lowerBound = lowerBoundOf(scenario)
+    evaluated: Dict[Tuple, float] = {}
+
+    current = Plan(tuple(range(len(scenario.cargoes))), tuple(spec.serves for spec in scenario.fleet))
+    currentMakespan = initialMakespan = evaluated[neighbourhood.canonical(current)] = evaluatePlan(scenario, current)
+    best, bestMakespan = current, currentMakespan
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for _ in range(iterations):
+            if bestMakespan == lowerBound:
+                break
+
+            candidates: Dict[Tuple, Plan] = {}
+            for _ in range(neighbours * 4):
+                candidate = neighbourhood.neighbour(current)
+                key = neighbourhood.canonical(candidate)
+                if key not in evaluated and key not in candidates:
+                    candidates[key] = candidate
+                if len(candidates) == neighbours:
+                    break
+
+            if not candidates:
+                break
+
+            makespans = list(executor.map(partial(evaluatePlan, scenario), candidates.values()))
+            evaluated.update(zip(candidates, makespans))
+            makespan, candidate = min(zip(makespans, candidates.values()), key=lambda pair: pair[0])
+            if makespan <= currentMakespan:
+                current, currentMakespan = candidate, makespan
+            if makespan < bestMakespan:
+                best, bestMakespan = candidate, makespan
+
+    occurredEvents = runSynchronously(simulate(plannedScenario(scenario, best), Engine.generator, CLOCK))
+    return Optimized(best, bestMakespan, initialMakespan, lowerBound, len(evaluated), occurredEvents)
+
+
+if __name__ == '__main__':
+    import sys
+    from argparse import ArgumentParser
+    from json import dumps
+    from transport_tycoon.event_adapter import JsonLinesEncoder
+    from transport_tycoon.scenario import exerciseScenario
+
+    parser = ArgumentParser(description='Searches the release order and transport destinations of a manifest')
+    parser.add_argument('manifest', help='destinations of the cargoes, e.g. ABBBABAAABBB')
+    parser.add_argument('--iterations', type=int, default=30)
+    parser.add_argument('--neighbours', type=int, default=16)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    scenario = exerciseScenario(list(args.manifest))
+    optimized = optimize(scenario, args.iterations, args.neighbours, args.seed, workers=args.workers)
+    destinationCodes = scenario.cargoes.destinationCodes
+    print(dumps({
+        'releaseOrder': ''.join(destinationCodes[index] for index in optimized.plan.releaseOrder),
+        'serves': {spec.name: serves for spec, serves in zip(scenario.fleet, optimized.plan.serves)},
+        'hours': optimized.makespan,
+        'initialHours': optimized.initialMakespan,
+        'lowerBound': optimized.lowerBound,
+        'evaluated': optimized.evaluated,
+    }), file=sys.stderr)
+    with JsonLinesEncoder(sys.stdout, clock=CLOCK) as encoder:
+        for anEvent in optimized.occurredEvents:
+            encoder(anEvent)
@@ -0,0 +1,288 @@
+"""
+Partitioned simulation of a scenario: its warehouses are split into regions
+and every region is simulated in a separate process.
+
+A transport is simulated by the region it is at. When it departs to a
+warehouse of another region its arrival is handed over to that region with
+the state of the transport (`TransportState`), and the region takes the
+transport over. The regions advance in windows: a hand-over departs at least
+the shortest travel time between two regions (the lookahead) before it
+arrives, so all the events earlier than the earliest pending event plus the
+lookahead can be processed by the regions independently.
+
+The regions order their events `Ordering.causal`: by the rank of the event
+which has scheduled them, then by the number of events it has scheduled.
+The regions rank their events of a window provisionally, the coordinator
+merges them in the order of a single simulator and sends the ranks back, so
+the merged events are identical to the events of a single simulator (with
+the default ordering, which is the same).
+
+    python -m transport_tycoon.partition SCENARIO.json --region Factory,B --region Port,A
+"""
+from heapq import heapify, heappop, heappush
+from math import inf
+from multiprocessing import Pipe, Process
+from multiprocessing.connection import Connection
+from typing import Collection, Dict, List, NamedTuple, Sequence, Tuple
+
+from transport_tycoon.common.simulator import Engine, Ordering, runSynchronously
+from transport_tycoon.common.util import TickClock, Time
+from transport_tycoon.dom import CargoesUnloaded, LocationCode, TransportArrived, TransportState
+from transport_tycoon.event_adapter import eventToDict
+from transport_tycoon.scenario import build, Manifest, Scenario, simulate
+
+
+__all__ = ('HandOver', 'lookaheadOf', 'simulatePartitioned', 'simulateSingle')
+
+
+CLOCK = TickClock()
+
+Region = Collection[LocationCode]
+
+
+class HandOver(NamedTuple):
+    """
+    The arrival of a transport at a warehouse of another region.
+    """
+    occurredAt: Time
+    tieBreak: Tuple
+    transportName: str
+    atWarehouse: LocationCode
+    state: TransportState
+
+
+class Recorded(NamedTuple):
+    occurredAt: Time
+    tieBreak: Tuple
+    event: dict
+    delivered: int
+
+
+def ownersOf(scenario: Scenario, regions: Sequence[Region]) -> Dict[LocationCode, int]:
+    owners = {}
+    for index, region in enumerate(regions):
+        for locationCode in region:
+            if locationCode in owners:
+                raise ValueError(f'{locationCode} is in more than one region')
+            owners[locationCode] = index
+
+    unassigned = sorted(set(scenario.warehouses) - set(owners))
+    if unassigned:
+        raise ValueError(f'Warehouses out of regions: {",".join(unassigned)}')
+
+    return owners
+
+
+def lookaheadOf(scenario: Scenario, owners: Dict[LocationCode, int]) -> float:
+    """
+    The shortest travel time in ticks between two regions, infinite if the
+    regions are not connected.
+    """
+    lookahead = min((CLOCK.hours(seg.hours) for seg in scenario.segments if owners[seg.origin] != owners[seg.destination]),
+                    default=inf)
+    if not lookahead > 0:
+        raise ValueError('Regions connected by a segment of no travel time cannot be simulated apart')
+
+    return lookahead
+
+
+def regionalCargoes(scenario: Scenario, region: Region) -> Scenario:
+    """
+    The scenario with only the cargoes of a manifest at the region, the
+    cargoes of a binary manifest are pulled by their origins anyway.
+    """
+    cargoes = scenario.cargoes
+    if isinstance(cargoes, Manifest) and cargoes.originCode not in region:
+        return scenario._replace(cargoes=Manifest(cargoes.originCode, []))
+
+    return scenario
+
+
+def regionWorker(connection: Connection, scenario: Scenario, region: Region):
+    """
+    Simulates the region window by window: receives the end of a window, the
+    rank of its first event, the ranks of the events of the previous window
+    and the hand-overs to the region, sends back the hand-overs to the other
+    regions, the occurred events and the time of the next event.
+    """
+    region = frozenset(region)
+    world = runSynchronously(build(regionalCargoes(scenario, region), Engine.generator, CLOCK,
+                                   ordering=Ordering.causal))
+    simulator = world.simulator
+    fleet = {transport.name: transport for transport in world.fleet}
+    handOvers: List[HandOver] = []
+    recorded: List[Recorded] = []
+
+    def inRegion(anEvent) -> bool:
+        return type(anEvent) is not TransportArrived or anEvent.atWarehouse.locationCode in region
+
+    def handOver(entry: Tuple) -> bool:
+        occurredAt, tieBreak, anEvent = entry
+        if inRegion(anEvent):
+            return False
+
+        transport = anEvent.source
+        handOvers.append(HandOver(occurredAt, tieBreak, transport.name, anEvent.atWarehouse.locationCode,
+                                  transport.state()))
+        return True
+
+    def takeOver(message: HandOver):
+        transport = fleet[message.transportName]
+        transport.restore(message.state)
+        simulator.inject((message.occurredAt, message.tieBreak,
+                          TransportArrived(transport,
+                                           atWarehouse=world.warehouses[message.atWarehouse],
+                                           cargoes=message.state.cargoes,
+                                           occurredAt=message.occurredAt)))
+
+    def record(anEvent):
+        delivered = 0
+        if type(anEvent) is CargoesUnloaded:
+            locationCode = anEvent.toWarehouse.locationCode
+            delivered = sum(aCargo.destinationCode == locationCode for aCargo in anEvent.cargoes)
+        recorded.append(Recorded(anEvent.occurredAt, simulator.currentTieBreak,
+                                 eventToDict(anEvent, CLOCK.origin(), CLOCK), delivered))
+
+    simulator.retain(inRegion)
+    simulator.divert(handOver)
+    simulator.subscribe(record)
+    connection.send(simulator.nextEventTime())
+
+    rank = 0
+    while True:
+        command = connection.recv()
+        if command is None:
+            break
+
+        windowEnd, nextRank, ranks, messages = command
+        simulator.retie(lambda cause: cause if cause < rank else ranks[cause - rank])
+        for message in messages:
+            takeOver(message)
+        rank = nextRank
+        simulator.rankFrom(rank)
+
+        def windowPassed() -> bool:
+            return simulator.nextEventTime() >= windowEnd
+
+        runSynchronously(simulator.proceed(windowPassed, keepEvents=False))
+        connection.send((handOvers[:], recorded[:], simulator.nextEventTime()))
+        handOvers.clear()
+        recorded.clear()
+
+    connection.close()
+
+
+def mergeWindow(rank: int, windows: Sequence[List[Recorded]]) -> Tuple[List[Recorded], List[List[int]]]:
+    """
+    Merges the events of a window, in the order every region has processed
+    them, as a single simulator would process them from the given rank on,
+    and gives the ranks of the events of every region.
+    """
+    ranks: List[List[int]] = [[] for _ in windows]
+
+    def headOf(index: int, at: int) -> Tuple:
+        r = windows[index][at]
+        cause, caused = r.tieBreak
+        return r.occurredAt, (cause if cause < rank else ranks[index][cause - rank], caused), index, at
+
+    heads = [headOf(index, 0) for index, window in enumerate(windows) if window]
+    heapify(heads)
+    merged = []
+    while heads:
+        _, _, index, at = heappop(heads)
+        ranks[index].append(rank + len(merged))
+        merged.append(windows[index][at])
+        if at + 1 < len(windows[index]):
+            heappush(heads, headOf(index, at + 1))
+
+    return merged, ranks
+
+
+def simulatePartitioned(scenario: Scenario, regions: Sequence[Region]) -> List[dict]:
+    """
+    Simulates the scenario till all the cargoes have been delivered, every
+    region in a process, and returns the occurred events as dicts.
+    """
+    owners = ownersOf(scenario, regions)
+    lookahead = lookaheadOf(scenario, owners)
+
+    connections = []
+    workers = []
+    for region in regions:
+        connection, workerConnection = Pipe()
+        worker = Process(target=regionWorker, args=(workerConnection, scenario, tuple(region)), daemon=True)
+        worker.start()
+        connections.append(connection)
+        workers.append(worker)
+
+    cargoesToDeliver = len(scenario.cargoes)
+    occurredEvents = []
+    delivered = 0
+    try:
+        nextEventTimes = [connection.recv() for connection in connections]
+        inboxes: List[List[HandOver]] = [[] for _ in regions]
+        ranks: List[List[int]] = [[] for _ in regions]
+        rank = 0
+        while delivered < cargoesToDeliver:
+            pending = [time for time in nextEventTimes if time is not None]
+            pending.extend(message.occurredAt for inbox in inboxes for message in inbox)
+            if not pending:
+                break
+
+            windowEnd = min(pending) + lookahead
+            for connection, inbox, regionRanks in zip(connections, inboxes, ranks):
+                connection.send((windowEnd, rank, regionRanks, inbox))
+
+            inboxes = [[] for _ in regions]
+            handOvers, windows = [], []
+            for index, connection in enumerate(connections):
+                regionHandOvers, events, nextEventTimes[index] = connection.recv()
+                handOvers.append(regionHandOvers)
+                windows.append(events)
+
+            merged, ranks = mergeWindow(rank, windows)
+            for index, regionHandOvers in enumerate(handOvers):
+                for message in regionHandOvers:
+                    cause, caused = message.tieBreak
+                    tieBreak = (cause if cause < rank else ranks[index][cause - rank], caused)
+                    inboxes[owners[message.atWarehouse]].append(message._replace(tieBreak=tieBreak))
+            rank += len(merged)
+
+            for r in merged:
+                if delivered == cargoesToDeliver:
+                    break
+                occurredEvents.append(r.event)
+                delivered += r.delivered
+    finally:
+        for connection in connections:
+            connection.send(None)
+        for worker in workers:
+            worker.join()
+
+    return occurredEvents
+
+
+def simulateSingle(scenario: Scenario) -> List[dict]:
+    """
+    The events of a single simulator which the partitioned simulation is
+    identical to.
+    """
+    occurredEvents = runSynchronously(simulate(scenario, Engine.generator, CLOCK))
+    return [eventToDict(anEvent, CLOCK.origin(), CLOCK) for anEvent in occurredEvents]
+
+
+if __name__ == '__main__':
+    import sys
+    from argparse import ArgumentParser
+    from json import dumps
+    from transport_tycoon.scenario import loadScenario
+
+    parser = ArgumentParser(description='Simulates the regions of a scenario in separate processes')
+    parser.add_argument('scenario', help='a scenario JSON file')
+    parser.add_argument('--region', action='append', required=True,
+                        help='comma separated location codes of a region, once per region')
+    args = parser.parse_args()
+
+    for occurredEvent in simulatePartitioned(loadScenario(args.scenario),
+                                             [region.split(',') for region in args.region]):
+        print(dumps(occurredEvent))
@@ -0,0 +1,371 @@
+"""
+Scenarios: warehouses, segments, a fleet and a cargo manifest.
+
+A scenario file is JSON:
+
+    {
+        "warehouses": ["Factory", "Port", "A", "B"],
+        "segments": [
+            {"from": "Factory", "to": "Port", "hours": 1, "by": "land"},
+            {"from": "Port", "to": "A", "hours": 6, "by": "sea"},
+            {"from": "Factory", "to": "B", "hours": 5, "by": "land"}
+        ],
+        "fleet": [
+            {"kind": "truck", "name": "Truck 1", "startAt": "Factory"},
+            {"kind": "vessel", "name": "Vessel 1", "startAt": "Port",
+             "capacity": 4, "hoursToLoad": 1, "hoursToUnload": 1}
+        ],
+        "cargoes": {"origin": "Factory", "destinations": "ABBBABAAABBB"}
+    }
+
+A transport may be dedicated to some destinations, e.g. "serves": ["A"], and
+then takes only the cargoes for them.
+
+Instead of the inline destinations "cargoes" may refer to a binary manifest,
+{"file": "manifest.bin"}, relative to the scenario file. A binary manifest is
+
+    header:   '<4sHHQ' magic b'TTCM', version, number of codes, number of cargoes
+    codes:    per code '<HB' length and flags (1 if it is a destination,
+              2 if an origin), then the UTF-8 bytes of a location code
+    records:  per cargo '<HH' indexes of its origin and destination codes
+
+and the track number of a cargo is its position in the manifest. The file
+is memory-mapped and its records are streamed to the origin warehouses as
+they pull them (see `CargoSupply`), so only the cargoes at the origins are
+kept in memory.
+"""
+from itertools import chain, filterfalse
+from json import load
+from logging import getLogger
+from mmap import ACCESS_READ, mmap
+from pathlib import Path
+from struct import calcsize, iter_unpack, pack, Struct
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+from transport_tycoon.common.metrics import DeliveryMetrics
+from transport_tycoon.common.simulator import Engine, Event, Ordering, Simulator
+from transport_tycoon.common.sinks import Sink
+from transport_tycoon.common.stats import SimulationStats
+from transport_tycoon.common.tracing import Tracer
+from transport_tycoon.common.util import Clock
+from transport_tycoon.dom import (Cargo, CargoSupply, LocationCode, ShipmentOption, Transport, TransportMap, Truck,
+                                  Vessel, Warehouse)
+
+
+__all__ = ('BinaryManifest', 'Manifest', 'Scenario', 'SegmentSpec', 'TransportSpec', 'World',
+           'build', 'exerciseScenario', 'loadScenario', 'simulate', 'writeBinaryManifest')
+
+
+LOG = getLogger(__name__)
+
+
+TRANSPORT_KINDS = {
+    'truck': Truck,
+    'vessel': Vessel,
+}
+
+
+class SegmentSpec(NamedTuple):
+    origin: LocationCode
+    destination: LocationCode
+    hours: int
+    shipmentOption: ShipmentOption
+
+
+class TransportSpec(NamedTuple):
+    kind: str
+    name: str
+    startAt: LocationCode
+    capacity: Optional[int] = None
+    hoursToLoad: Optional[int] = None
+    hoursToUnload: Optional[int] = None
+    serves: Optional[Sequence[LocationCode]] = None
+
+
+class Manifest:
+    """
+    Cargoes of the given destinations, all at the same origin. The track
+    number of a cargo is its position, unless the track numbers are given.
+    """
+
+    def __init__(self,
+                 originCode: LocationCode,
+                 destinationCodes: Sequence[LocationCode],
+                 trackNumbers: Optional[Sequence[str]] = None):
+        self.originCode = originCode
+        self.destinationCodes = destinationCodes
+        self.trackNumbers = trackNumbers
+
+    def locationCodes(self) -> Iterable[LocationCode]:
+        return [self.originCode, *self.destinationCodes]
+
+    def destinationCodesSet(self) -> Iterable[LocationCode]:
+        return set(self.destinationCodes)
+
+    def __len__(self) -> int:
+        return len(self.destinationCodes)
+
+    def __iter__(self) -> Iterator[Cargo]:
+        trackNumbers = map(str, range(len(self.destinationCodes))) if self.trackNumbers is None else self.trackNumbers
+        for trackNumber, destinationCode in zip(trackNumbers, self.destinationCodes):
+            yield Cargo(trackNumber, self.originCode, destinationCode)
+
+
+MAGIC = b'TTCM'
+VERSION = 2
+HEADER = Struct('<4sHHQ')
+CODE = Struct('<HB')
+IS_DESTINATION = 1
+IS_ORIGIN = 2
+RECORD = '<HH'
+RECORDS_PER_CHUNK = 1 << 16
+
+
+def writeBinaryManifest(path: Union[str, Path], cargoes: Iterable[Tuple[LocationCode, LocationCode]]):
+    """
+    Writes the (origin, destination) pairs as a binary manifest.
+    """
+    codes: Dict[LocationCode, int] = {}
+    originCodes, destinationCodes = set(), set()
+
+    def codeIndex(locationCode: LocationCode) -> int:
+        return codes.setdefault(locationCode, len(codes))
+
+    records = bytearray()
+    count = 0
+    for originCode, destinationCode in cargoes:
+        records += pack(RECORD, codeIndex(originCode), codeIndex(destinationCode))
+        originCodes.add(originCode)
+        destinationCodes.add(destinationCode)
+        count += 1
+
+    with open(path, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, VERSION, len(codes), count))
+        for locationCode in codes:
+            encoded = locationCode.encode()
+            flags = (IS_DESTINATION if locationCode in destinationCodes else 0) | \
+                (IS_ORIGIN if locationCode in originCodes else 0)
+            file.write(CODE.pack(len(encoded), flags))
+            file.write(encoded)
+        file.write(records)
+
+
+class BinaryManifest:
+    """
+    A memory-mapped binary manifest, see the module docs for the format.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        with open(self.path, 'rb') as file:
+            header = file.read(HEADER.size)
+            if len(header) < HEADER.size:
+                raise ValueError(f'Not a cargo manifest: {self.path}')
+
+            magic, version, codesCount, self.__count = HEADER.unpack(header)
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f'Not a cargo manifest (version {VERSION}): {self.path}')
+
+            self.codes: List[LocationCode] = []
+            self.__originCodes = set()
+            self.__destinationCodes = set()
+            for _ in range(codesCount):
+                length, flags = CODE.unpack(file.read(CODE.size))
+                self.codes.append(file.read(length).decode())
+                if flags & IS_ORIGIN:
+                    self.__originCodes.add(self.codes[-1])
+                if flags & IS_DESTINATION:
+                    self.__destinationCodes.add(self.codes[-1])
+
+            self.__recordsAt = file.tell()
+
+    def locationCodes(self) -> Iterable[LocationCode]:
+        return self.codes
+
+    def originCodesSet(self) -> Iterable[LocationCode]:
+        return self.__originCodes
+
+    def destinationCodesSet(self) -> Iterable[LocationCode]:
+        return self.__destinationCodes
+
+    def __len__(self) -> int:
+        return self.__count
+
+    def __iter__(self) -> Iterator[Cargo]:
+        codes = self.codes
+        recordsEnd = self.__recordsAt + self.__count * calcsize(RECORD)
+        with open(self.path, 'rb') as file, mmap(file.fileno(), 0, access=ACCESS_READ) as mapped:
+            if len(mapped) < recordsEnd:
+                raise ValueError(f'Truncated cargo manifest: {self.path}')
+
+            trackNumber = 0
+            chunkSize = RECORDS_PER_CHUNK * calcsize(RECORD)
+            for chunkAt in range(self.__recordsAt, recordsEnd, chunkSize):
+                for origin, destination in iter_unpack(RECORD, mapped[chunkAt:min(chunkAt + chunkSize, recordsEnd)]):
+                    yield Cargo(str(trackNumber), codes[origin], codes[destination])
+                    trackNumber += 1
+
+
+class Scenario(NamedTuple):
+    warehouses: Sequence[LocationCode]
+    segments: Sequence[SegmentSpec]
+    fleet: Sequence[TransportSpec]
+    cargoes: Union[Manifest, BinaryManifest]
+
+
+def exerciseScenario(destinationCodes: Sequence[LocationCode]) -> Scenario:
+    """
+    The exercise: cargoes from the factory to A by truck and vessel via the
+    port and to B by truck.
+    """
+    return Scenario(
+        warehouses=('Factory', 'Port', 'A', 'B'),
+        segments=(
+            SegmentSpec('Factory', 'Port', 1, ShipmentOption.land),
+            SegmentSpec('Port', 'A', 6, ShipmentOption.sea),
+            SegmentSpec('Factory', 'B', 5, ShipmentOption.land),
+        ),
+        fleet=(
+            TransportSpec('truck', 'Truck 1', 'Factory'),
+            TransportSpec('truck', 'Truck 2', 'Factory'),
+            TransportSpec('vessel', 'Vessel 1', 'Port'),
+        ),
+        cargoes=Manifest('Factory', destinationCodes),
+    )
+
+
+def loadScenario(path: Union[str, Path]) -> Scenario:
+    path = Path(path)
+    with path.open() as file:
+        spec = load(file)
+
+    segments = [SegmentSpec(seg['from'], seg['to'], seg['hours'], ShipmentOption[seg.get('by', 'land')])
+                for seg in spec['segments']]
+    fleet = [TransportSpec(transport['kind'],
+                           transport['name'],
+                           transport['startAt'],
+                           transport.get('capacity'),
+                           transport.get('hoursToLoad'),
+                           transport.get('hoursToUnload'),
+                           transport.get('serves')) for transport in spec['fleet']]
+
+    cargoes = spec['cargoes']
+    if 'file' in cargoes:
+        manifest = BinaryManifest(path.parent / cargoes['file'])
+    else:
+        manifest = Manifest(cargoes['origin'], list(cargoes['destinations']))
+
+    return Scenario(spec['warehouses'], segments, fleet, manifest)
+
+
+class World(NamedTuple):
+    simulator: Simulator
+    warehouses: Dict[LocationCode, Warehouse]
+    transportMap: TransportMap
+    fleet: Sequence[Transport]
+    destinations: Sequence[Warehouse]
+    cargoesToDeliver: int
+    metrics: DeliveryMetrics
+
+    def allCargoesDelivered(self) -> bool:
+        return self.metrics.delivered == self.cargoesToDeliver
+
+
+async def build(scenario: Scenario,
+                engine: Engine = Engine.asyncio,
+                clock: Clock = Clock(),
+                stats: Optional[SimulationStats] = None,
+                tracer: Optional[Tracer] = None,
+                metrics: Optional[DeliveryMetrics] = None,
+                ordering: Ordering = Ordering.fifo
+                ) -> World:
+    """
+    Creates the simulator, warehouses, map and fleet of the scenario, brings
+    the cargoes to their origins (the ones of a binary manifest as they are
+    pulled) and lets the transports start the journey. The delivery metrics
+    are kept in any case, they tell when to stop.
+    """
+    if metrics is None:
+        metrics = DeliveryMetrics(clock)
+
+    simulator = Simulator(clock.origin(), engine=engine, clock=clock, stats=stats, tracer=tracer, metrics=metrics,
+                          ordering=ordering)
+    warehouses = {locationCode: Warehouse(simulator, locationCode) for locationCode in scenario.warehouses}
+
+    referredCodes = chain(scenario.cargoes.locationCodes(),
+                          chain.from_iterable((seg.origin, seg.destination) for seg in scenario.segments),
+                          (spec.startAt for spec in scenario.fleet))
+    unknownLocationCodes = sorted(set(filterfalse(warehouses.__contains__, referredCodes)))
+    if unknownLocationCodes:
+        raise ValueError(f'Unknown location codes: {",".join(unknownLocationCodes)}')
+
+    if isinstance(scenario.cargoes, BinaryManifest):
+        supply = CargoSupply(scenario.cargoes, warehouses, simulator.currentTime)
+        for locationCode in scenario.cargoes.originCodesSet():
+            warehouses[locationCode].supplyFrom(supply)
+    else:
+        for aCargo in scenario.cargoes:
+            warehouses[aCargo.originCode].bring(aCargo)
+
+    transportMap = TransportMap(stats, clock)
+    for seg in scenario.segments:
+        transportMap.segment(warehouses[seg.origin], warehouses[seg.destination], clock.hours(seg.hours), seg.shipmentOption)
+
+    def hoursOrNone(hrs: Optional[int]):
+        return None if hrs is None else clock.hours(hrs)
+
+    fleet = []
+    for spec in scenario.fleet:
+        if spec.kind not in TRANSPORT_KINDS:
+            raise ValueError(f'Unknown transport kind: {spec.kind}')
+
+        transport = TRANSPORT_KINDS[spec.kind](simulator, spec.name, transportMap,
+                                               capacity=spec.capacity,
+                                               timeToLoad=hoursOrNone(spec.hoursToLoad),
+                                               timeToUnload=hoursOrNone(spec.hoursToUnload),
+                                               serves=spec.serves)
+        await transport.startJourneyFrom(warehouses[spec.startAt])
+        fleet.append(transport)
+
+    destinations = [warehouses[locationCode] for locationCode in scenario.cargoes.destinationCodesSet()]
+
+    return World(simulator, warehouses, transportMap, fleet, destinations, len(scenario.cargoes), metrics)
+
+
+async def simulate(scenario: Scenario,
+                   engine: Engine = Engine.asyncio,
+                   clock: Clock = Clock(),
+                   sinks: Sequence[Sink] = (),
+                   keepEvents: bool = True,
+                   stats: Optional[SimulationStats] = None,
+                   tracer: Optional[Tracer] = None,
+                   metrics: Optional[DeliveryMetrics] = None,
+                   ordering: Ordering = Ordering.fifo
+                   ) -> Sequence[Event]:
+    """
+    Simulates the scenario till all the cargoes have been delivered.
+    """
+    world = await build(scenario, engine, clock, stats, tracer, metrics, ordering)
+    for sink in sinks:
+        world.simulator.subscribe(sink)
+
+    LOG.debug('Start simulation at %s', clock.format(world.simulator.currentTime))
+
+    occurredEvents = await world.simulator.proceed(world.allCargoesDelivered, keepEvents)
+
+    LOG.debug('Stop simulation at %s', clock.format(world.simulator.currentTime))
+    return occurredEvents
+
+
+if __name__ == '__main__':
+    import sys
+    from transport_tycoon.common.simulator import runSynchronously
+    from transport_tycoon.common.util import TickClock
+    from transport_tycoon.event_adapter import JsonLinesEncoder
+
+    if len(sys.argv) != 2:
+        sys.exit(f'Usage: python -m {__spec__.name} SCENARIO.json')
+
+    clock = TickClock()
+    with JsonLinesEncoder(sys.stdout, clock=clock) as encoder:
+        runSynchronously(simulate(loadScenario(sys.argv[1]), Engine.generator, clock, [encoder], keepEvents=False))
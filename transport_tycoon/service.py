@@ -0,0 +1,232 @@
+"""
+A long-running simulation service. Manifests are read as JSON lines from
+stdin or from the connections of a Unix socket, batched onto warm worker
+processes, and answered as soon as their batch has been simulated, so a
+request costs the simulation itself, not the interpreter start, imports or
+a new event loop.
+
+    python -m transport_tycoon.service [--socket PATH] [--workers 4] [--batch-size 32] [--batch-window 2]
+
+A request is a manifest, e.g. AABABBAB, or an object like
+{"id": 1, "manifest": "AABABBAB", "events": true}. The reply is the result
+of `transport_tycoon.batch.simulateManifest` with the id of the request, or
+its position on the connection if it has none. Replies may come out of
+order.
+"""
+from asyncio import (CancelledError, gather, get_running_loop, Future, open_unix_connection, start_unix_server,
+                     StreamReader, StreamReaderProtocol, StreamWriter, TimerHandle)
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from json import dumps, loads
+from os import cpu_count, getpid
+from typing import Awaitable, Callable, List, NamedTuple, Optional, Sequence, Tuple
+
+from transport_tycoon.batch import simulateManifest
+
+
+__all__ = ('Request', 'SimulationService', 'parseRequest', 'requestService', 'simulateBatch')
+
+
+class Request(NamedTuple):
+    id: object
+    manifest: str
+    events: bool = False
+
+
+def parseRequest(line: str, seq: int) -> Request:
+    line = line.strip()
+    if not line.startswith('{'):
+        return Request(seq, line)
+
+    request = loads(line)
+    if not isinstance(request, dict) or not isinstance(request.get('manifest'), str):
+        raise ValueError('A request is a manifest or an object with a "manifest"')
+
+    return Request(request.get('id', seq), request['manifest'], bool(request.get('events', False)))
+
+
+def simulateBatch(requests: Sequence[Request]) -> List[dict]:
+    return [dict(simulateManifest(request.manifest, request.events), id=request.id) for request in requests]
+
+
+def warmUp():
+    simulateManifest('AB')
+
+
+class SimulationService:
+    """
+    Collects the requests into batches of `batchSize`, or whatever has come
+    within `batchWindow` seconds after the first request of a batch, and
+    simulates every batch in a worker process.
+    """
+
+    def __init__(self, workers: Optional[int] = None, batchSize: int = 32, batchWindow: float = 0.002):
+        self.__workers = workers
+        self.__batchSize = batchSize
+        self.__batchWindow = batchWindow
+        self.__executor: Optional[ProcessPoolExecutor] = None
+        self.__pending: List[Tuple[Request, Future]] = []
+        self.__timer: Optional[TimerHandle] = None
+
+    async def __aenter__(self) -> 'SimulationService':
+        # The workers are started before any connection is accepted, forked
+        # later they would keep the sockets of the connections open.
+        workers = self.__workers or cpu_count() or 1
+        self.__executor = ProcessPoolExecutor(max_workers=workers, initializer=warmUp)
+        loop = get_running_loop()
+        await gather(*(loop.run_in_executor(self.__executor, getpid) for _ in range(workers)))
+        return self
+
+    async def __aexit__(self, *exc_info):
+        # The requests not batched yet are cancelled, the timer would flush
+        # them to the executor after its shutdown.
+        if self.__timer is not None:
+            self.__timer.cancel()
+            self.__timer = None
+        for _, future in self.__pending:
+            future.cancel()
+        self.__pending = []
+        self.__executor.shutdown()
+
+    async def submit(self, request: Request) -> dict:
+        future = get_running_loop().create_future()
+        self.__pending.append((request, future))
+        if len(self.__pending) >= self.__batchSize:
+            self.__flush()
+        elif self.__timer is None:
+            self.__timer = get_running_loop().call_later(self.__batchWindow, self.__flush)
+
+        return await future
+
+    def __flush(self):
+        if self.__timer is not None:
+            self.__timer.cancel()
+            self.__timer = None
+
+        batch, self.__pending = self.__pending, []
+        if not batch:
+            return
+
+        def reply(done: Future):
+            if done.cancelled():
+                for _, future in batch:
+                    future.cancel()
+                return
+
+            if done.exception() is not None:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(done.exception())
+                return
+
+            for (_, future), result in zip(batch, done.result()):
+                if not future.done():
+                    future.set_result(result)
+
+        simulated = get_running_loop().run_in_executor(self.__executor, simulateBatch, [request for request, _ in batch])
+        simulated.add_done_callback(reply)
+
+    async def handle(self, line: str, seq: int) -> dict:
+        try:
+            request = parseRequest(line, seq)
+        except ValueError as e:
+            return {'id': seq, 'error': str(e)}
+
+        return await self.submit(request)
+
+    async def serveLines(self, readLine: Callable[[], Awaitable[str]], write: Callable[[str], None]):
+        """
+        Serves the lines till the end of the input and all their replies.
+        """
+        replies = []
+
+        async def answer(line: str, seq: int):
+            write(dumps(await self.handle(line, seq)) + '\n')
+
+        seq = 0
+        while True:
+            line = await readLine()
+            if not line:
+                break
+            if line.strip():
+                replies.append(get_running_loop().create_task(answer(line, seq)))
+                seq += 1
+
+        await gather(*replies)
+
+    async def serveStdio(self):
+        import sys
+
+        def write(reply: str):
+            sys.stdout.write(reply)
+            sys.stdout.flush()
+
+        loop = get_running_loop()
+        reader = StreamReader()
+        try:
+            await loop.connect_read_pipe(lambda: StreamReaderProtocol(reader), sys.stdin)
+        except ValueError:
+            def feed():
+                for chunk in iter(partial(sys.stdin.buffer.read1, 1 << 16), b''):
+                    loop.call_soon_threadsafe(reader.feed_data, chunk)
+                loop.call_soon_threadsafe(reader.feed_eof)
+
+            loop.run_in_executor(None, feed)
+
+        async def readLine() -> str:
+            return (await reader.readline()).decode()
+
+        await self.serveLines(readLine, write)
+
+    async def serveUnix(self, path: str):
+
+        async def serveConnection(reader: StreamReader, writer: StreamWriter):
+
+            async def readLine() -> str:
+                return (await reader.readline()).decode()
+
+            try:
+                await self.serveLines(readLine, lambda reply: writer.write(reply.encode()))
+                await writer.drain()
+            except (ConnectionError, CancelledError):
+                pass
+            finally:
+                writer.close()
+
+        server = await start_unix_server(serveConnection, path)
+        async with server:
+            await server.serve_forever()
+
+
+async def requestService(path: str, lines: Sequence[str]) -> List[dict]:
+    """
+    Sends the requests to a service listening on the Unix socket and
+    collects the replies.
+    """
+    reader, writer = await open_unix_connection(path)
+    writer.write(''.join(line.rstrip('\n') + '\n' for line in lines).encode())
+    writer.write_eof()
+    replies = [loads(line) async for line in reader]
+    writer.close()
+    return replies
+
+
+if __name__ == '__main__':
+    from argparse import ArgumentParser
+    from asyncio import run
+
+    parser = ArgumentParser(description='Serves manifest simulations from stdin or a Unix socket')
+    parser.add_argument('--socket', help='a Unix socket path to listen on instead of stdin')
+    parser.add_argument('--workers', type=int, default=None, help='number of worker processes')
+    parser.add_argument('--batch-size', type=int, default=32, help='requests simulated by a worker at once')
+    parser.add_argument('--batch-window', type=float, default=2, help='milliseconds to wait for a batch to fill')
+    args = parser.parse_args()
+
+    async def serve():
+        async with SimulationService(args.workers, args.batch_size, args.batch_window / 1e3) as service:
+            if args.socket is None:
+                await service.serveStdio()
+            else:
+                await service.serveUnix(args.socket)
+
+    run(serve())
@@ -0,0 +1,100 @@
+"""
+Snapshots of a simulation for what-if branching.
+
+Run a world built from a scenario up to some simulated time, take a
+snapshot, then resume as many branches from it as needed, each with its own
+what-if change (e.g. one more vessel), in-process or in worker processes.
+Only the events after the snapshot are simulated in the branches.
+
+Only settled simulations on the generator engine can be snapshotted. Waiting
+transports are restarted on restore, as a fresh `loadCargoesFrom`.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from pickle import dumps, HIGHEST_PROTOCOL, loads
+from typing import Awaitable, Callable, Iterator, Optional, Sequence
+
+from transport_tycoon.common.simulator import Engine, Event, runSynchronously
+from transport_tycoon.common.sinks import Sink
+from transport_tycoon.common.util import Time
+from transport_tycoon.scenario import World
+
+
+__all__ = ('Snapshot', 'WhatIf', 'proceedTill', 'resume', 'resumeInProcesses')
+
+
+WhatIf = Callable[[World], Awaitable[None]]
+
+
+class Snapshot:
+    """
+    The pickled state of a world: the event queue, the warehouse queues and
+    the transports with their cargoes and assigned itineraries. Sinks are
+    not a part of the snapshot.
+    """
+
+    def __init__(self, world: World):
+        if world.simulator.engine is not Engine.generator:
+            raise ValueError('Only a simulation on the generator engine can be snapshotted')
+
+        self.takenAt: Time = world.simulator.currentTime
+        self.__state = dumps(world, HIGHEST_PROTOCOL)
+
+    @property
+    def size(self) -> int:
+        return len(self.__state)
+
+    def restore(self) -> World:
+        world: World = loads(self.__state)
+        for warehouse in world.warehouses.values():
+            warehouse.restartWaitingProcesses()
+
+        return world
+
+
+async def proceedTill(world: World, at: Time, keepEvents: bool = True) -> Sequence[Event]:
+    """
+    Proceeds the simulation with all the events occurring not later than
+    `at`, or till the cargoes have been delivered.
+    """
+    simulator = world.simulator
+
+    def tillTheTimeOrDelivered() -> bool:
+        return simulator.nextEventTime() > at or world.allCargoesDelivered()
+
+    return await simulator.proceed(tillTheTimeOrDelivered, keepEvents)
+
+
+async def resume(snapshot: Snapshot,
+                 whatIf: Optional[WhatIf] = None,
+                 sinks: Sequence[Sink] = (),
+                 keepEvents: bool = True
+                 ) -> Sequence[Event]:
+    """
+    Restores a branch from the snapshot, applies the what-if change to it and
+    simulates it till the cargoes have been delivered.
+    """
+    world = snapshot.restore()
+    if whatIf is not None:
+        await whatIf(world)
+
+    for sink in sinks:
+        world.simulator.subscribe(sink)
+
+    return await world.simulator.proceed(world.allCargoesDelivered, keepEvents)
+
+
+def resumeBranch(snapshot: Snapshot, whatIf: Optional[WhatIf]) -> Sequence[Event]:
+    return runSynchronously(resume(snapshot, whatIf))
+
+
+def resumeInProcesses(snapshot: Snapshot,
+                      whatIfs: Sequence[Optional[WhatIf]],
+                      workers: Optional[int] = None
+                      ) -> Iterator[Sequence[Event]]:
+    """
+    Resumes a branch per what-if change in worker processes and yields the
+    occurred events of the branches in order. The what-if changes must be
+    picklable, e.g. module level functions.
+    """
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(resumeBranch, [snapshot] * len(whatIfs), whatIfs)
@@ -0,0 +1,212 @@
+"""
+Sweeps of many manifests over the same topology and fleet.
+
+With NumPy the manifests are scheduled in lockstep batches: a row per
+manifest holds the time every transport is ready at and the next cargo of
+every port, and each step dispatches a truck with the next cargo of every
+manifest at once, then a vessel with the cargoes waiting at its port. The
+schedule is the one of `transport_tycoon.estimate` on the minute tick clock,
+which is what the simulation does for trucks starting at one origin and
+carrying a cargo at a time, and vessels carrying cargoes on from ports. Without NumPy, or for other
+scenarios, every manifest is simulated in worker processes.
+
+    python -m transport_tycoon.sweep [--scenario SCENARIO.json] [MANIFESTS]
+"""
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from transport_tycoon.common.simulator import Engine, runSynchronously
+from transport_tycoon.dom import LocationCode, Truck
+from transport_tycoon.estimate import handlingOf, MakespanEstimator
+from transport_tycoon.montecarlo import CLOCK, Deliveries, MINUTES_PER_HOUR
+from transport_tycoon.scenario import Manifest, Scenario, simulate, TransportSpec, TRANSPORT_KINDS
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+__all__ = ('LockstepSchedule', 'simulateDeliveries', 'sweep')
+
+
+def simulateDeliveries(scenario: Scenario, destinationCodes: Sequence[LocationCode]) -> List[float]:
+    """
+    The hours every cargo of the manifest is delivered at, simulated. The
+    cargoes are at the warehouse the trucks start at.
+    """
+    originCode = next(spec.startAt for spec in scenario.fleet if TRANSPORT_KINDS[spec.kind] is Truck)
+    deliveries = Deliveries(len(destinationCodes))
+    runSynchronously(simulate(scenario._replace(cargoes=Manifest(originCode, destinationCodes)),
+                              Engine.generator, CLOCK, [deliveries], keepEvents=False))
+    return deliveries.deliveredAt
+
+
+class LockstepSchedule:
+    """
+    Schedules a batch of manifests of a scenario at once, giving the hours
+    every cargo is delivered at, NaN past the end of a shorter manifest.
+    Raises `ValueError` for a scenario which does not fit the schedule.
+    """
+
+    def __init__(self, scenario: Scenario):
+        if numpy is None:
+            raise ValueError('Lockstep schedules need NumPy')
+
+        self.__estimator = MakespanEstimator(scenario)
+        self.__destinations: Dict[LocationCode, int] = {}
+        self.__routes: List[List[int]] = []
+        self.__ports: List[LocationCode] = []
+        self.__fleet: Dict[Optional[LocationCode], List[TransportSpec]] = {}
+        for spec in scenario.fleet:
+            self.__fleet.setdefault(None if TRANSPORT_KINDS[spec.kind] is Truck else spec.startAt, []).append(spec)
+
+    def __destination(self, destinationCode: LocationCode) -> int:
+        index = self.__destinations.get(destinationCode)
+        if index is None:
+            route = self.__estimator.route(destinationCode)
+            if route.port is not None and route.port not in self.__ports:
+                self.__ports.append(route.port)
+            port = -1 if route.port is None else self.__ports.index(route.port)
+            index = self.__destinations[destinationCode] = len(self.__routes)
+            self.__routes.append([minutes(route.byLand), port, minutes(route.bySea)])
+
+        return index
+
+    def __call__(self, manifests: Sequence[Sequence[LocationCode]]) -> 'numpy.ndarray':
+        np = numpy
+        samples = len(manifests)
+        rows = np.arange(samples)
+        lengths = np.array([len(manifest) for manifest in manifests], dtype=np.int64)
+        cargoesCount = int(lengths.max(initial=0))
+        destinations = np.zeros((samples, cargoesCount), dtype=np.int64)
+        for row, manifest in enumerate(manifests):
+            destinations[row, :len(manifest)] = [self.__destination(code) for code in manifest]
+
+        routes = np.array(self.__routes, dtype=np.int64).reshape(-1, 3)
+        byLand, ports, bySea = routes[destinations, 0], routes[destinations, 1], routes[destinations, 2]
+        inManifest = np.arange(cargoesCount) < lengths[:, None]
+
+        trucks = self.__fleet[None]
+        truck = handlingOf(trucks[0])
+        truckLoad, truckUnload = minutes(truck.hoursToLoad), minutes(truck.hoursToUnload)
+        deliveredAt = np.zeros((samples, cargoesCount), dtype=np.int64)
+        readyAt = np.zeros((samples, len(trucks)), dtype=np.int64)
+        for index in range(cargoesCount):
+            active = inManifest[:, index]
+            dispatched = readyAt.argmin(axis=1)
+            broughtAt = readyAt[rows, dispatched] + truckLoad + byLand[:, index] + truckUnload
+            readyAt[rows, dispatched] = np.where(active, broughtAt + byLand[:, index], readyAt[rows, dispatched])
+            deliveredAt[:, index] = broughtAt
+
+        for portIndex, port in enumerate(self.__ports):
+            atPort = inManifest & (ports == portIndex)
+            if not atPort.any():
+                continue
+
+            vessels = self.__fleet[port]
+            vessel = handlingOf(vessels[0])
+            vesselLoad, vesselUnload = minutes(vessel.hoursToLoad), minutes(vessel.hoursToUnload)
+            counts = atPort.sum(axis=1)
+            never = np.iinfo(np.int64).max
+
+            order = np.where(atPort, deliveredAt, never).argsort(axis=1, kind='stable')
+            brought = np.take_along_axis(np.where(atPort, deliveredAt, never), order, axis=1)
+            tripsSea = np.take_along_axis(bySea, order, axis=1)
+            delivered = np.take_along_axis(deliveredAt, order, axis=1)
+
+            readyAt = np.zeros((samples, len(vessels)), dtype=np.int64)
+            nextCargo = np.zeros(samples, dtype=np.int64)
+            while True:
+                active = nextCargo < counts
+                if not active.any():
+                    break
+
+                head = np.minimum(nextCargo, cargoesCount - 1)
+                dispatched = readyAt.argmin(axis=1)
+                vesselReadyAt = readyAt[rows, dispatched]
+                headBroughtAt = brought[rows, head]
+                waited = vesselReadyAt <= headBroughtAt
+                loadingAt = np.where(waited, headBroughtAt, vesselReadyAt)
+                broughtBefore = (brought < loadingAt[:, None]).sum(axis=1)
+                upTo = np.where(waited, head + 1, np.minimum(head + vessel.capacity, broughtBefore))
+
+                tripSea = tripsSea[rows, head]
+                deliveredTo = loadingAt + vesselLoad + tripSea + vesselUnload
+                for offset in range(vessel.capacity):
+                    cargo = head + offset
+                    inTrip = active & (cargo < upTo)
+                    delivered[rows[inTrip], cargo[inTrip]] = deliveredTo[inTrip]
+
+                readyAt[rows, dispatched] = np.where(active, deliveredTo + tripSea, vesselReadyAt)
+                nextCargo = np.where(active, upTo, nextCargo)
+
+            np.put_along_axis(deliveredAt, order, delivered, axis=1)
+
+        return np.where(inManifest, deliveredAt / MINUTES_PER_HOUR, np.nan)
+
+
+def minutes(hrs: float) -> int:
+    return round(hrs * MINUTES_PER_HOUR)
+
+
+def makespanOf(deliveredAt: Iterable[float]) -> float:
+    return max(deliveredAt, default=0.0)
+
+
+def sweep(scenario: Scenario,
+          manifests: Sequence[Sequence[LocationCode]],
+          vectorized: Optional[bool] = None,
+          batchSize: int = 4096,
+          workers: Optional[int] = None
+          ) -> List[float]:
+    """
+    The makespans of the manifests in hours, scheduled in lockstep batches
+    if `vectorized` (by default whenever it is possible), or simulated in
+    worker processes otherwise.
+    """
+    schedule = None
+    if vectorized is not False and numpy is not None:
+        try:
+            schedule = LockstepSchedule(scenario)
+        except ValueError:
+            if vectorized:
+                raise
+    elif vectorized:
+        raise ValueError('Vectorized sweeps need NumPy')
+
+    if schedule is not None:
+        makespans = []
+        for at in range(0, len(manifests), batchSize):
+            deliveredAt = schedule(manifests[at:at + batchSize])
+            makespans.extend(numpy.nanmax(deliveredAt, axis=1, initial=0.0).tolist())
+        return makespans
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        deliveries = executor.map(partial(simulateDeliveries, scenario), manifests,
+                                  chunksize=max(1, len(manifests) // 64))
+        return list(map(makespanOf, deliveries))
+
+
+if __name__ == '__main__':
+    import sys
+    from argparse import ArgumentParser, FileType
+    from json import dumps
+    from transport_tycoon.batch import manifestLocationCodes, readManifests
+    from transport_tycoon.scenario import exerciseScenario, loadScenario
+
+    parser = ArgumentParser(description='Makespans of many manifests, one per line, over the same scenario')
+    parser.add_argument('manifests', nargs='?', type=FileType('r'), default=sys.stdin,
+                        help='a file of manifests, stdin by default')
+    parser.add_argument('--scenario', help='a scenario file, the exercise by default')
+    parser.add_argument('--simulate', action='store_true', help='simulate every manifest, even if NumPy is installed')
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    scenario = exerciseScenario(()) if args.scenario is None else loadScenario(args.scenario)
+    manifests = list(readManifests(args.manifests))
+    makespans = sweep(scenario, [list(manifestLocationCodes(manifest)) for manifest in manifests],
+                      vectorized=False if args.simulate else None, workers=args.workers)
+    for manifest, hours in zip(manifests, makespans):
+        print(dumps({'manifest': manifest, 'hours': hours}))